@@ -0,0 +1 @@
+"""Offline benchmarks run against a local stand-in for TikTok's creator center"""
@@ -0,0 +1,95 @@
+"""
+Measures how long `_set_description` takes for a typical caption
+
+Runs against a local stand-in for TikTok's caption editor, once with the
+word-by-word typing (`fast_description = false`) and once with the fast path.
+
+    python benchmarks/bench_description.py --runs 3
+"""
+
+import argparse
+import statistics
+import time
+
+from playwright.sync_api import Page, sync_playwright
+
+from tiktok_uploader import config
+from tiktok_uploader.upload import _set_description
+
+# 150 characters, two hashtags with suggestions, one without and a mention
+CAPTION = (
+    "Morning routine before the big race, stretching and a quick breakfast. "
+    "Thanks for watching! #running #marathon #nosuggestionsforthis @coach see you"
+)
+
+# A contenteditable caption box with a popover that shows suggestions after a
+# short delay, like the creator center does once its search request returns
+EDITOR_HTML = """
+<div contenteditable="true" id="caption" style="width: 600px; height: 120px"></div>
+<div class="mention-list-popover" style="display: none"></div>
+<script>
+  const SUGGESTIONS = {
+    "#running": ["running"], "#marathon": ["marathon"], "@coach": ["coach"],
+  };
+  const caption = document.getElementById("caption");
+  const popover = document.querySelector(".mention-list-popover");
+  let pending;
+
+  caption.addEventListener("input", () => {
+    clearTimeout(pending);
+    popover.style.display = "none";
+    const word = caption.innerText.split(/\\s/).pop();
+    const found = SUGGESTIONS[word];
+    if (!found) return;
+    pending = setTimeout(() => {
+      popover.innerHTML = found
+        .map((s) => `<span class="user-id">${s}</span>`).join("");
+      popover.style.display = "block";
+    }, 150);
+  });
+
+  caption.addEventListener("keydown", (event) => {
+    if (event.key !== "Enter" || popover.style.display === "none") return;
+    event.preventDefault();
+    popover.style.display = "none";
+    document.execCommand("insertText", false, " ");
+  });
+</script>
+"""
+
+
+def time_caption(page: Page, fast: bool) -> float:
+    """
+    Returns the seconds taken to set the caption once
+    """
+    config.fast_description = fast
+    page.set_content(EDITOR_HTML)
+
+    start = time.perf_counter()
+    _set_description(page, CAPTION)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--headed", action="store_true")
+    args = parser.parse_args()
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=not args.headed)
+        page = browser.new_page()
+
+        print(f"caption: {len(CAPTION)} characters, {args.runs} runs")
+        for name, fast in (("word by word", False), ("fast path", True)):
+            timings = [time_caption(page, fast) for _ in range(args.runs)]
+            print(
+                f"{name:>12}: median {statistics.median(timings):6.2f}s "
+                f"min {min(timings):6.2f}s max {max(timings):6.2f}s"
+            )
+
+        browser.close()
+
+
+if __name__ == "__main__":
+    main()
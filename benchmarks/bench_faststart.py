@@ -0,0 +1,92 @@
+"""
+Measures the faststart rewrite on large MP4 files
+
+Builds MP4s with `moov` at the end (one chunk offset per MiB of media), then
+times the first rewrite, the cached call that follows and the peak Python
+memory of the rewrite, which should stay near the size of `moov`.
+
+    python -m benchmarks.bench_faststart --sizes 256 1024 4096
+"""
+
+import argparse
+import os
+import struct
+import tempfile
+import time
+import tracemalloc
+
+from tiktok_uploader.faststart import faststart
+
+MB = 1024 * 1024
+
+
+def box(kind: bytes, *children: bytes) -> bytes:
+    payload = b"".join(children)
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+def make_video(path: str, megabytes: int) -> None:
+    """
+    Writes an MP4 with `megabytes` of media data followed by its moov box
+    """
+    ftyp = box(b"ftyp", b"isom", bytes(4))
+    chunks = megabytes
+    offsets = [len(ftyp) + 16 + i * MB for i in range(chunks)]
+    stco = box(
+        b"co64",
+        bytes(4),
+        struct.pack(">I", chunks),
+        *(struct.pack(">Q", o) for o in offsets),
+    )
+    stsd = box(b"stsd", bytes(4), struct.pack(">I", 1), box(b"avc1", bytes(8)))
+    hdlr = box(b"hdlr", bytes(8), b"vide", bytes(12))
+    trak = box(
+        b"trak",
+        box(b"tkhd", bytes(84)),
+        box(b"mdia", hdlr, box(b"minf", box(b"stbl", stsd, stco))),
+    )
+    mvhd = box(b"mvhd", bytes(12), struct.pack(">II", 1000, 60_000))
+
+    block = os.urandom(MB)
+    with open(path, "wb") as file:
+        file.write(ftyp)
+        file.write(struct.pack(">I4sQ", 1, b"mdat", 16 + chunks * MB))
+        for _ in range(chunks):
+            file.write(block)
+        file.write(box(b"moov", mvhd, trak))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[256, 1024])
+    parser.add_argument("--dir", help="where to write the files (default: temp)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        for megabytes in args.sizes:
+            source = os.path.join(directory, f"video-{megabytes}.mp4")
+            make_video(source, megabytes)
+            cache = os.path.join(directory, "cache")
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            staged = faststart(source, cache_dir=cache)
+            cold = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            start = time.perf_counter()
+            faststart(source, cache_dir=cache)
+            warm = time.perf_counter() - start
+
+            assert staged != source, "the file was not rewritten"
+            print(
+                f"{megabytes:>6} MB  rewrite {cold:6.2f}s ({megabytes / cold:7.1f} MB/s)"
+                f"  cached {warm * 1000:6.2f} ms  peak memory {peak / MB:5.1f} MB"
+            )
+            os.remove(staged)
+            os.remove(source)
+
+
+if __name__ == "__main__":
+    main()
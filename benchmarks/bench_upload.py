@@ -0,0 +1,139 @@
+"""
+Times `complete_upload_form` step by step against the fake creator center
+
+Every combination of file size, caption length and hashtag count is uploaded
+`--runs` times in headless Chromium. Nothing leaves the machine, so this runs
+in CI once `playwright install chromium` has been done.
+
+    python -m benchmarks.bench_upload --sizes 1 20 --captions 0 150 --hashtags 0 5
+"""
+
+import argparse
+import datetime
+import itertools
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from tiktok_uploader import config, spans
+from tiktok_uploader.browsers import close_browser, get_browser
+from tiktok_uploader.upload import complete_upload_form
+
+from .server import FakeCreatorCenter, add_fault_arguments, faults_from_args
+
+FILLER = "a quick look at how this week went behind the scenes".split()
+
+
+def make_caption(length: int, hashtags: int) -> str:
+    """
+    Builds a caption of about `length` characters ending in `hashtags` hashtags
+    """
+    tags = [f"#tag{i}" for i in range(hashtags)]
+    words: list[str] = []
+    for word in itertools.cycle(FILLER):
+        if len(" ".join(words + tags + [word])) > length:
+            break
+        words.append(word)
+    return " ".join(words + tags)
+
+
+def make_video(directory: str, megabytes: float) -> str:
+    """
+    Writes a file of the given size for the file input
+    """
+    path = os.path.join(directory, f"video-{megabytes:g}mb.mp4")
+    with open(path, "wb") as file:
+        file.write(b"\0" * int(megabytes * 1024 * 1024))
+    return path
+
+
+def run(args: argparse.Namespace) -> list[dict]:
+    """
+    Returns one result per scenario with the median seconds of every step
+    """
+    collector = spans.add_exporter(spans.SpanCollector())
+    schedule = None
+    if args.schedule:
+        schedule = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(
+            days=2
+        )
+        schedule = schedule.replace(minute=schedule.minute // 5 * 5, second=0)
+
+    results = []
+    with (
+        tempfile.TemporaryDirectory() as directory,
+        FakeCreatorCenter(faults=faults_from_args(args), seed=args.seed) as site,
+    ):
+        site.point_config()
+        page = get_browser("chromium", headless=not args.headed)
+        try:
+            for megabytes, length, hashtags in itertools.product(
+                args.sizes, args.captions, args.hashtags
+            ):
+                path = make_video(directory, megabytes)
+                caption = make_caption(length, hashtags)
+                steps: dict[str, list[float]] = {}
+                totals = []
+
+                for _ in range(args.runs):
+                    collector.spans.clear()
+                    start = time.perf_counter()
+                    complete_upload_form(
+                        page, path, caption, schedule, False, headless=True
+                    )
+                    totals.append(time.perf_counter() - start)
+                    for span in collector.spans:
+                        steps.setdefault(span["name"], []).append(span["seconds"])
+
+                results.append(
+                    {
+                        "megabytes": megabytes,
+                        "caption": len(caption),
+                        "hashtags": hashtags,
+                        "total": statistics.median(totals),
+                        "steps": {
+                            name: statistics.median(times)
+                            for name, times in steps.items()
+                        },
+                    }
+                )
+        finally:
+            close_browser(page)
+            spans.remove_exporter(collector)
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--captions", type=int, nargs="+", default=[0, 150, 2000])
+    parser.add_argument("--hashtags", type=int, nargs="+", default=[0, 3, 10])
+    parser.add_argument("--schedule", action="store_true", help="also schedule")
+    parser.add_argument("--headed", action="store_true")
+    parser.add_argument("--json", help="also write the results to this file")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    # everything on the fake page shows up at once, so fail fast on a broken selector
+    config.implicit_wait = 5
+
+    results = run(args)
+    for result in results:
+        slowest = sorted(result["steps"].items(), key=lambda item: -item[1])[:4]
+        print(
+            f"{result['megabytes']:>6g} MB  caption {result['caption']:>5}  "
+            f"#{result['hashtags']:<3} total {result['total']:7.2f}s  | "
+            + "  ".join(f"{name} {seconds:.2f}s" for name, seconds in slowest)
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Load-tests `TikTokUploader.upload_videos` against the fake creator center
+
+Starts `benchmarks.server` in-process with the given faults, uploads `--videos`
+files through `--tabs` tabs and reports failures, per-step latency quantiles
+and what the server saw. Use it to pick `implicit_wait`, `explicit_wait` and
+`uploading_wait` from data:
+
+    python -m benchmarks.load_test --videos 20 --processing lognormal:4000:0.6 \\
+        --failure-rate upload=0.05 --stuck-rate 0.02 --uploading-wait 15
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from tiktok_uploader import config, spans
+from tiktok_uploader.upload import TikTokUploader
+
+from .bench_upload import make_caption, make_video
+from .server import FakeCreatorCenter, add_fault_arguments, faults_from_args
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--videos", type=int, default=10)
+    parser.add_argument("--size", type=float, default=5, help="megabytes per video")
+    parser.add_argument("--caption", type=int, default=150)
+    parser.add_argument("--hashtags", type=int, default=3)
+    parser.add_argument("--tabs", type=int, default=1)
+    parser.add_argument("--retries", type=int, default=1)
+    parser.add_argument("--post-now", action="store_true", help="ask before posting")
+    parser.add_argument("--headed", action="store_true")
+    for wait in ("implicit_wait", "explicit_wait", "uploading_wait"):
+        parser.add_argument(f"--{wait.replace('_', '-')}", type=float, metavar="S")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    for wait in ("implicit_wait", "explicit_wait", "uploading_wait"):
+        if getattr(args, wait) is not None:
+            setattr(config, wait, getattr(args, wait))
+
+    histograms = spans.add_exporter(spans.HistogramExporter())
+    with (
+        tempfile.TemporaryDirectory() as directory,
+        FakeCreatorCenter(
+            faults=faults_from_args(args), seed=args.seed, post_now=args.post_now
+        ) as site,
+    ):
+        site.point_config()
+        path = make_video(directory, args.size)
+        description = make_caption(args.caption, args.hashtags)
+        videos = []
+        for i in range(args.videos):
+            copy = os.path.join(directory, f"video-{i}.mp4")
+            os.link(path, copy)
+            videos.append({"path": copy, "description": description})
+
+        uploader = TikTokUploader(
+            sessionid="load-test",
+            browser="chromium",
+            headless=not args.headed,
+            tabs=args.tabs,
+            account="load-test",
+        )
+        start = time.perf_counter()
+        try:
+            failed = uploader.upload_videos(videos, num_retries=args.retries)  # type: ignore[arg-type]
+        finally:
+            uploader.close()
+            spans.remove_exporter(histograms)
+        elapsed = time.perf_counter() - start
+
+        print(
+            f"{len(videos) - len(failed)}/{len(videos)} uploaded in {elapsed:.1f}s"
+            f" ({len(videos) / elapsed * 60:.1f} videos/min)"
+        )
+        print(
+            "\nstep                   " + "".join(f"p{q * 100:<7g}" for q in QUANTILES)
+        )
+        for name in sorted({key[0] for key in histograms.histograms}):
+            values = [histograms.quantile(name, q) or 0 for q in QUANTILES]
+            print(f"{name:<22} " + "".join(f"{v:<8.2f}" for v in values))
+        print("\n" + site.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,432 @@
+"""
+Serves a local stand-in for the TikTok pages in `config.paths`
+
+The upload page in `site/` implements every selector in `config.selectors`:
+the file input, processing confirmation, caption editor with its suggestion
+popover, visibility, interactivity, schedule pickers, cover editor, product
+link modal, post button and the confirmation toast. Uploads are really sent to
+the server so file size matters, but nothing leaves the machine.
+
+`Faults` reproduces production pathologies: every endpoint gets a latency
+distribution and a failure rate, processing can be slow or never finish (the
+post button stays disabled), suggestions can be slow or fail (the popover never
+appears) and the cookie banner and split-window modal can show up late.
+
+    python -m benchmarks.server --latency upload=uniform:200-2000 \\
+        --failure-rate upload=0.1 --processing lognormal:3000:0.5 --stuck-rate 0.05
+
+Key Classes
+-----------
+Latency : A latency distribution such as "250", "100-900" or "lognormal:800:0.5"
+Endpoint : Latency and failure rate of one endpoint
+Faults : Every knob of the fake creator center
+FakeCreatorCenter : The server itself
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os.path import dirname, join
+from typing import Any, Literal
+from urllib.parse import parse_qs, urlsplit
+
+from pydantic import HttpUrl
+
+from tiktok_uploader import config
+
+SITE = join(dirname(__file__), "site")
+
+PAGES = {
+    "/": "index.html",
+    "/login/phone-or-email/email": "login.html",
+    "/creator-center/upload": "upload.html",
+}
+
+ENDPOINTS = ("pages", "upload", "post", "suggest")
+
+
+@dataclass
+class Latency:
+    """
+    A latency distribution in milliseconds
+
+    `spread` is the half width for "uniform", the standard deviation for
+    "normal" and sigma for "lognormal" (whose `ms` is the median).
+    """
+
+    kind: Literal["fixed", "uniform", "normal", "lognormal", "exponential"] = "fixed"
+    ms: float = 0
+    spread: float = 0
+
+    @classmethod
+    def parse(cls, spec: "str | float") -> "Latency":
+        """
+        Reads "250", "100-900", "normal:500:100", "lognormal:800:0.5" or "exp:300"
+        """
+        text = str(spec).strip()
+        kind, _, rest = text.partition(":")
+        try:
+            if not rest:
+                if "-" in text.lstrip("-"):
+                    low, high = (float(x) for x in text.split("-", 1))
+                    return cls("uniform", (low + high) / 2, (high - low) / 2)
+                return cls("fixed", float(text))
+            if kind == "uniform":
+                low, high = (float(x) for x in rest.split("-", 1))
+                return cls("uniform", (low + high) / 2, (high - low) / 2)
+            if kind in ("exp", "exponential"):
+                return cls("exponential", float(rest))
+            if kind in ("normal", "lognormal"):
+                ms, spread = (float(x) for x in rest.split(":", 1))
+                return cls(kind, ms, spread)  # type: ignore[arg-type]
+        except ValueError:
+            pass
+        raise ValueError(f"Unknown latency distribution: {spec!r}")
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            value = rng.uniform(self.ms - self.spread, self.ms + self.spread)
+        elif self.kind == "normal":
+            value = rng.gauss(self.ms, self.spread)
+        elif self.kind == "lognormal":
+            value = rng.lognormvariate(math.log(self.ms), self.spread) if self.ms else 0
+        elif self.kind == "exponential":
+            value = rng.expovariate(1 / self.ms) if self.ms else 0
+        else:
+            value = self.ms
+        return max(0.0, value)
+
+
+@dataclass
+class Endpoint:
+    """
+    Latency and failure rate of one endpoint; failures answer with `status`
+    """
+
+    latency: Latency = field(default_factory=Latency)
+    failure_rate: float = 0
+    status: int = 503
+
+
+@dataclass
+class Faults:
+    """
+    The knobs of the fake creator center
+
+    `pages` covers the HTML pages, `upload` the video transfer, `post` the
+    publish request and `suggest` the hashtag/mention search behind the
+    popover. `stuck_rate` is the share of uploads whose processing never ends.
+    The cookie banner and split-window modal appear after the given delay, or
+    not at all when None.
+    """
+
+    pages: Endpoint = field(default_factory=Endpoint)
+    upload: Endpoint = field(default_factory=Endpoint)
+    post: Endpoint = field(default_factory=Endpoint)
+    suggest: Endpoint = field(default_factory=lambda: Endpoint(Latency(ms=150)))
+    processing: Latency = field(default_factory=lambda: Latency(ms=500))
+    stuck_rate: float = 0
+    cookie_banner: Latency | None = field(default_factory=Latency)
+    split_window: Latency | None = None
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Faults":
+        """
+        Reads faults from JSON-like data, with latencies given as specs, e.g.
+
+            {"upload": {"latency": "100-900", "failure_rate": 0.1},
+             "processing": "lognormal:3000:0.5", "split_window": "1500"}
+        """
+        faults = cls()
+        for key, value in data.items():
+            if key in ENDPOINTS:
+                endpoint = getattr(faults, key)
+                for name, setting in value.items():
+                    if name == "latency":
+                        endpoint.latency = Latency.parse(setting)
+                    elif name == "failure_rate":
+                        endpoint.failure_rate = float(setting)
+                    elif name == "status":
+                        endpoint.status = int(setting)
+                    else:
+                        raise ValueError(f"Unknown setting {key}.{name}")
+            elif key == "processing":
+                faults.processing = Latency.parse(value)
+            elif key in ("cookie_banner", "split_window"):
+                setattr(faults, key, None if value is None else Latency.parse(value))
+            elif key == "stuck_rate":
+                faults.stuck_rate = float(value)
+            else:
+                raise ValueError(f"Unknown fault {key!r}")
+        return faults
+
+
+@dataclass
+class EndpointStats:
+    requests: int = 0
+    failures: int = 0
+    delay_seconds: float = 0
+
+
+class FakeCreatorCenter:
+    """
+    A threaded HTTP server for the fake pages
+
+    `options` are handed to the upload page's script (see `FAKE` in
+    `site/upload.html`), e.g. `post_now=True`. `seed` makes the sampled
+    latencies and failures repeatable.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        faults: Faults | None = None,
+        seed: int | None = None,
+        **options: Any,
+    ) -> None:
+        self.faults = faults or Faults()
+        self.options = options
+        self.uploaded_bytes = 0
+        self.stats = {name: EndpointStats() for name in ENDPOINTS}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _handler(self))
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    def start(self) -> "FakeCreatorCenter":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def point_config(self) -> None:
+        """
+        Points `config.paths` at this server
+        """
+        config.paths.main = HttpUrl(f"{self.url}/")
+        config.paths.login = HttpUrl(f"{self.url}/login/phone-or-email/email")
+        config.paths.upload = HttpUrl(f"{self.url}/creator-center/upload?lang=en")
+
+    def sample(self, latency: Latency) -> float:
+        with self._lock:
+            return latency.sample(self._random)
+
+    def chance(self, rate: float) -> bool:
+        with self._lock:
+            return self._random.random() < rate
+
+    def delay(self, name: str) -> bool:
+        """
+        Sleeps for the endpoint's latency and returns whether the request fails
+        """
+        endpoint: Endpoint = getattr(self.faults, name)
+        seconds = self.sample(endpoint.latency) / 1000
+        failed = self.chance(endpoint.failure_rate)
+        with self._lock:
+            stats = self.stats[name]
+            stats.requests += 1
+            stats.failures += failed
+            stats.delay_seconds += seconds
+        time.sleep(seconds)
+        return failed
+
+    def page(self, path: str) -> bytes:
+        options = {
+            "cookie_banner_ms": self._maybe_sample(self.faults.cookie_banner),
+            "split_window_ms": self._maybe_sample(self.faults.split_window),
+            **self.options,
+        }
+        with open(join(SITE, PAGES[path]), encoding="utf-8") as file:
+            html = file.read()
+        return html.replace("/*FAKE_OPTIONS*/ {}", json.dumps(options)).encode()
+
+    def handle_upload(self, size: int) -> dict[str, Any]:
+        with self._lock:
+            self.uploaded_bytes += size
+        stuck = self.chance(self.faults.stuck_rate)
+        processing = None if stuck else self.sample(self.faults.processing)
+        return {"status": "ok", "bytes": size, "processing_ms": processing}
+
+    def handle_post(self) -> dict[str, Any]:
+        return {"status": "ok"}
+
+    def handle_suggest(self, query: str) -> dict[str, Any]:
+        word = query.lstrip("#@")
+        if query.startswith("#"):
+            return {"suggestions": [query, f"{query}challenge"]}
+        return {"suggestions": [f"{word}_fan", word, f"{word}official"]}
+
+    def report(self) -> str:
+        """
+        One line per endpoint with its request count, failures and mean delay
+        """
+        lines = []
+        for name, stats in self.stats.items():
+            mean = stats.delay_seconds / stats.requests if stats.requests else 0
+            lines.append(
+                f"{name:<8} {stats.requests:>5} requests  {stats.failures:>4} failed"
+                f"  {mean * 1000:7.0f} ms mean delay"
+            )
+        return "\n".join(lines)
+
+    def _maybe_sample(self, latency: Latency | None) -> float | None:
+        return None if latency is None else self.sample(latency)
+
+    def __enter__(self) -> "FakeCreatorCenter":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.stop()
+
+
+def _handler(site: FakeCreatorCenter) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            url = urlsplit(self.path)
+            if url.path == "/api/suggest":
+                query = parse_qs(url.query).get("q", [""])[0]
+                if site.delay("suggest"):
+                    self.send_error(site.faults.suggest.status)
+                else:
+                    self._send_json(200, site.handle_suggest(query))
+            elif url.path in PAGES:
+                if site.delay("pages"):
+                    self.send_error(site.faults.pages.status)
+                else:
+                    self._send(200, "text/html; charset=utf-8", site.page(url.path))
+            else:
+                self.send_error(404)
+
+        def do_POST(self) -> None:
+            path = urlsplit(self.path).path
+            size = self._drain()
+            if path == "/api/upload":
+                if site.delay("upload"):
+                    self.send_error(site.faults.upload.status)
+                else:
+                    self._send_json(200, site.handle_upload(size))
+            elif path == "/api/post":
+                if site.delay("post"):
+                    self.send_error(site.faults.post.status)
+                else:
+                    self._send_json(200, site.handle_post())
+            else:
+                self.send_error(404)
+
+        def _drain(self) -> int:
+            """
+            Reads (and drops) the request body, returning its size
+            """
+            remaining = int(self.headers.get("Content-Length", 0))
+            size = remaining
+            while remaining:
+                chunk = self.rfile.read(min(remaining, 1 << 20))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+            return size
+
+        def _send_json(self, status: int, body: dict[str, Any]) -> None:
+            self._send(status, "application/json", json.dumps(body).encode())
+
+        def _send(self, status: int, content_type: str, body: bytes) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass  # keep benchmark output readable
+
+    return Handler
+
+
+def add_fault_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the fault knobs to a command line parser (see `faults_from_args`)
+    """
+    group = parser.add_argument_group("faults")
+    group.add_argument("--faults", help="JSON file read by Faults.from_dict")
+    group.add_argument(
+        "--latency",
+        action="append",
+        default=[],
+        metavar="ENDPOINT=SPEC",
+        help=f"latency of one of {', '.join(ENDPOINTS)}, e.g. upload=100-900",
+    )
+    group.add_argument(
+        "--failure-rate", action="append", default=[], metavar="ENDPOINT=RATE"
+    )
+    group.add_argument("--processing", metavar="SPEC", help="video processing time")
+    group.add_argument("--stuck-rate", type=float, help="share of stuck uploads")
+    group.add_argument("--cookie-banner", metavar="SPEC|off", help="banner delay")
+    group.add_argument("--split-window", metavar="SPEC|off", help="modal delay")
+    group.add_argument("--seed", type=int)
+
+
+def faults_from_args(args: argparse.Namespace) -> Faults:
+    """
+    Builds the faults from the arguments of `add_fault_arguments`
+    """
+    data: dict[str, Any] = {}
+    if args.faults:
+        with open(args.faults, encoding="utf-8") as file:
+            data = json.load(file)
+
+    for option in ("latency", "failure_rate"):
+        for item in getattr(args, option):
+            name, _, value = item.partition("=")
+            data.setdefault(name, {})[option] = value
+    if args.processing:
+        data["processing"] = args.processing
+    if args.stuck_rate is not None:
+        data["stuck_rate"] = args.stuck_rate
+    for name in ("cookie_banner", "split_window"):
+        value = getattr(args, name)
+        if value is not None:
+            data[name] = None if value == "off" else value
+    return Faults.from_dict(data)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Serve the fake creator center with latency and faults"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--post-now", action="store_true", help="ask before posting")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    faults = faults_from_args(args)
+    site = FakeCreatorCenter(
+        args.host, args.port, faults, args.seed, post_now=args.post_now
+    )
+    print(f"Serving {site.url} with {json.dumps(asdict(faults))}")
+    print(f'Point config.toml at it: [paths] main = "{site.url}/" and so on')
+    with site:
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            print("\n" + site.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -23,5 +23,14 @@ stream_handler.setFormatter(formatter)
 logger.addHandler(stream_handler)
 
 from tiktok_uploader.upload import TikTokUploader, upload_video, upload_videos  # noqa: E402, I001
-
-__all__ = ["TikTokUploader", "upload_video", "upload_videos"]
+from tiktok_uploader.async_upload import AsyncTikTokUploader  # noqa: E402, I001
+from tiktok_uploader.parallel import ParallelUploader, upload_videos_parallel  # noqa: E402, I001
+
+__all__ = [
+    "AsyncTikTokUploader",
+    "ParallelUploader",
+    "TikTokUploader",
+    "upload_video",
+    "upload_videos",
+    "upload_videos_parallel",
+]
@@ -0,0 +1,1050 @@
+"""
+`tiktok_uploader` asyncio module for uploading videos to TikTok
+
+Mirrors `tiktok_uploader.upload` on top of `playwright.async_api` so a single event
+loop can drive many pages at once.
+
+Key Classes
+-----------
+AsyncTikTokUploader : asyncio client for uploading videos to TikTok
+"""
+
+import asyncio
+import datetime
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from os.path import abspath
+from typing import Literal
+
+import pytz
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import Page, Playwright, async_playwright
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from tiktok_uploader import config
+from tiktok_uploader.auth import AuthBackend
+from tiktok_uploader.browsers import (
+    RouteFilter,
+    get_async_browser,
+    page_timezone_async,
+)
+from tiktok_uploader.dedup import DedupIndex, DuplicateVideo
+from tiktok_uploader.forms import (
+    ATTRIBUTE_CHANGED_JS,
+    DAY_TEXTS_JS,
+    POPOVER_SETTLED_JS,
+    POST_ENABLED_JS,
+    SCHEDULE_SHOWN_JS,
+    SET_SCHEDULE_JS,
+    TEXT_EQUALS_JS,
+    VISIBLE_TEXTS_JS,
+    FailedToUpload,
+    PostNotConfirmed,
+    VideoNotProcessed,
+    _check_valid_cover_path,
+    _convert_videos_dict,
+    _pick_mention,
+    _prepare_video,
+    _split_description,
+)
+from tiktok_uploader.locators import SelectorRegistry, locate, resolve_async
+from tiktok_uploader.mentions import MentionCache
+from tiktok_uploader.retry import CircuitBreaker, retry_async
+from tiktok_uploader.spans import span, span_attributes, timed
+from tiktok_uploader.timeouts import adaptive, record, settle_window
+from tiktok_uploader.transfer import set_input_file_async
+from tiktok_uploader.types import Cookie, DedupPolicy, ProxyDict, VideoDict
+from tiktok_uploader.utils import green, red
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTikTokUploader:
+    def __init__(
+        self,
+        username: str = "",
+        password: str = "",
+        cookies: str = "",
+        cookies_list: list[Cookie] = [],
+        cookies_str: str | None = None,
+        sessionid: str | None = None,
+        proxy: ProxyDict | None = None,
+        browser: Literal["chrome", "safari", "chromium", "edge", "firefox"] = "chrome",
+        headless: bool = False,
+        storage_state: str | None = None,
+        mention_cache: str | None = None,
+        route_profile: str | None = None,
+        account: str | None = None,
+        dedup_index: str | None = None,
+        dedup_policy: DedupPolicy | None = None,
+        browser_endpoint: str | None = None,
+        *args,
+        **kwargs,
+    ):
+        """
+        Initializes the asyncio TikTok Uploader client.
+
+        The browser is not started until the first upload is attempted (lazy initialization).
+
+        `storage_state` is a per-account file holding the browser session; it is
+        saved after a successful login and restored on the next run.
+
+        `mention_cache` is a per-account file remembering which suggestion each
+        @mention resolved to, so repeated mentions skip reading the dropdown.
+
+        `route_profile` names an entry of `config.route_profiles` (such as "lean")
+        whose resource filter is installed on the browser context, defaulting to
+        `config.route_profile`. Its counters are in `route_filter.stats`.
+
+        `account` labels this uploader's timing spans (see `tiktok_uploader.spans`),
+        defaulting to the username.
+
+        `dedup_index` is a per-account file of the content hashes already posted;
+        a video posted before is handled by `dedup_policy` (`config.dedup_policy`).
+
+        `browser_endpoint` is a remote browser to connect to instead of launching
+        one, defaulting to `config.browser_endpoint` (see `browsers.get_browser`).
+        """
+        self.auth = AuthBackend(
+            username=username,
+            password=password,
+            cookies=cookies,
+            cookies_list=cookies_list,
+            cookies_str=cookies_str,
+            sessionid=sessionid,
+            storage_state=storage_state,
+        )
+        self.proxy = proxy
+        self.browser_name = browser
+        self.headless = headless
+        self.browser_args = args
+        self.browser_kwargs = kwargs
+        self.mentions = MentionCache(mention_cache)
+        self.route_filter = RouteFilter.from_config(route_profile)
+        self.account = account or username
+        self.dedup = DedupIndex(dedup_index, dedup_policy) if dedup_index else None
+        self.browser_endpoint = browser_endpoint
+        self.breaker = CircuitBreaker()
+
+        self._playwright: Playwright | None = None
+        self._page: Page | None = None
+        self._page_lock = asyncio.Lock()
+
+    async def page(self) -> Page:
+        """
+        Returns the authenticated page, starting the browser on first use
+        """
+        async with self._page_lock:
+            if self._page is None:
+                logger.debug(
+                    "Create a %s browser instance %s",
+                    self.browser_name,
+                    "in headless mode" if self.headless else "",
+                )
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                with span_attributes(account=self.account):
+                    page = await get_async_browser(
+                        self._playwright,
+                        self.browser_name,
+                        self.headless,
+                        self.proxy,
+                        *self.browser_args,
+                        storage_state=self.auth.saved_storage_state(),
+                        route_filter=self.route_filter,
+                        endpoint=self.browser_endpoint,
+                        **self.browser_kwargs,
+                    )
+                    self._page = await self.auth.authenticate_agent_async(page)
+        return self._page
+
+    async def upload_video(
+        self,
+        filename: str,
+        description: str = "",
+        schedule: datetime.datetime | None = None,
+        product_id: str | None = None,
+        cover: str | None = None,
+        visibility: Literal["everyone", "friends", "only_you"] = "everyone",
+        num_retries: int = 1,
+        skip_split_window: bool = False,
+        *args,
+        **kwargs,
+    ) -> bool:
+        """
+        Uploads a single TikTok video.
+
+        Returns True if successful, False otherwise.
+        """
+        video_dict: VideoDict = {"path": filename}
+        if description:
+            video_dict["description"] = description
+        if schedule:
+            video_dict["schedule"] = schedule
+        if product_id:
+            video_dict["product_id"] = product_id
+        if visibility != "everyone":
+            video_dict["visibility"] = visibility
+        if cover:
+            video_dict["cover"] = cover
+
+        failed_list = await self.upload_videos(
+            [video_dict], num_retries, skip_split_window, None, *args, **kwargs
+        )
+
+        return len(failed_list) == 0
+
+    async def upload_videos(
+        self,
+        videos: list[VideoDict],
+        num_retries: int = 1,
+        skip_split_window: bool = False,
+        on_complete: Callable[[VideoDict], Awaitable[None] | None] | None = None,
+        *args,
+        on_error: Callable[[VideoDict, Exception], Awaitable[None] | None]
+        | None = None,
+        **kwargs,
+    ) -> list[VideoDict]:
+        """
+        Uploads multiple videos to TikTok.
+        Returns a list of failed videos.
+
+        A failed video is tried again as its error class allows (`config.retry`).
+        Once `self.breaker` opens, the remaining videos fail with `CircuitOpen`.
+        `on_error` is called with a video and its exception before `on_complete`
+        when the upload raised, and with `DuplicateVideo` when the dedup index
+        skipped it. Skipped videos are not failed ones. Either callback may be a
+        plain function or a coroutine function.
+        """
+        videos = _convert_videos_dict(videos)  # type: ignore
+        # replaces a cache path passed along with the other keyword arguments
+        kwargs["mention_cache"] = self.mentions
+
+        if videos and len(videos) > 1:
+            logger.debug("Uploading %d videos", len(videos))
+
+        page = await self.page()  # Triggers lazy loading/authentication
+
+        failed = []
+        for video in videos:
+            path = abspath(video.get("path", "."))
+            allowed = False
+            try:
+                # remuxing for faststart reads and writes the whole file
+                prepared = await asyncio.to_thread(_prepare_video, video)
+                if prepared is None:
+                    failed.append(video)
+                    continue
+
+                path, description, schedule, cover_path, product_id, visibility = (
+                    prepared
+                )
+                allowed = await self._allow_upload(path)
+                if allowed:
+                    with span("upload", path=path, account=self.account):
+                        self.breaker.check()
+                        await retry_async(
+                            lambda: complete_upload_form(
+                                page,
+                                path,
+                                description,
+                                schedule,
+                                skip_split_window,
+                                cover_path,
+                                product_id,
+                                visibility,
+                                num_retries,
+                                self.headless,
+                                *args,
+                                **kwargs,
+                            )
+                        )
+                    self.breaker.success()
+                    await self._record_upload(path)
+                elif on_error:
+                    result = on_error(video, DuplicateVideo(path))
+                    if asyncio.iscoroutine(result):
+                        await result
+            except Exception as exception:
+                if allowed:
+                    await self._release_upload(path)
+                self.breaker.failure(exception)
+                logger.error("Failed to upload %s", path)
+                logger.error(exception)
+                failed.append(video)
+                if on_error:
+                    result = on_error(video, exception)
+                    if asyncio.iscoroutine(result):
+                        await result
+
+            if on_complete and callable(on_complete):
+                result = on_complete(video)
+                if asyncio.iscoroutine(result):
+                    await result
+
+        if self.dedup is not None:
+            await asyncio.to_thread(self.dedup.save)
+        return failed
+
+    async def _allow_upload(self, path: str) -> bool:
+        """
+        Checks a video against the dedup index, hashing off the event loop
+        """
+        return self.dedup is None or await asyncio.to_thread(self.dedup.allow, path)
+
+    async def _record_upload(self, path: str) -> None:
+        if self.dedup is not None:
+            await asyncio.to_thread(self.dedup.record, path)
+
+    async def _release_upload(self, path: str) -> None:
+        if self.dedup is not None:
+            self.dedup.release(path)
+
+    async def close(self) -> None:
+        """Closes the browser instance and stops the Playwright driver."""
+        if self._page:
+            try:
+                browser = self._page.context.browser
+                if browser:
+                    await browser.close()
+            except Exception as e:
+                logger.debug(f"Error closing browser: {e}")
+            self._page = None
+
+        if self.route_filter is not None:
+            logger.debug("Route filter: %s", self.route_filter.stats)
+
+        if self._playwright:
+            try:
+                await self._playwright.stop()
+            except Exception as e:
+                logger.debug(f"Error stopping playwright: {e}")
+            self._playwright = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+async def complete_upload_form(
+    page: Page,
+    path: str,
+    description: str,
+    schedule: datetime.datetime | None,
+    skip_split_window: bool,
+    cover_path: str | None = None,
+    product_id: str | None = None,
+    visibility: Literal["everyone", "friends", "only_you"] = "everyone",
+    num_retries: int = 1,
+    headless: bool = False,
+    *args,
+    overlap: bool | None = None,
+    mention_cache: MentionCache | None = None,
+    **kwargs,
+) -> None:
+    """
+    Actually uploads each video
+
+    With `overlap` (defaults to `config.overlap_upload`) every field is filled
+    while the video is still transferring and processing, and only posting waits
+    for the upload to complete.
+    """
+    if overlap is None:
+        overlap = config.overlap_upload
+
+    await _go_to_upload(page)
+    await _remove_cookies_window(page)
+
+    await _set_video(page, path=path, num_retries=num_retries, wait=not overlap)
+
+    if cover_path and not overlap:
+        await _set_cover(page, cover_path)
+    if not skip_split_window:
+        await _remove_split_window(page)
+    await _set_interactivity(page, **kwargs)
+    await _set_description(page, description, mention_cache)
+    if visibility != "everyone":
+        await _set_visibility(page, visibility)
+    if schedule:
+        await _set_schedule_video(page, schedule)
+    if product_id:
+        await _add_product_link(page, product_id)
+
+    if overlap:
+        await _wait_for_video(page, path=path, num_retries=num_retries)
+        # cover frames are only offered once TikTok has processed the video
+        if cover_path:
+            await _set_cover(page, cover_path)
+
+    await _post_video(page)
+
+
+@timed("go_to_upload")
+async def _go_to_upload(page: Page) -> None:
+    """
+    Navigates to the upload page
+    """
+    logger.debug(green("Navigating to upload page"))
+
+    if page.url != config.paths.upload:
+        await page.goto(str(config.paths.upload))
+    else:
+        await page.reload()
+        page.on("dialog", lambda dialog: asyncio.ensure_future(dialog.accept()))
+
+    # waits for the root to load
+    with adaptive("upload_page", config.explicit_wait) as timeout:
+        await page.wait_for_selector("#root", timeout=timeout)
+
+
+@timed("set_description")
+async def _set_description(
+    page: Page, description: str, mention_cache: MentionCache | None = None
+) -> None:
+    """
+    Sets the description of the video
+    """
+    if description is None:
+        return
+
+    logger.debug(green("Setting description"))
+
+    # Remove any characters outside the BMP range (emojis, etc) & Fix accents
+    description = description.encode("utf-8", "ignore").decode("utf-8")
+    saved_description = description
+
+    try:
+        desc_locator = await resolve_async(page, "upload.description")
+        with adaptive("description", config.implicit_wait) as timeout:
+            await desc_locator.wait_for(state="visible", timeout=timeout)
+
+        await desc_locator.click()
+
+        # Clear existing text
+        await _clear(desc_locator)
+
+        await desc_locator.click()
+
+        if config.fast_description:
+            await _type_description(page, desc_locator, description, mention_cache)
+        else:
+            await _type_description_by_word(
+                page, desc_locator, description, mention_cache
+            )
+
+    except Exception as exception:
+        print("Failed to set description: ", exception)
+        # fallback
+        await _clear(desc_locator)
+        await desc_locator.fill(saved_description)
+
+
+async def _type_description(
+    page: Page,
+    desc_locator,
+    description: str,
+    mention_cache: MentionCache | None = None,
+) -> None:
+    """
+    Inserts plain text in one go and only types hashtags and mentions key by key
+    """
+    autocompleted = False
+    for kind, text in _split_description(description):
+        if kind == "text":
+            # the editor already adds a space after an accepted suggestion
+            if autocompleted and text.startswith(" "):
+                text = text[1:]
+            await _insert_text(page, text)
+            autocompleted = False
+
+        elif kind == "#":
+            await desc_locator.press_sequentially(text, delay=50)
+            autocompleted = await _wait_for_popover(
+                page, config.selectors.upload.mention_box, config.add_hashtag_wait
+            )
+            if autocompleted:
+                await desc_locator.press("Enter")
+
+        else:
+            autocompleted = await _add_mention(page, desc_locator, text, mention_cache)
+
+
+async def _type_description_by_word(
+    page: Page,
+    desc_locator,
+    description: str,
+    mention_cache: MentionCache | None = None,
+) -> None:
+    """
+    Types the description one word at a time, the slower fallback
+    """
+    await asyncio.sleep(1)
+
+    words = description.split(" ")
+    for word in words:
+        if not word:
+            continue
+
+        if word[0] == "#":
+            await desc_locator.press_sequentially(word, delay=50)
+            await asyncio.sleep(0.5)
+
+            mention_box = locate(page, "upload.mention_box")
+            try:
+                with adaptive(
+                    "hashtag_suggestions", config.add_hashtag_wait
+                ) as timeout:
+                    await mention_box.wait_for(state="visible", timeout=timeout)
+                await desc_locator.press("Enter")
+            except Exception:
+                pass
+
+        elif word[0] == "@":
+            if not await _add_mention(page, desc_locator, word, mention_cache):
+                await desc_locator.press_sequentially(" ")
+
+        else:
+            await desc_locator.press_sequentially(word + " ")
+
+
+async def _insert_text(page: Page, text: str) -> None:
+    """
+    Inserts text at the cursor, pressing Enter for line breaks
+    """
+    for i, line in enumerate(text.split("\n")):
+        if i:
+            await page.keyboard.press("Enter")
+        if line:
+            await page.keyboard.insert_text(line)
+
+
+async def _wait_for_popover(page: Page, xpath: str, timeout: float) -> bool:
+    """
+    Waits until the autocomplete popover shows up or the page settles without it
+
+    Suggestions are fetched while the page stays quiet, so with adaptive
+    timeouts the settle window grows to how long the popover takes to show up.
+    """
+    settle = settle_window("popover", config.popover_settle_wait, timeout)
+    start = time.perf_counter()
+    try:
+        shown = bool(
+            await page.evaluate(
+                POPOVER_SETTLED_JS, [xpath, settle * 1000, timeout * 1000]
+            )
+        )
+    except Exception:
+        return False
+
+    if shown:
+        record("popover", time.perf_counter() - start)
+    return shown
+
+
+async def _add_mention(
+    page: Page,
+    desc_locator,
+    mention: str,
+    mention_cache: MentionCache | None = None,
+) -> bool:
+    """
+    Types a mention and picks the matching user from the popover
+
+    Returns whether a user was picked.
+    """
+    logger.debug(green("- Adding Mention: " + mention))
+
+    cached = mention_cache.get(mention) if mention_cache else None
+    if cached is not None and cached["position"] is None:
+        # TikTok had no matching user last time, so don't wait for suggestions
+        await _insert_text(page, mention)
+        return False
+
+    await desc_locator.press_sequentially(mention)
+
+    mention_box_user_id = locate(page, "upload.mention_box_user_id")
+    if not await _wait_for_popover(
+        page, config.selectors.upload.mention_box_user_id, 5
+    ):
+        return False
+
+    try:
+        texts = await mention_box_user_id.evaluate_all(VISIBLE_TEXTS_JS)
+    except Exception:
+        return False
+
+    position = _pick_mention(texts, mention, cached, mention_cache)
+    if position is None:
+        return False
+
+    print("Matching User found : Clicking User")
+    for _ in range(position):
+        await desc_locator.press("ArrowDown")
+    await desc_locator.press("Enter")
+    return True
+
+
+async def _clear(locator) -> None:
+    """
+    Clears the text of the element
+    """
+    await locator.press("Control+A")
+    await locator.press("Backspace")
+
+
+@timed("set_video")
+async def _set_video(
+    page: Page, path: str = "", num_retries: int = 3, wait: bool = True, **kwargs
+) -> None:
+    """
+    Sets the video to upload, tried up to `num_retries` times as `config.retry`
+    allows
+
+    With `wait=False` only the file is set; call `_wait_for_video` before posting.
+    """
+    logger.debug(green("Uploading video file"))
+
+    async def attempt() -> None:
+        upload_box = await resolve_async(page, "upload.upload_video")
+        await set_input_file_async(upload_box, path)
+
+        if wait:
+            # wait until a non-draggable image is found (process confirmation)
+            process_confirmation = locate(page, "upload.process_confirmation")
+            try:
+                with adaptive("video_processed", config.explicit_wait) as timeout:
+                    await process_confirmation.wait_for(
+                        state="attached", timeout=timeout
+                    )
+            except PlaywrightTimeoutError as exception:
+                raise VideoNotProcessed(exception) from exception
+
+    try:
+        await retry_async(attempt, attempts=num_retries)
+    except Exception as exception:
+        print(exception)
+        raise FailedToUpload(exception) from exception
+
+
+@timed("wait_for_video")
+async def _wait_for_video(page: Page, path: str = "", num_retries: int = 1) -> None:
+    """
+    Waits for a video set with `_set_video(wait=False)` to finish processing,
+    setting the file again on timeout while retries remain
+    """
+    process_confirmation = locate(page, "upload.process_confirmation")
+    try:
+        with adaptive("video_processed", config.explicit_wait) as timeout:
+            await process_confirmation.wait_for(state="attached", timeout=timeout)
+    except PlaywrightTimeoutError as exception:
+        if num_retries <= 1:
+            raise VideoNotProcessed(exception) from exception
+        logger.debug(
+            red(f"Video did not finish processing, setting it again: {exception}")
+        )
+        await _set_video(page, path=path, num_retries=num_retries - 1)
+
+
+@timed("remove_cookies_window")
+async def _remove_cookies_window(page: Page) -> None:
+    """
+    Removes the cookies window if it is open
+    """
+    logger.debug(green("Removing cookies window"))
+
+    try:
+        selector = f"{config.selectors.upload.cookies_banner.banner} >> {config.selectors.upload.cookies_banner.button} >> button"
+
+        button = page.locator(selector).first
+        if await button.is_visible(timeout=5000):
+            await button.click()
+
+    except Exception:
+        await page.evaluate(f"""
+            const banner = document.querySelector("{config.selectors.upload.cookies_banner.banner}");
+            if (banner) banner.remove();
+        """)
+
+
+@timed("remove_split_window")
+async def _remove_split_window(page: Page) -> None:
+    """
+    Remove the split window if it is open
+    """
+    logger.debug(green("Removing split window"))
+    window_xpath = config.selectors.upload.split_window
+
+    try:
+        window = page.locator(f"xpath={window_xpath}")
+        # is_visible checks once, there is no wait to adapt
+        if await window.is_visible():
+            await window.click()
+    except PlaywrightTimeoutError:
+        logger.debug(red("Split window not found or operation timed out"))
+
+
+@timed("set_interactivity")
+async def _set_interactivity(
+    page: Page,
+    comment: bool = True,
+    stitch: bool = True,
+    duet: bool = True,
+    *args,
+    **kwargs,
+) -> None:
+    """
+    Sets the interactivity settings of the video
+    """
+    try:
+        logger.debug(green("Setting interactivity settings"))
+
+        comment_box = locate(page, "upload.comment")
+        stitch_box = locate(page, "upload.stitch")
+        duet_box = locate(page, "upload.duet")
+
+        if comment ^ await comment_box.is_checked():
+            await comment_box.click()
+
+        if stitch ^ await stitch_box.is_checked():
+            await stitch_box.click()
+
+        if duet ^ await duet_box.is_checked():
+            await duet_box.click()
+
+    except Exception as _:
+        logger.error("Failed to set interactivity settings")
+
+
+@timed("set_visibility")
+async def _set_visibility(
+    page: Page, visibility: Literal["everyone", "friends", "only_you"]
+) -> None:
+    """
+    Sets the visibility/privacy of the video
+    """
+    try:
+        logger.debug(green(f"Setting visibility to: {visibility}"))
+
+        dropdown_xpath = (
+            "//div[@data-e2e='video_visibility_container']//button[@role='combobox']"
+        )
+        dropdown = page.locator(f"xpath={dropdown_xpath}")
+        await dropdown.click()
+
+        visibility_text_map = {
+            "everyone": "Everyone",
+            "friends": "Friends",
+            "only_you": "Only you",
+        }
+
+        option_text = visibility_text_map.get(visibility, "Everyone")
+        option_xpath = f"//div[@role='option' and contains(., '{option_text}')]"
+
+        option = page.locator(f"xpath={option_xpath}")
+        await option.wait_for(state="visible")
+        await option.scroll_into_view_if_needed()
+        await option.click()
+
+        logger.debug(green(f"Successfully set visibility to: {visibility}"))
+
+    except Exception as e:
+        logger.error(red(f"Failed to set visibility: {e}"))
+
+
+@timed("set_schedule_video")
+async def _set_schedule_video(page: Page, schedule: datetime.datetime) -> None:
+    """
+    Sets the schedule of the video
+    """
+    logger.debug(green("Setting schedule"))
+
+    schedule = schedule.astimezone(pytz.timezone(await page_timezone_async(page)))
+
+    month = schedule.month
+    day = schedule.day
+    hour = schedule.hour
+    minute = schedule.minute
+
+    try:
+        switch = locate(page, "schedule.switch")
+        await switch.click()
+        if not await __type_schedule(page, schedule):
+            await __date_picker(page, month, day)
+            await __time_picker(page, hour, minute)
+    except Exception as e:
+        msg = f"Failed to set schedule: {e}"
+        logger.error(red(msg))
+        raise FailedToUpload()
+
+
+async def __type_schedule(page: Page, schedule: datetime.datetime) -> bool:
+    """
+    Types the date and time into the pickers and checks they took, returning
+    False to pick them by clicking instead
+    """
+    selectors = config.selectors.schedule
+    arg = [
+        selectors.date_picker,
+        selectors.time_picker,
+        schedule.strftime("%Y-%m-%d"),
+        schedule.strftime("%H:%M"),
+    ]
+    try:
+        if not await page.evaluate(SET_SCHEDULE_JS, arg):
+            return False
+        arg[1] = selectors.time_picker_text
+        await page.wait_for_function(SCHEDULE_SHOWN_JS, arg=arg, timeout=500)
+    except PlaywrightError as e:
+        logger.debug(f"Typing the schedule did not take ({e}), picking it instead")
+        return False
+
+    logger.debug(green("Schedule typed correctly"))
+    return True
+
+
+async def __date_picker(page: Page, month: int, day: int) -> None:
+    logger.debug(green("Picking date"))
+
+    date_picker = locate(page, "schedule.date_picker")
+    await date_picker.click()
+
+    calendar = locate(page, "schedule.calendar")
+    await calendar.wait_for(state="visible")
+
+    calendar_month = await locate(page, "schedule.calendar_month").inner_text()
+    n_calendar_month = datetime.datetime.strptime(calendar_month, "%B").month
+
+    if n_calendar_month != month:
+        arrows = locate(page, "schedule.calendar_arrows")
+        if n_calendar_month < month:
+            await arrows.last.click()
+        else:
+            await arrows.first.click()
+
+    valid_days = locate(page, "schedule.calendar_valid_days")
+    days = [int(text) for text in await valid_days.evaluate_all(DAY_TEXTS_JS)]
+    if day not in days:
+        raise Exception("Day not found in calendar")
+    await valid_days.nth(days.index(day)).click()
+
+    await __verify_date_picked_is_correct(page, month, day)
+
+
+async def __verify_date_picked_is_correct(page: Page, month: int, day: int) -> None:
+    date_selected = await locate(page, "schedule.date_picker").inner_text()
+    date_selected_month = int(date_selected.split("-")[1])
+    date_selected_day = int(date_selected.split("-")[2])
+
+    if date_selected_month == month and date_selected_day == day:
+        logger.debug(green("Date picked correctly"))
+    else:
+        msg = f"Something went wrong with the date picker, expected {month}-{day} but got {date_selected_month}-{date_selected_day}"
+        logger.error(msg)
+        raise Exception(msg)
+
+
+async def __time_picker(page: Page, hour: int, minute: int) -> None:
+    logger.debug(green("Picking time"))
+
+    time_picker = locate(page, "schedule.time_picker")
+    await time_picker.click()
+
+    time_picker_container = locate(page, "schedule.time_picker_container")
+    await time_picker_container.wait_for(state="visible")
+
+    hour_options = locate(page, "schedule.timepicker_hours")
+    minute_options = locate(page, "schedule.timepicker_minutes")
+
+    hour_to_click = hour_options.nth(hour)
+    minute_option_correct_index = int(minute / 5)
+    minute_to_click = minute_options.nth(minute_option_correct_index)
+
+    # clicks wait for the scrolled option to be stable, no need to sleep
+    await hour_to_click.scroll_into_view_if_needed()
+    await hour_to_click.click()
+
+    await minute_to_click.scroll_into_view_if_needed()
+    await minute_to_click.click()
+
+    await time_picker.click()
+    try:
+        await page.wait_for_function(
+            TEXT_EQUALS_JS,
+            arg=[
+                config.selectors.schedule.time_picker_text,
+                f"{hour:02d}:{minute:02d}",
+            ],
+            timeout=500,
+        )
+    except PlaywrightTimeoutError:
+        pass  # the verification below reports what was picked instead
+
+    await __verify_time_picked_is_correct(page, hour, minute)
+
+
+async def __verify_time_picked_is_correct(page: Page, hour: int, minute: int) -> None:
+    time_selected = await locate(page, "schedule.time_picker_text").inner_text()
+    time_selected_hour = int(time_selected.split(":")[0])
+    time_selected_minute = int(time_selected.split(":")[1])
+
+    if time_selected_hour == hour and time_selected_minute == minute:
+        logger.debug(green("Time picked correctly"))
+    else:
+        msg = (
+            f"Something went wrong with the time picker, "
+            f"expected {hour:02d}:{minute:02d} "
+            f"but got {time_selected_hour:02d}:{time_selected_minute:02d}"
+        )
+        raise Exception(msg)
+
+
+@timed("post_video")
+async def _post_video(page: Page) -> None:
+    """
+    Posts the video
+    """
+    logger.debug(green("Clicking the post button"))
+
+    try:
+        post_btn = await resolve_async(page, "upload.post")
+        try:
+            with adaptive("post_enabled", config.uploading_wait) as timeout:
+                await page.wait_for_function(
+                    POST_ENABLED_JS,
+                    arg=SelectorRegistry.of(page).selector("upload.post"),
+                    timeout=timeout,
+                )
+        except PlaywrightTimeoutError:
+            logger.debug(red("Post button is still disabled, clicking anyway"))
+
+        await post_btn.scroll_into_view_if_needed()
+        await post_btn.click()
+
+    except Exception:
+        logger.debug(green("Trying to click on the button again (fallback)"))
+        await page.evaluate('document.querySelector(".TUXButton--primary").click()')
+
+    post_now = locate(page, "upload.post_now")
+    post_confirmation = locate(page, "upload.post_confirmation")
+    try:
+        # the "Post now" dialog either shows up or the upload is confirmed directly
+        with adaptive("post_dialog", 5) as timeout:
+            await post_now.or_(post_confirmation).first.wait_for(
+                state="visible", timeout=timeout
+            )
+        if await post_now.is_visible():
+            await post_now.click()
+    except Exception:
+        pass
+
+    try:
+        with adaptive("post_confirmation", config.explicit_wait) as timeout:
+            await post_confirmation.wait_for(state="attached", timeout=timeout)
+    except PlaywrightTimeoutError as exception:
+        raise PostNotConfirmed(exception) from exception
+
+    logger.debug(green("Video posted successfully"))
+
+
+@timed("add_product_link")
+async def _add_product_link(page: Page, product_id: str) -> None:
+    """
+    Adds the product link
+    """
+    logger.debug(green(f"Attempting to add product link for ID: {product_id}..."))
+    try:
+        add_link_button = page.locator(
+            "//button[contains(@class, 'Button__root') and contains(., 'Add')]"
+        )
+        await add_link_button.click()
+
+        search_input = page.locator("//input[@placeholder='Search products']")
+        try:
+            first_next = page.locator(
+                "//button[contains(@class, 'TUXButton--primary') and .//div[text()='Next']]"
+            )
+            # the modal opens either on a "Next" step or straight on the search
+            with adaptive("product_modal", 3) as timeout:
+                await first_next.or_(search_input).first.wait_for(
+                    state="visible", timeout=timeout
+                )
+            if await first_next.is_visible():
+                await first_next.click()
+        except Exception:
+            pass
+
+        # actions below auto-wait for their element, so the fixed sleeps are gone
+        await search_input.fill(product_id)
+        await search_input.press("Enter")
+
+        product_radio = page.locator(
+            f"//tr[.//span[contains(text(), '{product_id}')] or .//div[contains(text(), '{product_id}')]]//input[@type='radio' and contains(@class, 'TUXRadioStandalone-input')]"
+        )
+        await product_radio.click()
+
+        second_next = page.locator(
+            "//button[contains(@class, 'TUXButton--primary') and .//div[text()='Next']]"
+        )
+        await second_next.click()
+
+        final_add = page.locator(
+            "//button[contains(@class, 'TUXButton--primary') and .//div[text()='Add']]"
+        )
+        await final_add.click()
+
+        await final_add.wait_for(state="hidden")
+
+    except Exception as e:
+        logger.error(red(f"Error adding product link: {e}"))
+
+
+@timed("set_cover")
+async def _set_cover(page: Page, cover_path: str) -> None:
+    """
+    Adds a custom cover
+    """
+    logger.debug(green(f"Attempting to add custom cover: {cover_path}..."))
+    try:
+        if not _check_valid_cover_path(cover_path):
+            raise Exception("Invalid cover image file path")
+
+        preview_loc = locate(page, "upload.cover.cover_preview")
+        current_cover_src = await preview_loc.get_attribute("src")
+
+        edit_cover_btn = locate(page, "upload.cover.edit_cover_button")
+        await edit_cover_btn.click()
+
+        upload_tab = locate(page, "upload.cover.upload_cover_tab")
+        await upload_tab.click()
+
+        upload_box = locate(page, "upload.cover.upload_cover")
+        await set_input_file_async(upload_box, cover_path)
+
+        confirm_btn = locate(page, "upload.cover.upload_confirmation")
+        await confirm_btn.click()
+
+        try:
+            with adaptive("cover_preview", 10) as timeout:
+                await page.wait_for_function(
+                    ATTRIBUTE_CHANGED_JS,
+                    arg=[
+                        config.selectors.upload.cover.cover_preview,
+                        "src",
+                        current_cover_src,
+                    ],
+                    timeout=timeout,
+                )
+        except PlaywrightTimeoutError:
+            logger.debug(red("Cover preview did not change"))
+
+    except Exception as e:
+        logger.error(red(f"Error setting cover: {e}"))
+        try:
+            exit_icon = locate(page, "upload.cover.exit_cover_container")
+            if await exit_icon.is_visible():
+                await exit_icon.click()
+        except Exception:
+            pass
@@ -1,15 +1,26 @@
 """Handles authentication for TikTokUploader"""
 
+import asyncio
+import json
+import re
 from http import cookiejar
+from os import makedirs
+from os.path import abspath, dirname, exists
 from time import sleep, time
 from typing import Any, cast
+from urllib.parse import urlparse
 
+from playwright.async_api import Page as AsyncPage
+from playwright.async_api import expect as async_expect
 from playwright.sync_api import Page, expect
 
 from tiktok_uploader import config, logger
 from tiktok_uploader.browsers import get_browser
-from tiktok_uploader.types import Cookie, cookie_from_dict
-from tiktok_uploader.utils import green
+from tiktok_uploader.locators import locate, resolve, resolve_async
+from tiktok_uploader.spans import timed
+from tiktok_uploader.timeouts import adaptive
+from tiktok_uploader.types import Cookie, CookieRejection, cookie_from_dict
+from tiktok_uploader.utils import atomic_write, green
 
 
 class AuthBackend:
@@ -24,6 +35,8 @@ class AuthBackend:
     cookies_str: str | None
     cookies_list: list[Cookie]
     sessionid: str | None
+    storage_state: str | None
+    rejected_cookies: list[CookieRejection]
 
     def __init__(
         self,
@@ -33,6 +46,7 @@ class AuthBackend:
         cookies: str | None = None,
         cookies_str: str | None = None,
         sessionid: str | None = None,
+        storage_state: str | None = None,
     ):
         """
         Creates the authentication backend
@@ -42,6 +56,8 @@ class AuthBackend:
         - password -> the account's password
 
         - cookies -> a list of cookie dictionaries of cookies which is Playwright-compatible
+        - storage_state -> a file the context's storage state is saved to after a
+          successful login and restored from on the next run
         """
         if (username and not password) or (password and not username):
             raise InsufficientAuth()
@@ -50,10 +66,16 @@ class AuthBackend:
         self.cookies_str = cookies_str
         self.cookies_list = list(cookies_list) if cookies_list else []
         self.sessionid = sessionid
+        self.storage_state = storage_state
         self.cookies = []
+        self.rejected_cookies = []
 
         has_cookie_input = bool(
-            self.cookies_path or self.cookies_str or self.cookies_list or self.sessionid
+            self.cookies_path
+            or self.cookies_str
+            or self.cookies_list
+            or self.sessionid
+            or self.saved_storage_state()
         )
         if not (has_cookie_input or (username and password)):
             raise InsufficientAuth()
@@ -69,80 +91,242 @@ class AuthBackend:
             logger.debug(green("Authenticating browser with sessionid"))
         elif self.cookies_list:
             logger.debug(green("Authenticating browser with cookies_list"))
+        elif self.storage_state:
+            logger.debug(green("Authenticating browser with storage_state"))
 
+    def saved_storage_state(self) -> str | None:
+        """
+        Returns the storage state file to restore into a new context, if one was saved
+        """
+        if self.storage_state and exists(self.storage_state):
+            return self.storage_state
+        return None
+
+    @timed("authenticate")
     def authenticate_agent(self, page: Page) -> Page:
         """
         Authenticates the agent using the browser backend
+
+        When the context was restored from a storage state validated less than
+        `config.storage_state_max_age` seconds ago, the validation navigation is
+        skipped entirely. An older storage state is validated first, and the
+        cookies or credentials are only used when it is no longer signed in, so
+        they never overwrite a fresher restored session.
         """
+        if self._storage_state_is_fresh() and self._has_session(page.context.cookies()):  # type: ignore[arg-type]
+            logger.debug(green("Reusing recently validated storage state"))
+            return page
+
+        if self._storage_state_signed_in(page):
+            return page
+
         if not self.cookies:
             self.cookies = self._resolve_cookies()
 
         if not self.cookies and self.username and self.password:
             self.cookies = login(page, username=self.username, password=self.password)
 
-        if not self.cookies:
-            raise InsufficientAuth(
-                "No valid authentication source found. Provide a valid cookies file, cookies list/string, sessionid, or username/password."
-            )
+        if not self.saved_storage_state():
+            self._check_has_cookies()
 
         logger.debug(green("Authenticating browser with cookies"))
 
-        # Fix cookie keys for Playwright
-        playwright_cookies = []
-        for cookie in self.cookies:
-            c = cookie.copy()
-            if "expiry" in c:
-                c["expires"] = c.pop("expiry")
-            # Playwright requires strict types for sameSite
-            if "sameSite" in c:
-                if c["sameSite"] not in ["Strict", "Lax", "None"]:
-                    c.pop("sameSite")
-
-            # Playwright might fail if domain starts with a dot
-            # if c.get("domain", "").startswith("."):
-            #     c["domain"] = c["domain"][1:]
-
-            # logger.debug(f"Adding cookie: {c}")
-            print(f"DEBUG: Adding cookie: {c}")
-            playwright_cookies.append(c)
-
-        try:
-            for pc in playwright_cookies:
-                try:
-                    page.context.add_cookies([cast(Any, pc)])
-                except Exception as e:
-                    print(f"DEBUG: Failed to add individual cookie {pc['name']}: {e}")
-        except Exception as e:
-            logger.error(f"Failed to add cookies: {e}")
+        cookies, self.rejected_cookies = normalize_cookies(self.cookies)
+        if cookies:
+            try:
+                page.context.add_cookies(cast(Any, cookies))
+            except Exception as e:
+                # only fall back to one round-trip per cookie when the batch fails
+                logger.debug(f"Batch cookie insert failed, retrying one by one: {e}")
+                for cookie in cookies:
+                    try:
+                        page.context.add_cookies([cast(Any, cookie)])
+                    except Exception as error:
+                        self.rejected_cookies.append(
+                            {"name": cookie["name"], "reason": str(error)}
+                        )
+        self._report_rejected_cookies()
 
         page.goto(str(config.paths.main))
 
         # Check if we are redirected to a login or explore page
         current_url = page.url
         if "login" in current_url or "explore" in current_url:
-            # Check if we have the sessionid cookie
-            cookies = page.context.cookies()
-            has_sessionid = any(c["name"] == "sessionid" for c in cookies)
-            if not has_sessionid:
-                logger.error(
-                    f"Redirected to {current_url} and sessionid cookie is missing"
-                )
-                raise InsufficientAuth(
-                    f"Authentication failed: Redirected to {current_url}. Please ensure your cookies are valid and include a sessionid."
-                )
+            self._check_redirect(current_url, page.context.cookies())  # type: ignore[arg-type]
 
         # WaitForTitle is not directly available, but we can wait for load or selector
         # Using expect(page).to_have_title(...) is better but authenticate_agent expects to return page.
         # We can just wait for network idle or a specific element.
-        # However, for title check:
-        import re
+        with adaptive("home_page", config.explicit_wait) as timeout:
+            expect(page).to_have_title(re.compile(r"TikTok"), timeout=timeout)
 
-        expect(page).to_have_title(
-            re.compile(r"TikTok"), timeout=config.explicit_wait * 1000
-        )
+        if self.storage_state:
+            page.context.storage_state(path=self._storage_state_path())
+            self._mark_storage_state_validated()
+
+        return page
+
+    @timed("authenticate")
+    async def authenticate_agent_async(self, page: AsyncPage) -> AsyncPage:
+        """
+        Authenticates an asyncio agent using the browser backend
+        """
+        if self._storage_state_is_fresh() and self._has_session(
+            await page.context.cookies()  # type: ignore[arg-type]
+        ):
+            logger.debug(green("Reusing recently validated storage state"))
+            return page
+
+        if await self._storage_state_signed_in_async(page):
+            return page
+
+        if not self.cookies:
+            self.cookies = self._resolve_cookies()
+
+        if not self.cookies and self.username and self.password:
+            self.cookies = await login_async(
+                page, username=self.username, password=self.password
+            )
+
+        if not self.saved_storage_state():
+            self._check_has_cookies()
+
+        logger.debug(green("Authenticating browser with cookies"))
+
+        cookies, self.rejected_cookies = normalize_cookies(self.cookies)
+        if cookies:
+            try:
+                await page.context.add_cookies(cast(Any, cookies))
+            except Exception as e:
+                logger.debug(f"Batch cookie insert failed, retrying one by one: {e}")
+                for cookie in cookies:
+                    try:
+                        await page.context.add_cookies([cast(Any, cookie)])
+                    except Exception as error:
+                        self.rejected_cookies.append(
+                            {"name": cookie["name"], "reason": str(error)}
+                        )
+        self._report_rejected_cookies()
+
+        await page.goto(str(config.paths.main))
+
+        current_url = page.url
+        if "login" in current_url or "explore" in current_url:
+            self._check_redirect(current_url, await page.context.cookies())  # type: ignore[arg-type]
+
+        with adaptive("home_page", config.explicit_wait) as timeout:
+            await async_expect(page).to_have_title(
+                re.compile(r"TikTok"), timeout=timeout
+            )
+
+        if self.storage_state:
+            await page.context.storage_state(path=self._storage_state_path())
+            self._mark_storage_state_validated()
 
         return page
 
+    def _storage_state_signed_in(self, page: Page) -> bool:
+        """
+        Whether the context restored from the saved storage state is still
+        signed in, renewing the saved state if so
+        """
+        if not self.saved_storage_state():
+            return False
+
+        page.goto(str(config.paths.main))
+        if "login" in page.url or not self._has_session(page.context.cookies()):  # type: ignore[arg-type]
+            return False
+        try:
+            with adaptive("home_page", config.explicit_wait) as timeout:
+                expect(page).to_have_title(re.compile(r"TikTok"), timeout=timeout)
+        except AssertionError:
+            return False
+
+        logger.debug(green("Restored storage state is still signed in"))
+        page.context.storage_state(path=self._storage_state_path())
+        self._mark_storage_state_validated()
+        return True
+
+    async def _storage_state_signed_in_async(self, page: AsyncPage) -> bool:
+        """
+        asyncio version of `_storage_state_signed_in`
+        """
+        if not self.saved_storage_state():
+            return False
+
+        await page.goto(str(config.paths.main))
+        if "login" in page.url or not self._has_session(
+            await page.context.cookies()  # type: ignore[arg-type]
+        ):
+            return False
+        try:
+            with adaptive("home_page", config.explicit_wait) as timeout:
+                await async_expect(page).to_have_title(
+                    re.compile(r"TikTok"), timeout=timeout
+                )
+        except AssertionError:
+            return False
+
+        logger.debug(green("Restored storage state is still signed in"))
+        await page.context.storage_state(path=self._storage_state_path())
+        self._mark_storage_state_validated()
+        return True
+
+    def _storage_state_path(self) -> str:
+        path = abspath(cast(str, self.storage_state))
+        makedirs(dirname(path), exist_ok=True)
+        return path
+
+    def _storage_state_meta_path(self) -> str:
+        return f"{self.storage_state}.meta.json"
+
+    def _storage_state_is_fresh(self) -> bool:
+        """
+        Whether the saved storage state was validated recently enough to trust
+        """
+        if not self.saved_storage_state():
+            return False
+
+        try:
+            with open(self._storage_state_meta_path(), encoding="utf-8") as file:
+                validated_at = float(json.load(file)["validated_at"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+
+        return time() - validated_at < config.storage_state_max_age
+
+    def _mark_storage_state_validated(self) -> None:
+        with atomic_write(self._storage_state_meta_path()) as file:
+            json.dump({"validated_at": time()}, file)
+
+    def _has_session(self, cookies: list[Cookie]) -> bool:
+        return any(
+            c["name"] == config.selectors.login.cookie_of_interest for c in cookies
+        )
+
+    def _check_has_cookies(self) -> None:
+        if not self.cookies:
+            raise InsufficientAuth(
+                "No valid authentication source found. Provide a valid cookies file, cookies list/string, sessionid, or username/password."
+            )
+
+    def _report_rejected_cookies(self) -> None:
+        for rejected in self.rejected_cookies:
+            logger.warning(
+                "Cookie %s was not installed: %s", rejected["name"], rejected["reason"]
+            )
+
+    def _check_redirect(self, current_url: str, cookies: list[Cookie]) -> None:
+        """
+        Fails if we were redirected away from TikTok without a sessionid cookie
+        """
+        has_sessionid = any(c["name"] == "sessionid" for c in cookies)
+        if not has_sessionid:
+            logger.error(f"Redirected to {current_url} and sessionid cookie is missing")
+            raise InsufficientAuth(
+                f"Authentication failed: Redirected to {current_url}. Please ensure your cookies are valid and include a sessionid."
+            )
+
     def _resolve_cookies(self) -> list[Cookie]:
         resolved_cookies: list[Cookie] = []
 
@@ -210,6 +394,74 @@ class AuthBackend:
         return return_cookies
 
 
+_SAME_SITE = {
+    "strict": "Strict",
+    "lax": "Lax",
+    "none": "None",
+    "no_restriction": "None",
+}
+
+
+def normalize_cookies(
+    cookies: list[Cookie], now: float | None = None
+) -> tuple[list[Cookie], list[CookieRejection]]:
+    """
+    Validates and converts cookies into the shape `BrowserContext.add_cookies` takes
+
+    Returns the installable cookies and a report of the ones that were dropped.
+    """
+    now = time() if now is None else now
+    default_domain = "." + (
+        urlparse(str(config.paths.main)).hostname or ""
+    ).removeprefix("www.")
+
+    normalized: list[Cookie] = []
+    rejected: list[CookieRejection] = []
+    for cookie in cookies:
+        name = cookie.get("name")
+        if not name or cookie.get("value") is None:
+            rejected.append({"name": name or "", "reason": "missing name or value"})
+            continue
+
+        c: Cookie = {"name": name, "value": str(cookie["value"])}
+
+        # domain may be given as a URL (e.g. https://tiktok.com)
+        domain = cookie.get("domain") or default_domain
+        if "://" in domain:
+            domain = urlparse(domain).hostname or default_domain
+        c["domain"] = domain
+        c["path"] = cookie.get("path") or "/"
+
+        expires = cookie.get("expires", cookie.get("expiry"))
+        if expires not in (None, ""):
+            try:
+                expires = int(float(cast(Any, expires)))
+            except (TypeError, ValueError):
+                expires = None  # unparseable dates become session cookies
+            if expires is not None and expires > 0:
+                if expires < now:
+                    rejected.append({"name": name, "reason": "expired"})
+                    continue
+                c["expires"] = expires
+
+        if "secure" in cookie:
+            c["secure"] = bool(cookie["secure"])
+        if "httpOnly" in cookie:
+            c["httpOnly"] = bool(cookie["httpOnly"])
+
+        # Playwright requires strict types for sameSite
+        same_site = _SAME_SITE.get(str(cookie.get("sameSite", "")).lower())
+        if same_site:
+            c["sameSite"] = same_site
+            # browsers drop SameSite=None cookies that are not secure
+            if same_site == "None":
+                c["secure"] = True
+
+        normalized.append(c)
+
+    return normalized, rejected
+
+
 def login_accounts(
     page: Page | None = None, accounts=[(None, None)], *args, **kwargs
 ) -> dict[str, list[Cookie]]:
@@ -257,17 +509,18 @@ def login(page: Page, username: str, password: str) -> list[Cookie]:
     page.goto(str(config.paths.login))
 
     # selects and fills the login and the password
-    username_field = page.locator(f"xpath={config.selectors.login.username_field}")
-    username_field.wait_for(state="visible", timeout=config.explicit_wait * 1000)
+    username_field = resolve(page, "login.username_field", config.explicit_wait)
+    with adaptive("login_form", config.explicit_wait) as timeout:
+        username_field.wait_for(state="visible", timeout=timeout)
     username_field.clear()
     username_field.fill(username)
 
-    password_field = page.locator(f"xpath={config.selectors.login.password_field}")
+    password_field = locate(page, "login.password_field")
     password_field.clear()
     password_field.fill(password)
 
     # submits the form
-    submit = page.locator(f"xpath={config.selectors.login.login_button}")
+    submit = locate(page, "login.login_button")
     submit.click()
 
     print(f"Complete the captcha for {username}")
@@ -287,16 +540,69 @@ def login(page: Page, username: str, password: str) -> list[Cookie]:
     # page.wait_for_url(lambda url: str(config.paths.login) not in url) # simplified
     # or just wait for it to not be login
     try:
-        page.wait_for_function(
-            f"window.location.href !== '{config.paths.login}'",
-            timeout=config.explicit_wait * 1000,
-        )
+        with adaptive("login_redirect", config.explicit_wait) as timeout:
+            page.wait_for_function(
+                f"window.location.href !== '{config.paths.login}'", timeout=timeout
+            )
     except Exception:
         pass  # might have already changed
 
     return page.context.cookies()  # type: ignore[return-value]
 
 
+async def login_async(page: AsyncPage, username: str, password: str) -> list[Cookie]:
+    """
+    Logs in the user using the email and password on an asyncio page
+    """
+    assert username and password, "Username and password are required"
+
+    if str(config.paths.main) not in page.url:
+        await page.goto(str(config.paths.main))
+
+    cookies = await page.context.cookies()
+    if any(c["name"] == config.selectors.login.cookie_of_interest for c in cookies):
+        await page.context.clear_cookies()
+
+    await page.goto(str(config.paths.login))
+
+    username_field = await resolve_async(
+        page, "login.username_field", config.explicit_wait
+    )
+    with adaptive("login_form", config.explicit_wait) as timeout:
+        await username_field.wait_for(state="visible", timeout=timeout)
+    await username_field.clear()
+    await username_field.fill(username)
+
+    password_field = locate(page, "login.password_field")
+    await password_field.clear()
+    await password_field.fill(password)
+
+    submit = locate(page, "login.login_button")
+    await submit.click()
+
+    print(f"Complete the captcha for {username}")
+
+    # Wait until the session id cookie is set
+    start_time = time()
+    while True:
+        cookies = await page.context.cookies()
+        if any(c["name"] == config.selectors.login.cookie_of_interest for c in cookies):
+            break
+        await asyncio.sleep(0.5)
+        if time() - start_time > config.explicit_wait:
+            raise InsufficientAuth()
+
+    try:
+        with adaptive("login_redirect", config.explicit_wait) as timeout:
+            await page.wait_for_function(
+                f"window.location.href !== '{config.paths.login}'", timeout=timeout
+            )
+    except Exception:
+        pass  # might have already changed
+
+    return await page.context.cookies()  # type: ignore[return-value]
+
+
 def get_username_and_password(login_info: tuple | dict):
     """
     Parses the input into a username and password
@@ -342,5 +648,7 @@ class InsufficientAuth(Exception):
             - only the `sessionid` cookie is required
     """
 
+    error_class = "auth"
+
     def __init__(self, message: str | None = None):
         super().__init__(message or self.__doc__)
@@ -1,38 +1,406 @@
 """Gets the browser's given the user's input"""
 
+import json
+import threading
+import weakref
+from fnmatch import fnmatchcase
 from typing import Any, Literal
 
-from playwright.sync_api import Page, sync_playwright
+from playwright.async_api import Page as AsyncPage
+from playwright.async_api import Playwright as AsyncPlaywright
+from playwright.async_api import Route as AsyncRoute
+from playwright.sync_api import Browser, Page, Playwright, Route, sync_playwright
 
-from tiktok_uploader import config
-from tiktok_uploader.types import ProxyDict
+from tiktok_uploader import config, logger
+from tiktok_uploader.settings import RouteProfile
+from tiktok_uploader.spans import timed
+from tiktok_uploader.types import ProxyDict, RouteStats
 
 # Type alias for supported browsers
 browser_t = Literal["chrome", "firefox", "webkit", "edge", "safari", "chromium"]
 
+# Masks navigator.webdriver in every page of a context
+WEBDRIVER_INIT_SCRIPT = """
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => undefined
+    });
+"""
 
+
+# Typical transfer sizes, used to estimate what blocking a request saved
+ESTIMATED_BYTES = {
+    "image": 30_000,
+    "media": 500_000,
+    "font": 40_000,
+    "script": 60_000,
+    "stylesheet": 20_000,
+    "xhr": 2_000,
+    "fetch": 2_000,
+    "ping": 500,
+}
+
+RouteAction = Literal["block", "stub", "continue"]
+
+# Browsers reached through `browser_endpoint`, which cannot read local files
+REMOTE_BROWSERS: "weakref.WeakSet[Any]" = weakref.WeakSet()
+
+# IANA timezone of each context, pinned by `browser_timezone` or read once
+CONTEXT_TIMEZONES: "weakref.WeakKeyDictionary[Any, str]" = weakref.WeakKeyDictionary()
+
+TIMEZONE_JS = "Intl.DateTimeFormat().resolvedOptions().timeZone"
+
+
+class RouteFilter:
+    """
+    Aborts or stubs the requests a profile from `config.route_profiles` matches
+
+    Installed on a whole context, so every tab and navigation is filtered. Stubbed
+    requests get an empty response instead of failing, for scripts the page waits
+    on. Chromium skips its HTTP cache while a context has routes.
+    """
+
+    def __init__(self, profile: RouteProfile) -> None:
+        self.profile = profile
+        self.stats: RouteStats = {
+            "blocked": 0,
+            "stubbed": 0,
+            "bytes_saved": 0,
+            "by_resource_type": {},
+        }
+
+    @classmethod
+    def from_config(cls, name: str | None = None) -> "RouteFilter | None":
+        """
+        Builds the filter for a named profile, by default `config.route_profile`
+
+        Returns None when no profile is selected.
+        """
+        name = config.route_profile if name is None else name
+        if not name:
+            return None
+        if name not in config.route_profiles:
+            raise ValueError(f"Unknown route profile: {name}")
+        return cls(config.route_profiles[name])
+
+    def action(self, resource_type: str, url: str) -> RouteAction:
+        """
+        Decides what to do with a request
+        """
+        if resource_type == "document":
+            return "continue"
+        if any(fnmatchcase(url, p) for p in self.profile.stub_url_patterns):
+            return "stub"
+        if resource_type in self.profile.block_resource_types or any(
+            fnmatchcase(url, p) for p in self.profile.block_url_patterns
+        ):
+            return "block"
+        return "continue"
+
+    def handle(self, route: Route) -> None:
+        """
+        `BrowserContext.route` handler
+        """
+        action = self._count(route.request.resource_type, route.request.url)
+        if action == "block":
+            route.abort("blockedbyclient")
+        elif action == "stub":
+            route.fulfill(status=204, body="")
+        else:
+            route.fallback()
+
+    async def handle_async(self, route: AsyncRoute) -> None:
+        """
+        asyncio `BrowserContext.route` handler
+        """
+        action = self._count(route.request.resource_type, route.request.url)
+        if action == "block":
+            await route.abort("blockedbyclient")
+        elif action == "stub":
+            await route.fulfill(status=204, body="")
+        else:
+            await route.fallback()
+
+    def _count(self, resource_type: str, url: str) -> RouteAction:
+        action = self.action(resource_type, url)
+        if action == "continue":
+            return action
+
+        self.stats["blocked" if action == "block" else "stubbed"] += 1
+        self.stats["bytes_saved"] += ESTIMATED_BYTES.get(resource_type, 0)
+        by_type = self.stats["by_resource_type"]
+        by_type[resource_type] = by_type.get(resource_type, 0) + 1
+        return action
+
+
+class PlaywrightRuntime:
+    """
+    Reference-counted Playwright driver shared by every sync browser in a thread
+
+    One browser is launched per (browser name, headless, launch args) key, or
+    connected to per remote endpoint, and each `get_browser` call only opens a new
+    context on it. The driver is stopped once the last browser is released.
+
+    Playwright's sync API is bound to the thread that started it, so there is one
+    runtime per thread rather than per process.
+    """
+
+    _local = threading.local()
+
+    def __init__(self) -> None:
+        self._playwright: Playwright | None = None
+        self._browsers: dict[str, Browser] = {}
+        self._refs: dict[str, int] = {}
+
+    @classmethod
+    def instance(cls) -> "PlaywrightRuntime":
+        runtime = getattr(cls._local, "runtime", None)
+        if runtime is None:
+            runtime = cls._local.runtime = cls()
+        return runtime
+
+    def acquire(
+        self,
+        name: browser_t,
+        launch_args: dict[str, Any],
+        endpoint: str = "",
+        protocol: str = "playwright",
+    ) -> Browser:
+        """
+        Returns a running browser for the key, launching it on first use
+
+        With an `endpoint` the browser is connected to instead (see `_connect`).
+        """
+        key = f"{name}:{json.dumps(launch_args, sort_keys=True)}"
+        if endpoint:
+            key = f"{protocol}:{endpoint}:{key}"
+
+        browser = self._browsers.get(key)
+        if browser is None or not browser.is_connected():
+            if self._playwright is None:
+                self._playwright = sync_playwright().start()
+            if endpoint:
+                browser = _connect(
+                    self._playwright, name, launch_args, endpoint, protocol
+                )
+                REMOTE_BROWSERS.add(browser)
+            else:
+                browser_type = _browser_type(self._playwright, name)
+                browser = browser_type.launch(**launch_args)
+            self._browsers[key] = browser
+            self._refs[key] = 0
+
+        self._refs[key] += 1
+        return browser
+
+    def release(self, browser: Browser) -> bool:
+        """
+        Drops one reference to the browser, closing it (and the driver) when unused
+
+        Returns False if the browser is not managed by this runtime.
+        """
+        key = next((k for k, b in self._browsers.items() if b is browser), None)
+        if key is None:
+            return False
+
+        self._refs[key] -= 1
+        if self._refs[key] <= 0:
+            del self._browsers[key], self._refs[key]
+            try:
+                browser.close()
+            except Exception as e:
+                logger.debug(f"Error closing browser: {e}")
+
+        if not self._browsers:
+            self.shutdown()
+        return True
+
+    def shutdown(self) -> None:
+        """
+        Closes every browser and stops the driver
+        """
+        for browser in self._browsers.values():
+            try:
+                browser.close()
+            except Exception as e:
+                logger.debug(f"Error closing browser: {e}")
+        self._browsers.clear()
+        self._refs.clear()
+
+        if self._playwright is not None:
+            try:
+                self._playwright.stop()
+            except Exception as e:
+                logger.debug(f"Error stopping playwright: {e}")
+            self._playwright = None
+
+
+@timed("get_browser")
 def get_browser(
     name: browser_t = "chrome",
     headless: bool = False,
     proxy: ProxyDict | None = None,
     *args,
+    storage_state: str | None = None,
+    route_filter: RouteFilter | None = None,
+    endpoint: str | None = None,
     **kwargs,
 ) -> Page:
     """
     Gets a browser based on the name with the ability to pass in additional arguments
+
+    Browsers are shared through `PlaywrightRuntime`, so this usually only costs a
+    new context. Hand the page back with `close_browser` when done.
+
+    `storage_state` is a file saved by `BrowserContext.storage_state` to restore
+    cookies and localStorage from. `route_filter` is installed on the context.
+    `endpoint` is a remote browser to connect to, defaulting to
+    `config.browser_endpoint`; "" launches one locally.
     """
-    p = sync_playwright().start()
+    endpoint = config.browser_endpoint if endpoint is None else endpoint
+    browser = PlaywrightRuntime.instance().acquire(
+        name, _launch_args(name, headless), endpoint, config.browser_protocol
+    )
+
+    context = browser.new_context(**_context_args(proxy, storage_state))
+    if config.browser_timezone:
+        CONTEXT_TIMEZONES[context] = config.browser_timezone
+
+    # Add init script to mask webdriver
+    context.add_init_script(WEBDRIVER_INIT_SCRIPT)
+    if route_filter is not None:
+        context.route("**/*", route_filter.handle)
+
+    page = context.new_page()
+    page.set_default_timeout(config.implicit_wait * 1000)  # Convert seconds to ms
+
+    return page
+
+
+def close_browser(page: Page) -> None:
+    """
+    Closes the page's context and releases its browser back to the runtime
+
+    Browsers not launched by `get_browser` are closed outright.
+    """
+    context = page.context
+    browser = context.browser
+    try:
+        context.close()
+    except Exception as e:
+        logger.debug(f"Error closing context: {e}")
+
+    if browser is not None and not PlaywrightRuntime.instance().release(browser):
+        browser.close()
 
-    # Map browser names to Playwright launch functions
+
+@timed("get_browser")
+async def get_async_browser(
+    playwright: AsyncPlaywright,
+    name: browser_t = "chrome",
+    headless: bool = False,
+    proxy: ProxyDict | None = None,
+    *args,
+    storage_state: str | None = None,
+    route_filter: RouteFilter | None = None,
+    endpoint: str | None = None,
+    **kwargs,
+) -> AsyncPage:
+    """
+    Gets an asyncio browser from an already started `async_playwright()` instance
+
+    The caller owns `playwright` and is responsible for stopping it. `endpoint` is
+    as for `get_browser`.
+    """
+    endpoint = config.browser_endpoint if endpoint is None else endpoint
+    launch_args = _launch_args(name, headless)
+    if endpoint:
+        browser = await _connect(
+            playwright, name, launch_args, endpoint, config.browser_protocol
+        )
+        REMOTE_BROWSERS.add(browser)
+    else:
+        browser = await _browser_type(playwright, name).launch(**launch_args)
+
+    context = await browser.new_context(**_context_args(proxy, storage_state))
+    if config.browser_timezone:
+        CONTEXT_TIMEZONES[context] = config.browser_timezone
+    await context.add_init_script(WEBDRIVER_INIT_SCRIPT)
+    if route_filter is not None:
+        await context.route("**/*", route_filter.handle_async)
+
+    page = await context.new_page()
+    page.set_default_timeout(config.implicit_wait * 1000)  # Convert seconds to ms
+
+    return page
+
+
+def _browser_type(p: Any, name: browser_t) -> Any:
+    """
+    Maps browser names to Playwright browser types
+    """
     if name == "chrome" or name == "edge" or name == "chromium":
-        browser_type = p.chromium
+        return p.chromium
     elif name == "firefox":
-        browser_type = p.firefox
+        return p.firefox
     elif name == "webkit" or name == "safari":
-        browser_type = p.webkit
+        return p.webkit
     else:
-        browser_type = p.chromium  # Default to chromium
+        return p.chromium  # Default to chromium
+
+
+def is_remote(page: Page | AsyncPage) -> bool:
+    """
+    Whether the page's browser was connected to through an endpoint
+    """
+    return page.context.browser in REMOTE_BROWSERS
+
+
+def page_timezone(page: Page) -> str:
+    """
+    The IANA timezone the page's dates are shown in
+    """
+    context = page.context
+    if context not in CONTEXT_TIMEZONES:
+        CONTEXT_TIMEZONES[context] = page.evaluate(TIMEZONE_JS)
+    return CONTEXT_TIMEZONES[context]
+
 
+async def page_timezone_async(page: AsyncPage) -> str:
+    """
+    asyncio version of `page_timezone`
+    """
+    context = page.context
+    if context not in CONTEXT_TIMEZONES:
+        CONTEXT_TIMEZONES[context] = await page.evaluate(TIMEZONE_JS)
+    return CONTEXT_TIMEZONES[context]
+
+
+def _connect(
+    p: Any,
+    name: browser_t,
+    launch_args: dict[str, Any],
+    endpoint: str,
+    protocol: str,
+) -> Any:
+    """
+    Connects to a remote browser, returning a coroutine for the asyncio API
+
+    A `playwright run-server` launches the browser itself, with the launch
+    arguments passed in a header. CDP endpoints are always Chromium.
+    """
+    if protocol == "cdp":
+        if _browser_type(p, name) is not p.chromium:
+            raise ValueError(f"CDP endpoints only serve Chromium browsers, not {name}")
+        return p.chromium.connect_over_cdp(endpoint)
+
+    headers = {"x-playwright-launch-options": json.dumps(launch_args)}
+    return _browser_type(p, name).connect(endpoint, headers=headers)
+
+
+def _launch_args(name: browser_t, headless: bool) -> dict[str, Any]:
+    """
+    Builds the keyword arguments for `BrowserType.launch`
+    """
     launch_args: dict[str, Any] = {
         "headless": headless,
         "args": [
@@ -45,36 +413,34 @@ def get_browser(
     elif name == "edge":
         launch_args["channel"] = "msedge"
 
-    if proxy:
-        launch_args["proxy"] = {
-            "server": f"{proxy['host']}:{proxy['port']}",
-        }
-        if "user" in proxy and "password" in proxy:
-            launch_args["proxy"]["username"] = proxy["user"]
-            launch_args["proxy"]["password"] = proxy["password"]
+    return launch_args
 
-    browser = browser_type.launch(**launch_args)
 
-    # Create a new context with stealth-like options if needed
-    # For now, we use standard context but set locale/timezone if passed in kwargs
-    # or rely on defaults.
+def _context_args(
+    proxy: ProxyDict | None = None, storage_state: str | None = None
+) -> dict[str, Any]:
+    """
+    Builds the keyword arguments for `Browser.new_context`
 
+    The proxy is set per context so browsers can be shared between proxies.
+    """
     context_args: dict[str, Any] = {
         "viewport": {"width": 1280, "height": 720},
         "user_agent": config.disguising.user_agent,
         "locale": "en-US",
     }
+    if config.browser_timezone:
+        context_args["timezone_id"] = config.browser_timezone
 
-    context = browser.new_context(**context_args)
-
-    # Add init script to mask webdriver
-    context.add_init_script("""
-        Object.defineProperty(navigator, 'webdriver', {
-            get: () => undefined
-        });
-    """)
+    if proxy:
+        context_args["proxy"] = {
+            "server": f"{proxy['host']}:{proxy['port']}",
+        }
+        if "user" in proxy and "password" in proxy:
+            context_args["proxy"]["username"] = proxy["user"]
+            context_args["proxy"]["password"] = proxy["password"]
 
-    page = context.new_page()
-    page.set_default_timeout(config.implicit_wait * 1000)  # Convert seconds to ms
+    if storage_state:
+        context_args["storage_state"] = storage_state
 
-    return page
+    return context_args
@@ -0,0 +1,170 @@
+"""Keeps the same video from being posted twice by hashing its content"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import threading
+from os.path import abspath, exists
+from time import time
+
+from tiktok_uploader import config
+from tiktok_uploader.types import DedupPolicy, HashEntry, PostedEntry
+from tiktok_uploader.utils import atomic_write
+
+logger = logging.getLogger(__name__)
+
+# Bytes fed to the hash at a time; slices of the mapping are never copied
+CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def content_hash(path: str, chunk_size: int = CHUNK_SIZE) -> str:
+    """
+    SHA-256 of a file, read through a memory map so large videos are paged in
+    and out by the OS instead of being loaded into memory
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        if not size:
+            return digest.hexdigest()  # empty files cannot be mapped
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mapped, "madvise"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            view = memoryview(mapped)
+            try:
+                for offset in range(0, size, chunk_size):
+                    digest.update(view[offset : offset + chunk_size])
+            finally:
+                view.release()
+    return digest.hexdigest()
+
+
+class DuplicateVideo(Exception):
+    """
+    The video was skipped, its content was already posted or is being posted
+    """
+
+    error_class = "validation"
+
+
+class DedupIndex:
+    """
+    Remembers the content hash of every video an account posted
+
+    Hashes are cached by (path, size, mtime), so checking a file seen before
+    only costs a `stat`. With a `path` the index is kept in that (per-account)
+    JSON file, otherwise only in memory.
+
+    `policy` (`config.dedup_policy`) decides what happens to a duplicate:
+    "skip" it, "warn" and post it anyway, or "force" it without checking. A
+    video let through is reserved until it is recorded or released, so a copy
+    uploading at the same time counts as a duplicate too.
+    """
+
+    def __init__(self, path: str | None = None, policy: DedupPolicy | None = None):
+        self.path = abspath(path) if path else None
+        self.policy: DedupPolicy = policy or config.dedup_policy
+        self.hashes: dict[str, HashEntry] = {}
+        self.posted: dict[str, PostedEntry] = {}
+        self.reserved: dict[str, str] = {}  # hashes of uploads in flight, by path
+        self._lock = threading.Lock()
+        self._load()
+
+    def digest(self, path: str) -> str:
+        """
+        Returns the content hash of a file, from the cache while it is unchanged
+        """
+        path = abspath(path)
+        stat = os.stat(path)
+        entry = self.hashes.get(path)
+        if (
+            entry is not None
+            and entry["size"] == stat.st_size
+            and entry["mtime_ns"] == stat.st_mtime_ns
+        ):
+            return entry["sha256"]
+
+        sha256 = content_hash(path)
+        self.hashes[path] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha256,
+        }
+        return sha256
+
+    def duplicate_of(self, path: str) -> PostedEntry | None:
+        """
+        Returns the earlier post of the same content, if there was one
+        """
+        return self.posted.get(self.digest(path))
+
+    def allow(self, path: str) -> bool:
+        """
+        Applies the policy to a video about to be uploaded, reserving its content
+        until `record` or `release` when it may go ahead
+        """
+        if self.policy == "force":
+            return True
+
+        digest = self.digest(path)
+        with self._lock:
+            earlier = self.posted.get(digest)
+            uploading = self.reserved.get(digest)
+            if earlier is None and uploading is None:
+                self.reserved[digest] = abspath(path)
+                return True
+
+        if earlier is not None:
+            message = (
+                f"{path} has the same content as {earlier['path']}, already posted"
+            )
+        else:
+            message = f"{path} has the same content as {uploading}, being posted"
+        if self.policy == "warn":
+            logger.warning(message)
+            return True
+        logger.info(f"Skipping {message}")
+        return False
+
+    def record(self, path: str) -> None:
+        """
+        Records a video as posted and saves the index
+        """
+        digest = self.digest(path)
+        with self._lock:
+            self.posted[digest] = {"path": abspath(path), "posted_at": time()}
+            self.reserved.pop(digest, None)
+        self.save()
+
+    def release(self, path: str) -> None:
+        """
+        Drops the reservation of a video whose upload failed
+        """
+        path = abspath(path)
+        with self._lock:
+            self.reserved = {d: p for d, p in self.reserved.items() if p != path}
+
+    def save(self) -> None:
+        """
+        Writes the index (including newly computed hashes) atomically
+        """
+        if self.path is None:
+            return
+
+        with atomic_write(self.path) as file:
+            json.dump({"hashes": self.hashes, "posted": self.posted}, file)
+
+    def _load(self) -> None:
+        if self.path is None or not exists(self.path):
+            return
+
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                data = json.load(file)
+            self.hashes = data.get("hashes", {})
+            self.posted = data.get("posted", {})
+        except (OSError, ValueError) as e:
+            logger.debug(f"Ignoring unreadable dedup index {self.path}: {e}")
@@ -0,0 +1,131 @@
+"""
+Rewrites MP4/MOV files so their `moov` box comes before the media data
+
+Encoders often write `moov` last, which makes TikTok read the whole upload
+before it can start processing. The rewrite streams the file box by box into a
+staging file, so only `moov` itself is held in memory, and shifts the chunk
+offsets in `stco`/`co64` by the size of the moved box. Rewritten files are kept
+in `config.faststart_cache`, keyed by (path, size, mtime), and reused.
+"""
+
+import hashlib
+import logging
+import os
+import struct
+from os.path import abspath, basename, exists, expanduser, join, splitext
+from typing import BinaryIO
+
+from tiktok_uploader import config
+from tiktok_uploader.media import MAX_METADATA_SIZE, _boxes, _file_boxes, preflight
+from tiktok_uploader.utils import atomic_write, green
+
+logger = logging.getLogger(__name__)
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Boxes on the path from moov down to the chunk offset tables
+CONTAINERS = {b"trak", b"mdia", b"minf", b"stbl"}
+
+
+def faststart(path: str, cache_dir: str | None = None) -> str:
+    """
+    Returns a faststart copy of an MP4/MOV file, or the path itself when it
+    already is faststart, is another container or cannot be rewritten
+    """
+    path = abspath(path)
+    info = preflight(path)
+    if info["container"] not in ("mp4", "mov") or info["faststart"] is not False:
+        return path
+
+    stat = os.stat(path)
+    directory = expanduser(cache_dir or config.faststart_cache)
+    key = hashlib.sha1(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    name, extension = splitext(basename(path))
+    staged = join(directory, f"{name}-{key.hexdigest()[:16]}{extension}")
+    if exists(staged):
+        logger.debug(green(f"Reusing faststart copy of {basename(path)}"))
+        return staged
+
+    try:
+        with open(path, "rb") as source, atomic_write(staged, "wb") as target:
+            rewrite(source, target, stat.st_size)
+    except (ValueError, struct.error) as e:
+        logger.debug(f"Uploading {path} as is, it cannot be made faststart: {e}")
+        return path
+
+    logger.debug(green(f"Moved the moov box of {basename(path)} to the front"))
+    return staged
+
+
+def rewrite(source: BinaryIO, target: BinaryIO, size: int) -> None:
+    """
+    Streams `source` into `target` with `moov` moved right after `ftyp`
+    """
+    boxes = list(_file_boxes(source, size))
+    kinds = [kind for kind, _, _ in boxes]
+    if b"moof" in kinds:
+        raise ValueError("fragmented files are already streamable")
+    if kinds.count(b"moov") != 1:
+        raise ValueError("expected exactly one moov box")
+
+    index = kinds.index(b"moov")
+    _, moov_start, moov_end = boxes[index]
+    moov_at = _box_start(boxes, index)
+    header_size = moov_start - moov_at
+    if moov_end - moov_at > MAX_METADATA_SIZE:
+        raise ValueError("moov box too large")
+
+    source.seek(moov_at)
+    moov = bytearray(source.read(moov_end - moov_at))
+    head = 1 if kinds[0] == b"ftyp" else 0
+    # everything between ftyp and moov moves back by the size of moov
+    shift_from = _box_start(boxes, head) if head < len(boxes) else 0
+    _shift_chunk_offsets(moov, header_size, len(moov), len(moov), shift_from, moov_at)
+
+    order = list(range(head)) + [index]
+    order += [i for i in range(head, len(boxes)) if i != index]
+    for i in order:
+        if i == index:
+            target.write(moov)
+        else:
+            _copy(source, target, _box_start(boxes, i), boxes[i][2])
+
+
+def _box_start(boxes: list[tuple[bytes, int, int]], index: int) -> int:
+    return boxes[index - 1][2] if index else 0
+
+
+def _shift_chunk_offsets(
+    moov: bytearray, start: int, end: int, delta: int, low: int, high: int
+) -> None:
+    """
+    Adds `delta` to every chunk offset in [low, high) of the tables in moov
+    """
+    for kind, box_start, box_end in _boxes(moov, start, end):
+        if kind in CONTAINERS:
+            _shift_chunk_offsets(moov, box_start, box_end, delta, low, high)
+        elif kind in (b"stco", b"co64"):
+            (count,) = struct.unpack_from(">I", moov, box_start + 4)
+            width, limit = (4, 0xFFFFFFFF) if kind == b"stco" else (8, (1 << 64) - 1)
+            code = ">I" if width == 4 else ">Q"
+            for i in range(count):
+                at = box_start + 8 + i * width
+                (offset,) = struct.unpack_from(code, moov, at)
+                if low <= offset < high:
+                    offset += delta
+                    if offset > limit:
+                        raise ValueError("chunk offset overflows stco")
+                    struct.pack_into(code, moov, at, offset)
+        elif kind == b"cmov":
+            raise ValueError("compressed moov boxes are not supported")
+
+
+def _copy(source: BinaryIO, target: BinaryIO, start: int, end: int) -> None:
+    source.seek(start)
+    remaining = end - start
+    while remaining:
+        chunk = source.read(min(remaining, COPY_CHUNK_SIZE))
+        if not chunk:
+            raise ValueError("file ended early")
+        target.write(chunk)
+        remaining -= len(chunk)
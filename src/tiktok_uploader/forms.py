@@ -0,0 +1,406 @@
+"""
+The parts of the upload form shared by `upload` and `async_upload`
+
+Scripts evaluated in the page, and the steps that need no browser: reading a
+video's form arguments, splitting its description and checking its schedule.
+Both uploaders drive the page with these, so a fix here reaches both.
+"""
+
+import datetime
+import logging
+import re
+from os.path import abspath, exists
+from typing import Any, Literal
+
+import pytz
+
+from tiktok_uploader import config
+from tiktok_uploader.faststart import faststart
+from tiktok_uploader.media import preflight
+from tiktok_uploader.mentions import MentionCache
+from tiktok_uploader.planner import ScheduleBounds
+from tiktok_uploader.types import MentionEntry, VideoDict
+from tiktok_uploader.utils import bold
+
+logger = logging.getLogger(__name__)
+
+# Page-side predicates for `page.wait_for_function`, which re-checks them every
+# animation frame and resolves as soon as they hold. They take XPaths, or the
+# "css="/"xpath=" selectors of `locators.SelectorRegistry`
+_FIRST_BY_XPATH = """
+    const first = (xpath) => xpath.startsWith("css=")
+        ? document.querySelector(xpath.slice(4))
+        : document.evaluate(
+            xpath.replace(/^xpath=/, ""), document, null,
+            XPathResult.FIRST_ORDERED_NODE_TYPE, null
+        ).singleNodeValue;
+"""
+
+POST_ENABLED_JS = f"""(xpath) => {{
+    {_FIRST_BY_XPATH}
+    const button = first(xpath);
+    return !!button && button.getAttribute("data-disabled") === "false";
+}}"""
+
+ATTRIBUTE_CHANGED_JS = f"""([xpath, name, previous]) => {{
+    {_FIRST_BY_XPATH}
+    const element = first(xpath);
+    return !!element && element.getAttribute(name) !== previous;
+}}"""
+
+TEXT_EQUALS_JS = f"""([xpath, expected]) => {{
+    {_FIRST_BY_XPATH}
+    const element = first(xpath);
+    return !!element && element.innerText.trim() === expected;
+}}"""
+
+# Resolves true once the popover is visible, or false once the page has gone
+# `settle` ms without a DOM mutation and still shows no popover
+POPOVER_SETTLED_JS = f"""([xpath, settle, timeout]) => {{
+    {_FIRST_BY_XPATH}
+    const visible = () => {{
+        const element = first(xpath);
+        return !!element && element.getClientRects().length > 0;
+    }};
+    if (visible()) return true;
+
+    return new Promise((resolve) => {{
+        let quiet, limit;
+        const finish = (result) => {{
+            observer.disconnect();
+            clearTimeout(quiet);
+            clearTimeout(limit);
+            resolve(result);
+        }};
+        const observer = new MutationObserver(() => {{
+            if (visible()) return finish(true);
+            clearTimeout(quiet);
+            quiet = setTimeout(() => finish(false), settle);
+        }});
+        observer.observe(document.body, {{
+            childList: true, subtree: true, attributes: true, characterData: true,
+        }});
+        quiet = setTimeout(() => finish(false), settle);
+        limit = setTimeout(() => finish(visible()), timeout);
+    }});
+}}"""
+
+# The input of a picker, which is either the element itself or inside it
+_PICKER_INPUT = """
+    const pickerInput = (element) => element && (
+        element.matches("input") ? element : element.querySelector("input")
+    );
+"""
+
+# Types the date and time into the schedule pickers' inputs in one go, false
+# when the widget has no inputs to type into
+SET_SCHEDULE_JS = f"""([dateXpath, timeXpath, date, time]) => {{
+    {_FIRST_BY_XPATH}
+    {_PICKER_INPUT}
+    const inputs = [pickerInput(first(dateXpath)), pickerInput(first(timeXpath))];
+    if (!inputs[0] || !inputs[1]) return false;
+
+    const setValue = Object.getOwnPropertyDescriptor(
+        HTMLInputElement.prototype, "value"
+    ).set;
+    [date, time].forEach((value, i) => {{
+        setValue.call(inputs[i], value);
+        for (const type of ["input", "change", "blur"]) {{
+            inputs[i].dispatchEvent(new Event(type, {{ bubbles: true }}));
+        }}
+    }});
+    return true;
+}}"""
+
+# Whether the pickers show the expected date and time
+SCHEDULE_SHOWN_JS = f"""([dateXpath, timeXpath, date, time]) => {{
+    {_FIRST_BY_XPATH}
+    {_PICKER_INPUT}
+    const shown = (xpath) => {{
+        const element = first(xpath);
+        const input = pickerInput(element);
+        return input ? input.value.trim() : element ? element.innerText.trim() : "";
+    }};
+    return shown(dateXpath) === date && shown(timeXpath) === time;
+}}"""
+
+# Text of every day of the calendar in one round-trip
+DAY_TEXTS_JS = "(elements) => elements.map((element) => element.innerText.trim())"
+
+# Text of every matched element in one round-trip, None for hidden ones
+VISIBLE_TEXTS_JS = """(elements) => elements.map(
+    (element) => element.getClientRects().length > 0 ? element.innerText : null
+)"""
+
+# Hashtags and mentions, which need the editor's autocomplete
+_AUTOCOMPLETE_TOKEN = re.compile(r"(?<!\S)[#@]\S+")
+
+
+# (path, description, schedule, cover_path, product_id, visibility)
+_PreparedVideo = tuple[
+    str,
+    str,
+    datetime.datetime | None,
+    str | None,
+    str | None,
+    Literal["everyone", "friends", "only_you"],
+]
+
+
+def _prepare_video(video: VideoDict) -> _PreparedVideo | None:
+    """
+    Reads the upload form arguments out of a video, or None if it must be skipped
+    """
+    path = abspath(video.get("path", "."))
+    description = video.get("description", "")
+    schedule = video.get("schedule", None)
+    product_id = video.get("product_id", None)
+    cover_path = video.get("cover", None)
+    if cover_path is not None:
+        cover_path = abspath(cover_path)
+
+    visibility = video.get("visibility", "everyone")
+
+    logger.debug(
+        "Posting %s%s",
+        bold(video.get("path", "")),
+        (f"\n{' ' * 15}with description: {bold(description)}" if description else ""),
+    )
+
+    # Video must be of supported type
+    if not _check_valid_path(path):
+        print(f"{path} is invalid, skipping")
+        return None
+
+    # and pass a look at its container, before a browser is involved
+    if config.preflight:
+        problems = preflight(path)["problems"]
+        if problems:
+            logger.warning(
+                "%s is not uploadable (%s), skipping", path, "; ".join(problems)
+            )
+            return None
+    if config.faststart:
+        path = faststart(path)
+
+    # Video must have a valid datetime for tiktok's scheduler
+    if schedule:
+        schedule = _normalize_schedule(schedule, video.get("planned_at"))
+        if schedule is None:
+            return None
+
+    return path, description, schedule, cover_path, product_id, visibility
+
+
+def _split_description(description: str) -> list[tuple[str, str]]:
+    """
+    Splits a description into ("text", run), ("#", hashtag) and ("@", mention) parts
+    """
+    parts: list[tuple[str, str]] = []
+    position = 0
+    for match in _AUTOCOMPLETE_TOKEN.finditer(description):
+        if match.start() > position:
+            parts.append(("text", description[position : match.start()]))
+        parts.append((match.group()[0], match.group()))
+        position = match.end()
+
+    if position < len(description):
+        parts.append(("text", description[position:]))
+    return parts
+
+
+def _pick_mention(
+    texts: list[str | None],
+    mention: str,
+    cached: MentionEntry | None,
+    mention_cache: MentionCache | None,
+) -> int | None:
+    """
+    Finds the row of a mention among the suggestions, looking for the user
+    picked last time first, and records where it was
+
+    The cached position alone is not trusted, TikTok reorders the suggestions.
+    """
+    position, user_id = None, None
+    if cached is not None and cached["user_id"] is not None:
+        position, user_id = _match_mention(texts, f"@{cached['user_id']}")
+    if position is None:
+        position, user_id = _match_mention(texts, mention)
+
+    if mention_cache is not None and (cached is None or cached["position"] != position):
+        mention_cache.put(mention, position, user_id)
+    return position
+
+
+def _match_mention(
+    texts: list[str | None], mention: str
+) -> tuple[int | None, str | None]:
+    """
+    Finds the suggestion matching a mention, given each suggestion's text
+
+    Returns its position in the dropdown and user ID, or (None, None).
+    """
+    target_username = mention[1:].lower()
+    for i, text in enumerate(texts):
+        if text is None:
+            continue
+        user_id = text.split(" ")[0]
+        if user_id.lower() == target_username:
+            return i, user_id
+    return None, None
+
+
+def _check_valid_path(path: str) -> bool:
+    return exists(path) and path.split(".")[-1] in config.supported_file_types
+
+
+def _check_valid_cover_path(path: str) -> bool:
+    return exists(path) and path.split(".")[-1] in config.supported_image_file_types
+
+
+def _normalize_schedule(
+    schedule: datetime.datetime, planned_at: float | None = None
+) -> datetime.datetime | None:
+    """
+    Converts the schedule to a TikTok-valid UTC datetime, or None if it is invalid
+
+    A schedule from `plan` is checked against the bounds of its `planned_at`.
+    """
+    timezone = pytz.UTC
+    if schedule.tzinfo is None:
+        schedule = schedule.astimezone(timezone)
+    elif (utc_offset := schedule.utcoffset()) is not None and int(
+        utc_offset.total_seconds()
+    ) == 0:  # Equivalent to UTC
+        schedule = schedule.astimezone(timezone)
+    else:
+        print(
+            f"{schedule} is invalid, the schedule datetime must be naive or aware with UTC timezone, skipping"
+        )
+        return None
+
+    valid_tiktok_minute_multiple = 5
+    schedule = _get_valid_schedule_minute(schedule, valid_tiktok_minute_multiple)
+    bounds = None
+    if planned_at is not None:
+        bounds = ScheduleBounds(datetime.datetime.fromtimestamp(planned_at, pytz.UTC))
+    if not _check_valid_schedule(schedule, bounds):
+        print(
+            f"{schedule} is invalid, the schedule datetime must be as least 20 minutes in the future, and a maximum of 10 days, skipping"
+        )
+        return None
+
+    return schedule
+
+
+def _get_valid_schedule_minute(
+    schedule: datetime.datetime, valid_multiple
+) -> datetime.datetime:
+    if _is_valid_schedule_minute(schedule.minute, valid_multiple):
+        return schedule
+    else:
+        return _set_valid_schedule_minute(schedule, valid_multiple)
+
+
+def _is_valid_schedule_minute(minute: int, valid_multiple) -> bool:
+    if minute % valid_multiple != 0:
+        return False
+    else:
+        return True
+
+
+def _set_valid_schedule_minute(
+    schedule: datetime.datetime, valid_multiple: int
+) -> datetime.datetime:
+    minute = schedule.minute
+    remainder = minute % valid_multiple
+    integers_to_valid_multiple = 5 - remainder
+    schedule += datetime.timedelta(minutes=integers_to_valid_multiple)
+    return schedule
+
+
+def _check_valid_schedule(
+    schedule: datetime.datetime, bounds: ScheduleBounds | None = None
+) -> bool:
+    return (bounds or ScheduleBounds()).check([schedule.timestamp()])[0]
+
+
+def _convert_videos_dict(
+    videos_list_of_dictionaries: list[dict[str, Any]],
+) -> list[VideoDict]:
+    if not videos_list_of_dictionaries:
+        raise RuntimeError("No videos to upload")
+
+    valid_path = config.valid_path_names
+    valid_description = config.valid_descriptions
+
+    correct_path = valid_path[0]
+    correct_description = valid_description[0]
+
+    def intersection(lst1, lst2):
+        return list(set(lst1) & set(lst2))
+
+    return_list: list[VideoDict] = []
+    for elem in videos_list_of_dictionaries:
+        elem = {k.strip().lower(): v for k, v in elem.items()}
+        keys = elem.keys()
+        path_intersection = intersection(valid_path, keys)
+        description_intersection = intersection(valid_description, keys)
+
+        if path_intersection:
+            path = elem[path_intersection.pop()]
+            if not _check_valid_path(path):
+                raise RuntimeError("Invalid path: " + path)
+            elem[correct_path] = path
+        else:
+            for _, value in elem.items():
+                if _check_valid_path(value):
+                    elem[correct_path] = value
+                    break
+            else:
+                raise RuntimeError("Path not found in dictionary: " + str(elem))
+
+        if description_intersection:
+            elem[correct_description] = elem[description_intersection.pop()]
+        else:
+            for _, value in elem.items():
+                if not _check_valid_path(value):
+                    elem[correct_description] = value
+                    break
+            else:
+                elem[correct_description] = ""
+
+        return_list.append(elem)  # type: ignore
+
+    return return_list
+
+
+class DescriptionTooLong(Exception):
+    error_class = "validation"
+
+    def __init__(self, message: str | None = None):
+        super().__init__(message or self.__doc__)
+
+
+class FailedToUpload(Exception):
+    def __init__(self, message=None):
+        super().__init__(message or self.__doc__)
+
+
+class VideoNotProcessed(FailedToUpload):
+    """
+    TikTok did not finish processing the video in time
+    """
+
+    error_class = "timeout"
+
+
+class PostNotConfirmed(FailedToUpload):
+    """
+    The post button was clicked but TikTok never confirmed the post
+    """
+
+    error_class = "timeout"
+
+    # the video may be posted, so trying again could post it twice
+    retryable = False
@@ -0,0 +1,446 @@
+"""
+A persistent upload queue backed by SQLite
+
+Every video is a job that moves from "pending" to "in_progress" (leased by a
+worker) to "posted", "skipped" (a duplicate, see `dedup`) or "failed". The
+database runs in WAL mode, so several local workers can share one file:
+
+    from tiktok_uploader.jobs import JobQueue, work
+
+    queue = JobQueue("backlog.db")
+    queue.add(videos, account="main")
+    work(queue, TikTokUploader(cookies="cookies.txt"), account="main")
+
+A worker that dies leaves its jobs leased; once the lease runs out they are
+handed to the next worker. A job leased when the process died may already have
+been posted, so resuming is at-least-once.
+
+Key Classes
+-----------
+JobQueue : The job store
+"""
+
+import datetime
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import deque
+from collections.abc import Iterable
+from os.path import abspath
+from typing import Any, cast
+
+from tiktok_uploader import config
+from tiktok_uploader.dedup import DuplicateVideo
+from tiktok_uploader.retry import CircuitOpen
+from tiktok_uploader.store import Transaction, connect, worker_name
+from tiktok_uploader.types import Job, JobState, VideoDict
+from tiktok_uploader.upload import TikTokUploader, _convert_videos_dict
+from tiktok_uploader.utils import green, red
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account TEXT NOT NULL DEFAULT '',
+    video TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    worker TEXT,
+    leased_until REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, account, id);
+"""
+
+COLUMNS = "id, account, video, state, attempts, error, worker, leased_until, created_at, updated_at"
+
+
+class JobQueue:
+    """
+    Upload jobs with their state, attempt count, timestamps and last error
+
+    Jobs are leased for `lease` seconds (`config.job_lease`), which must cover
+    an upload, and given up on after `max_attempts` (`config.job_max_attempts`).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        lease: float | None = None,
+        max_attempts: int | None = None,
+    ) -> None:
+        self.path = abspath(path)
+        self.lease_seconds = config.job_lease if lease is None else lease
+        self.max_attempts = (
+            config.job_max_attempts if max_attempts is None else max_attempts
+        )
+        self._db = connect(self.path, SCHEMA)
+        self._lock = threading.Lock()
+
+    def add(self, videos: Iterable[VideoDict], account: str = "") -> list[int]:
+        """
+        Queues videos as pending jobs and returns their IDs
+        """
+        now = time.time()
+        rows = [(account, _dump_video(video), now, now) for video in videos]
+        ids = []
+        with self._transaction() as db:
+            for row in rows:
+                cursor = db.execute(
+                    "INSERT INTO jobs (account, video, created_at, updated_at)"
+                    " VALUES (?, ?, ?, ?)",
+                    row,
+                )
+                ids.append(cast(int, cursor.lastrowid))
+        return ids
+
+    def lease(
+        self, worker: str, limit: int = 1, account: str | None = None
+    ) -> list[Job]:
+        """
+        Atomically hands up to `limit` jobs to a worker, oldest first
+
+        Pending jobs and jobs whose lease ran out are both eligible. Leasing
+        counts as an attempt; an expired job out of attempts is failed instead.
+        """
+        now = time.time()
+        scope, params = (
+            ("AND account = ?", [account]) if account is not None else ("", [])
+        )
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE jobs SET state = 'failed', updated_at = ?,"
+                " error = coalesce(error, 'lease expired') || ' (gave up)'"
+                " WHERE state = 'in_progress' AND leased_until < ? AND attempts >= ?"
+                f" {scope}",
+                [now, now, self.max_attempts, *params],
+            )
+            ids = [
+                row["id"]
+                for row in db.execute(
+                    "SELECT id FROM jobs WHERE (state = 'pending'"
+                    " OR (state = 'in_progress' AND leased_until < ?))"
+                    f" {scope} ORDER BY id LIMIT ?",
+                    [now, *params, limit],
+                )
+            ]
+            for job_id in ids:
+                db.execute(
+                    "UPDATE jobs SET state = 'in_progress', attempts = attempts + 1,"
+                    " worker = ?, leased_until = ?, updated_at = ? WHERE id = ?",
+                    (worker, now + self.lease_seconds, now, job_id),
+                )
+            return self._select(db, ids)
+
+    def renew(self, job_ids: Iterable[int], worker: str) -> None:
+        """
+        Extends the lease of jobs the worker still holds
+        """
+        now = time.time()
+        with self._transaction() as db:
+            db.executemany(
+                "UPDATE jobs SET leased_until = ?, updated_at = ?"
+                " WHERE id = ? AND worker = ? AND state = 'in_progress'",
+                [(now + self.lease_seconds, now, job_id, worker) for job_id in job_ids],
+            )
+
+    def complete(self, job_id: int) -> None:
+        """
+        Marks a job as posted
+        """
+        self._finish(job_id, "posted", None)
+
+    def skip(self, job_id: int, error: str) -> None:
+        """
+        Marks a job as skipped, its video having been posted already
+        """
+        self._finish(job_id, "skipped", error)
+
+    def fail(self, job_id: int, error: str, retry: bool = True) -> JobState:
+        """
+        Records a failed attempt, putting the job back in line while it has
+        attempts left (and `retry` is set), and returns its new state
+        """
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT attempts FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            state: JobState = (
+                "pending"
+                if retry and row and row["attempts"] < self.max_attempts
+                else "failed"
+            )
+            db.execute(
+                "UPDATE jobs SET state = ?, error = ?, leased_until = NULL,"
+                " updated_at = ? WHERE id = ?",
+                (state, error, time.time(), job_id),
+            )
+        return state
+
+    def release(self, job_ids: Iterable[int]) -> None:
+        """
+        Returns leased jobs to the queue without counting the attempt
+        """
+        now = time.time()
+        with self._transaction() as db:
+            db.executemany(
+                "UPDATE jobs SET state = 'pending', attempts = max(attempts - 1, 0),"
+                " leased_until = NULL, updated_at = ?"
+                " WHERE id = ? AND state = 'in_progress'",
+                [(now, job_id) for job_id in job_ids],
+            )
+
+    def retry_failed(self, account: str | None = None) -> int:
+        """
+        Puts every failed job back in line with a fresh attempt count
+        """
+        scope, params = (
+            ("AND account = ?", [account]) if account is not None else ("", [])
+        )
+        with self._transaction() as db:
+            cursor = db.execute(
+                "UPDATE jobs SET state = 'pending', attempts = 0, updated_at = ?"
+                f" WHERE state = 'failed' {scope}",
+                [time.time(), *params],
+            )
+            return cursor.rowcount
+
+    def get(self, job_id: int) -> Job | None:
+        with self._lock:
+            jobs = self._select(self._db, [job_id])
+        return jobs[0] if jobs else None
+
+    def jobs(self, state: JobState | None = None) -> list[Job]:
+        """
+        Lists jobs, optionally only those in one state
+        """
+        query = f"SELECT {COLUMNS} FROM jobs"
+        params: list[Any] = []
+        if state is not None:
+            query += " WHERE state = ?"
+            params.append(state)
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY id", params).fetchall()
+        return [_job(row) for row in rows]
+
+    def pending_accounts(self) -> set[str]:
+        """
+        Accounts with jobs ready to lease: pending, or leased but expired
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT DISTINCT account FROM jobs WHERE state = 'pending'"
+                " OR (state = 'in_progress' AND leased_until < ?)",
+                (time.time(),),
+            ).fetchall()
+        return {row["account"] for row in rows}
+
+    def schedules(self, account: str = "") -> list[datetime.datetime]:
+        """
+        Schedules already taken by the account's pending, leased or posted jobs,
+        e.g. the `booked` slots of `planner.plan`
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT json_extract(video, '$.schedule') AS schedule FROM jobs"
+                " WHERE account = ? AND state IN ('pending', 'in_progress', 'posted')"
+                " AND schedule IS NOT NULL",
+                (account,),
+            ).fetchall()
+        return [datetime.datetime.fromisoformat(row["schedule"]) for row in rows]
+
+    def counts(self) -> dict[JobState, int]:
+        """
+        Number of jobs in each state
+        """
+        counts: dict[JobState, int] = dict.fromkeys(
+            ("pending", "in_progress", "posted", "skipped", "failed"), 0
+        )  # type: ignore[assignment]
+        with self._lock:
+            for row in self._db.execute(
+                "SELECT state, count(*) AS n FROM jobs GROUP BY state"
+            ):
+                counts[row["state"]] = row["n"]
+        return counts
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _finish(self, job_id: int, state: JobState, error: str | None) -> None:
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE jobs SET state = ?, error = ?, leased_until = NULL,"
+                " updated_at = ? WHERE id = ?",
+                (state, error, time.time(), job_id),
+            )
+
+    def _select(self, db: sqlite3.Connection, ids: list[int]) -> list[Job]:
+        if not ids:
+            return []
+        marks = ", ".join("?" * len(ids))
+        rows = db.execute(
+            f"SELECT {COLUMNS} FROM jobs WHERE id IN ({marks}) ORDER BY id", ids
+        ).fetchall()
+        return [_job(row) for row in rows]
+
+    def _transaction(self) -> Transaction:
+        return Transaction(self._db, self._lock)
+
+    def __enter__(self) -> "JobQueue":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+def work(
+    queue: JobQueue,
+    uploader: TikTokUploader,
+    worker: str | None = None,
+    account: str | None = None,
+    wait: bool = False,
+    poll: float = 5,
+    **kwargs,
+) -> dict[JobState, int]:
+    """
+    Uploads leased jobs until the queue is drained and returns the final counts
+
+    Leases as many jobs as the uploader has tabs at a time, only of `account`
+    (the uploader's own, "" if it has none) since they are posted with its
+    session. While the uploader's circuit breaker is open, nothing is leased.
+    With `wait`, keeps polling every `poll` seconds for new jobs instead of
+    returning. `kwargs` are passed on to `upload_videos`.
+    """
+    worker = worker or worker_name()
+    if account is None:
+        account = uploader.account or ""
+    while True:
+        if uploader.breaker.state == "open":
+            logger.debug(f"Circuit breaker open for {uploader.breaker.retry_in:.0f}s")
+            time.sleep(uploader.breaker.retry_in)
+            continue
+
+        jobs = queue.lease(worker, limit=uploader.tabs, account=account)
+        if not jobs:
+            if not wait:
+                return queue.counts()
+            time.sleep(poll)
+            continue
+
+        upload_jobs(queue, uploader, worker, jobs, **kwargs)
+
+
+def upload_jobs(
+    queue: JobQueue, uploader: TikTokUploader, worker: str, jobs: list[Job], **kwargs
+) -> dict[int, Exception | None]:
+    """
+    Uploads leased jobs in one `upload_videos` call and settles each of them
+
+    Returns the exception each job failed with, or None for posted jobs. Jobs
+    skipped because the circuit breaker is open go back in line untried; those
+    the dedup index skipped end "skipped" with `DuplicateVideo`.
+    """
+    outcomes: dict[int, Exception | None] = {}
+
+    # upload_videos hands back normalized copies, so jobs are matched by path
+    held: dict[str, deque[Job]] = {}
+    videos = []
+    for job in jobs:
+        try:
+            video = _convert_videos_dict([cast(dict[str, Any], job["video"])])[0]
+        except RuntimeError as e:
+            queue.fail(job["id"], str(e), retry=False)
+            outcomes[job["id"]] = e
+            continue
+        held.setdefault(video["path"], deque()).append(job)
+        videos.append(video)
+
+    errors: dict[str, Exception] = {}
+
+    def settle(
+        path: str, exception: Exception | None, error: str | None, retry: bool = True
+    ) -> None:
+        job = held[path].popleft()
+        outcomes[job["id"]] = exception
+        if error is None:
+            queue.complete(job["id"])
+            logger.debug(green(f"Job {job['id']} posted"))
+        elif isinstance(exception, DuplicateVideo):
+            queue.skip(job["id"], error)
+            logger.debug(f"Job {job['id']} skipped: {error}")
+        elif isinstance(exception, CircuitOpen):
+            queue.release([job["id"]])
+            logger.debug(f"Job {job['id']} released, the circuit breaker is open")
+        else:
+            state = queue.fail(job["id"], error, retry=retry)
+            logger.debug(red(f"Job {job['id']} failed, now {state}: {error}"))
+        queue.renew([job["id"] for line in held.values() for job in line], worker)
+
+    def on_error(video: VideoDict, exception: Exception) -> None:
+        errors[video["path"]] = exception
+
+    def on_complete(video: VideoDict) -> None:
+        exception = errors.pop(video["path"], None)
+        error = (
+            None if exception is None else f"{type(exception).__name__}: {exception}"
+        )
+        settle(video["path"], exception, error)
+
+    if not videos:
+        return outcomes
+    try:
+        uploader.upload_videos(
+            videos, on_complete=on_complete, on_error=on_error, **kwargs
+        )
+    except BaseException:
+        # e.g. the browser failed to start or the worker was interrupted
+        queue.release(job["id"] for line in held.values() for job in line)
+        raise
+
+    # videos rejected before uploading never reach on_complete, and would only
+    # be rejected again
+    for path, line in held.items():
+        while line:
+            settle(path, InvalidVideo(path), "invalid video, see the log", retry=False)
+    return outcomes
+
+
+class InvalidVideo(ValueError):
+    """
+    The video was rejected before it reached the browser
+    """
+
+
+def _dump_video(video: VideoDict) -> str:
+    data: dict[str, Any] = dict(video)
+    if isinstance(data.get("schedule"), datetime.datetime):
+        data["schedule"] = data["schedule"].isoformat()
+    return json.dumps(data)
+
+
+def _load_video(text: str) -> VideoDict:
+    data = json.loads(text)
+    if isinstance(data.get("schedule"), str):
+        data["schedule"] = datetime.datetime.fromisoformat(data["schedule"])
+    return cast(VideoDict, data)
+
+
+def _job(row: sqlite3.Row) -> Job:
+    return {
+        "id": row["id"],
+        "account": row["account"],
+        "video": _load_video(row["video"]),
+        "state": row["state"],
+        "attempts": row["attempts"],
+        "error": row["error"],
+        "worker": row["worker"],
+        "leased_until": row["leased_until"],
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+    }
@@ -0,0 +1,243 @@
+"""
+Locators for `config.selectors`, built once per page, with fallback chains
+
+Every selector of `config.selectors` is known by its dotted name, e.g.
+"upload.post", and can have alternatives in `[selectors.fallbacks]`: XPath,
+CSS, or `data-e2e=<value>` for TikTok's test ids. `resolve` waits for whichever
+alternative matches first in a single round trip, so a selector broken by a
+markup change falls through to the next one instead of running into a timeout.
+The alternative that matched is used for the rest of the page's life:
+
+    from tiktok_uploader.locators import SelectorRegistry, locate, resolve
+
+    post = resolve(page, "upload.post")  # waits for any alternative
+    box = locate(page, "upload.description")  # no round trip
+    SelectorRegistry.of(page).stats["upload.post"]  # hits, misses and latency
+
+Key Classes
+-----------
+SelectorRegistry : The selector chains of a page and how they fared
+SelectorNotFound : Raised when no alternative of a selector matched in time
+"""
+
+import logging
+import time
+import weakref
+from typing import Any, overload
+
+from playwright.async_api import Locator as AsyncLocator
+from playwright.async_api import Page as AsyncPage
+from playwright.sync_api import Locator, Page
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+from tiktok_uploader import config
+from tiktok_uploader.settings import Selectors
+from tiktok_uploader.timeouts import adaptive
+from tiktok_uploader.types import SelectorStats
+from tiktok_uploader.utils import red
+
+logger = logging.getLogger(__name__)
+
+# Settings under [selectors] that are not selectors
+NOT_SELECTORS = {"login.cookie_of_interest"}
+
+# Resolves to the index of the first alternative matching an element, or -1
+# once `timeout` ms passed without any
+FIRST_MATCH_JS = """([selectors, timeout]) => {
+    const matches = (selector) => selector.startsWith("css=")
+        ? document.querySelector(selector.slice(4)) !== null
+        : document.evaluate(
+            selector.slice(6), document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+        ).singleNodeValue !== null;
+    const match = () => selectors.findIndex(matches);
+    const matched = match();
+    if (matched >= 0) return matched;
+
+    return new Promise((resolve) => {
+        const finish = (index) => {
+            observer.disconnect();
+            clearTimeout(limit);
+            resolve(index);
+        };
+        const observer = new MutationObserver(() => {
+            const index = match();
+            if (index >= 0) finish(index);
+        });
+        observer.observe(document, {
+            childList: true, subtree: true, attributes: true,
+        });
+        const limit = setTimeout(() => finish(match()), timeout);
+    });
+}"""
+
+_REGISTRIES: "weakref.WeakKeyDictionary[Any, SelectorRegistry]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+class SelectorRegistry:
+    """
+    Every selector of `selectors` (`config.selectors`) as a chain of
+    alternatives, with the hits, misses and resolve latency of each
+    """
+
+    def __init__(self, selectors: Selectors | None = None) -> None:
+        selectors = selectors or config.selectors
+        self.chains: dict[str, list[str]] = {
+            name: [normalize(primary)]
+            + [normalize(s) for s in selectors.fallbacks.get(name, [])]
+            for name, primary in _flatten(selectors.model_dump(exclude={"fallbacks"}))
+            if name not in NOT_SELECTORS
+        }
+        unknown = set(selectors.fallbacks) - set(self.chains)
+        if unknown:
+            raise ValueError(f"Fallbacks for unknown selectors: {sorted(unknown)}")
+        self.stats: dict[str, list[SelectorStats]] = {
+            name: [
+                {"selector": selector, "hits": 0, "misses": 0, "seconds": 0.0}
+                for selector in chain
+            ]
+            for name, chain in self.chains.items()
+        }
+        self.preferred: dict[str, int] = {}
+        self._locators: dict[str, Any] = {}
+
+    @classmethod
+    def of(cls, page: Page | AsyncPage) -> "SelectorRegistry":
+        """
+        The registry of a page, built on first use
+        """
+        if page not in _REGISTRIES:
+            _REGISTRIES[page] = cls()
+        return _REGISTRIES[page]
+
+    def selector(self, name: str) -> str:
+        """
+        The alternative that matched last, the primary one until one did
+        """
+        return self.chains[name][self.preferred.get(name, 0)]
+
+    def locator(self, page: Any, name: str) -> Any:
+        """
+        A locator for the alternative that matched last, or for any of them
+        while none has
+        """
+        if name not in self._locators:
+            chain = self.chains[name]
+            if name in self.preferred:
+                chain = [self.selector(name)]
+            locator = page.locator(chain[0])
+            for selector in chain[1:]:
+                locator = locator.or_(page.locator(selector))
+            self._locators[name] = locator
+        return self._locators[name]
+
+    def record(self, name: str, index: int, seconds: float) -> None:
+        """
+        Counts a resolve that matched alternative `index` (-1 for none)
+        """
+        stats = self.stats[name]
+        for missed in stats[: index if index >= 0 else None]:
+            missed["misses"] += 1
+        if index < 0:
+            return
+
+        stats[index]["hits"] += 1
+        stats[index]["seconds"] += seconds
+        if self.preferred.get(name) == index:
+            return
+        if index > 0:
+            logger.warning(
+                red(f"Selector {name} did not match, using {self.chains[name][index]}")
+            )
+        self.preferred[name] = index
+        self._locators.pop(name, None)
+
+
+@overload
+def locate(page: Page, name: str) -> Locator: ...
+
+
+@overload
+def locate(page: AsyncPage, name: str) -> AsyncLocator: ...
+
+
+def locate(page: Page | AsyncPage, name: str) -> Locator | AsyncLocator:
+    """
+    The locator of a selector of `config.selectors`, without a round trip
+    """
+    return SelectorRegistry.of(page).locator(page, name)
+
+
+def resolve(page: Page, name: str, timeout: float | None = None) -> Locator:
+    """
+    Waits up to `timeout` seconds (`config.implicit_wait`, or less with adaptive
+    timeouts) for any alternative of a selector to match, and returns the
+    locator of the first that did
+    """
+    registry = SelectorRegistry.of(page)
+    bound = config.implicit_wait if timeout is None else timeout
+    with adaptive(f"selector:{name}", bound) as timeout_ms:
+        start = time.perf_counter()
+        index = page.evaluate(FIRST_MATCH_JS, [registry.chains[name], timeout_ms])
+        return _resolved(page, registry, name, index, time.perf_counter() - start)
+
+
+async def resolve_async(
+    page: AsyncPage, name: str, timeout: float | None = None
+) -> AsyncLocator:
+    """
+    asyncio version of `resolve`
+    """
+    registry = SelectorRegistry.of(page)
+    bound = config.implicit_wait if timeout is None else timeout
+    with adaptive(f"selector:{name}", bound) as timeout_ms:
+        start = time.perf_counter()
+        index = await page.evaluate(FIRST_MATCH_JS, [registry.chains[name], timeout_ms])
+        return _resolved(page, registry, name, index, time.perf_counter() - start)
+
+
+def normalize(selector: str) -> str:
+    """
+    Turns a selector of the config into a Playwright one with an explicit engine
+    """
+    if selector.startswith(("css=", "xpath=")):
+        return selector
+    if selector.startswith("data-e2e="):
+        return f'css=[data-e2e="{selector.removeprefix("data-e2e=")}"]'
+    if selector.startswith(("/", "(")):
+        return f"xpath={selector}"
+    return f"css={selector}"
+
+
+def _resolved(
+    page: Any, registry: SelectorRegistry, name: str, index: int, seconds: float
+) -> Any:
+    registry.record(name, index, seconds)
+    if index < 0:
+        raise SelectorNotFound(
+            f"Timeout exceeded waiting for selector {name}: "
+            + ", ".join(registry.chains[name])
+        )
+    return registry.locator(page, name)
+
+
+def _flatten(selectors: dict[str, Any], prefix: str = "") -> list[tuple[str, str]]:
+    """
+    The string settings of a selectors table by dotted name
+    """
+    flat: list[tuple[str, str]] = []
+    for key, value in selectors.items():
+        if isinstance(value, dict):
+            flat += _flatten(value, f"{prefix}{key}.")
+        elif isinstance(value, str):
+            flat.append((f"{prefix}{key}", value))
+    return flat
+
+
+class SelectorNotFound(PlaywrightTimeoutError):
+    """
+    No alternative of a selector matched in time
+    """
+
+    error_class = "selector"
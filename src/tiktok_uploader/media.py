@@ -0,0 +1,406 @@
+"""
+Checks video files before any browser work by reading their container headers
+
+MP4/MOV box trees and WebM/Matroska EBML headers are parsed with bounded reads:
+only the box and element headers are read while walking the file, plus the
+metadata that is needed (`moov`, or the `Info` and `Tracks` elements). The
+media data itself is skipped with seeks, so a multi-GB file costs a few reads.
+"""
+
+import logging
+import os
+import struct
+from collections.abc import Iterator
+from functools import lru_cache
+from os.path import abspath
+from typing import BinaryIO
+
+from tiktok_uploader import config
+from tiktok_uploader.types import MediaInfo
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Largest metadata block that is read into memory
+MAX_METADATA_SIZE = 64 * MB
+
+# Top-level ISO base media boxes that can start a file
+ISO_BOXES = {b"ftyp", b"moov", b"mdat", b"free", b"skip", b"wide", b"pnot"}
+
+# Sample entry / codec IDs TikTok is known to accept
+KNOWN_CODECS = {
+    "avc1",
+    "avc3",
+    "hvc1",
+    "hev1",
+    "mp4v",
+    "vp08",
+    "vp09",
+    "av01",
+    "V_VP8",
+    "V_VP9",
+    "V_AV1",
+    "V_MPEG4/ISO/AVC",
+    "V_MPEGH/ISO/HEVC",
+}
+
+EBML_HEADER = 0x1A45DFA3
+EBML_DOCTYPE = 0x4282
+SEGMENT = 0x18538067
+CLUSTER = 0x1F43B675
+INFO = 0x1549A966
+TIMECODE_SCALE = 0x2AD7B1
+DURATION = 0x4489
+TRACKS = 0x1654AE6B
+TRACK_ENTRY = 0xAE
+TRACK_TYPE = 0x83
+CODEC_ID = 0x86
+VIDEO = 0xE0
+PIXEL_WIDTH = 0xB0
+PIXEL_HEIGHT = 0xBA
+
+
+class MalformedMedia(Exception):
+    """
+    The container is cut short or its structure does not add up
+    """
+
+
+def preflight(path: str) -> MediaInfo:
+    """
+    Reads a video's container metadata and judges whether it can be uploaded
+
+    `problems` make the video ineligible, `warnings` are only logged. Results
+    are cached by (path, size, mtime), so unchanged files are parsed once.
+    """
+    path = abspath(path)
+    stat = os.stat(path)
+    return _preflight(path, stat.st_size, stat.st_mtime_ns)
+
+
+@lru_cache(maxsize=1024)
+def _preflight(path: str, size: int, mtime_ns: int) -> MediaInfo:
+    info = probe(path, size)
+    _judge(info)
+    for warning in info["warnings"]:
+        logger.debug(f"{path}: {warning}")
+    return info
+
+
+def probe(path: str, size: int | None = None) -> MediaInfo:
+    """
+    Parses the container header of a video file
+    """
+    if size is None:
+        size = os.path.getsize(path)
+    info: MediaInfo = {
+        "container": None,
+        "size": size,
+        "duration": None,
+        "width": None,
+        "height": None,
+        "video_codec": None,
+        "audio_codec": None,
+        "faststart": None,
+        "problems": [],
+        "warnings": [],
+    }
+    if not size:
+        info["problems"].append("the file is empty")
+        return info
+
+    with open(path, "rb") as file:
+        head = file.read(12)
+        try:
+            if head[:4] == EBML_HEADER.to_bytes(4, "big"):
+                _probe_ebml(file, size, info)
+            elif head[4:8] in ISO_BOXES:
+                _probe_iso(file, size, info)
+        except (MalformedMedia, struct.error, IndexError, ValueError) as e:
+            info["problems"].append(f"unreadable {info['container'] or 'file'}: {e}")
+    return info
+
+
+def _judge(info: MediaInfo) -> None:
+    if info["size"] > config.max_video_size * MB:
+        info["problems"].append(
+            f"{info['size'] / MB:.0f} MB is over max_video_size "
+            f"({config.max_video_size} MB)"
+        )
+
+    duration = info["duration"]
+    if duration is not None and duration > config.max_video_duration:
+        info["problems"].append(
+            f"{duration:.0f}s is over max_video_duration ({config.max_video_duration}s)"
+        )
+
+    if info["container"] is None or info["problems"]:
+        return
+    if info["video_codec"] is None:
+        info["problems"].append("no video track")
+    elif info["video_codec"] not in KNOWN_CODECS:
+        info["warnings"].append(f"unusual video codec {info['video_codec']}")
+    if duration is None:
+        info["warnings"].append("duration not found in the header")
+
+
+# ---- MP4 / MOV ----
+
+
+def _probe_iso(file: BinaryIO, size: int, info: MediaInfo) -> None:
+    info["container"] = "mp4"
+    moov: bytes | None = None
+    moov_at = mdat_at = None
+
+    for kind, start, end in _file_boxes(file, size):
+        if end > size:
+            raise MalformedMedia(f"'{kind.decode(errors='replace')}' box is cut short")
+        if kind == b"ftyp":
+            file.seek(start)
+            if file.read(4) == b"qt  ":
+                info["container"] = "mov"
+        elif kind == b"moov":
+            moov_at = start
+            if end - start > MAX_METADATA_SIZE:
+                info["warnings"].append("moov box too large to inspect")
+            else:
+                file.seek(start)
+                moov = file.read(end - start)
+        elif kind == b"mdat" and mdat_at is None:
+            mdat_at = start
+
+    if moov_at is None:
+        raise MalformedMedia("no moov box")
+    if mdat_at is None:
+        raise MalformedMedia("no mdat box")
+    info["faststart"] = moov_at < mdat_at
+    if moov is not None:
+        _parse_moov(moov, info)
+
+
+def _file_boxes(file: BinaryIO, size: int) -> Iterator[tuple[bytes, int, int]]:
+    """
+    Yields (type, payload start, end) of each top-level box, reading only headers
+    """
+    offset = 0
+    while offset < size:
+        file.seek(offset)
+        header = file.read(8)
+        if len(header) < 8:
+            raise MalformedMedia("box header is cut short")
+        box_size, kind = struct.unpack(">I4s", header)
+        header_size = 8
+        if box_size == 1:
+            large = file.read(8)
+            if len(large) < 8:
+                raise MalformedMedia("box header is cut short")
+            (box_size,) = struct.unpack(">Q", large)
+            header_size = 16
+        elif box_size == 0:  # runs to the end of the file
+            box_size = size - offset
+        if box_size < header_size:
+            raise MalformedMedia(f"bad size for '{kind.decode(errors='replace')}' box")
+        yield kind, offset + header_size, offset + box_size
+        offset += box_size
+
+
+def _boxes(
+    data: bytes | bytearray, start: int = 0, end: int | None = None
+) -> Iterator[tuple[bytes, int, int]]:
+    """
+    Yields (type, payload start, end) of the boxes in a buffer
+    """
+    end = len(data) if end is None else end
+    offset = start
+    while offset + 8 <= end:
+        box_size, kind = struct.unpack_from(">I4s", data, offset)
+        header_size = 8
+        if box_size == 1:
+            (box_size,) = struct.unpack_from(">Q", data, offset + 8)
+            header_size = 16
+        elif box_size == 0:
+            box_size = end - offset
+        if box_size < header_size or offset + box_size > end:
+            raise MalformedMedia(f"bad size for '{kind.decode(errors='replace')}' box")
+        yield kind, offset + header_size, offset + box_size
+        offset += box_size
+
+
+def _child(data: bytes, start: int, end: int, *path: bytes) -> tuple[int, int] | None:
+    """
+    Finds the first box along a path of box types
+    """
+    for kind in path:
+        found = next(
+            ((s, e) for k, s, e in _boxes(data, start, end) if k == kind), None
+        )
+        if found is None:
+            return None
+        start, end = found
+    return start, end
+
+
+def _parse_moov(moov: bytes, info: MediaInfo) -> None:
+    mvhd = _child(moov, 0, len(moov), b"mvhd")
+    if mvhd is not None:
+        start = mvhd[0]
+        if moov[start] == 1:
+            timescale, duration = struct.unpack_from(">IQ", moov, start + 20)
+        else:
+            timescale, duration = struct.unpack_from(">II", moov, start + 12)
+        if timescale and duration:
+            info["duration"] = duration / timescale
+
+    for kind, start, end in _boxes(moov):
+        if kind != b"trak":
+            continue
+        hdlr = _child(moov, start, end, b"mdia", b"hdlr")
+        stsd = _child(moov, start, end, b"mdia", b"minf", b"stbl", b"stsd")
+        if hdlr is None or stsd is None or stsd[1] - stsd[0] < 16:
+            continue
+        handler = moov[hdlr[0] + 8 : hdlr[0] + 12]
+        codec = moov[stsd[0] + 12 : stsd[0] + 16].decode("latin-1")
+
+        if handler == b"vide" and info["video_codec"] is None:
+            info["video_codec"] = codec
+            tkhd = _child(moov, start, end, b"tkhd")
+            if tkhd is not None:
+                offset = tkhd[0] + (88 if moov[tkhd[0]] == 1 else 76)
+                width, height = struct.unpack_from(">II", moov, offset)
+                info["width"], info["height"] = width >> 16, height >> 16
+        elif handler == b"soun" and info["audio_codec"] is None:
+            info["audio_codec"] = codec
+
+
+# ---- WebM / Matroska ----
+
+
+def _probe_ebml(file: BinaryIO, size: int, info: MediaInfo) -> None:
+    info["container"] = "matroska"
+    file.seek(0)
+    _, header_size = _read_element_header(file)
+    if header_size is None:
+        raise MalformedMedia("EBML header has no size")
+    header = file.read(header_size)
+    if len(header) < header_size:
+        raise MalformedMedia("EBML header is cut short")
+    for element, start, end in _elements(header):
+        if element == EBML_DOCTYPE and header[start:end].rstrip(b"\0") == b"webm":
+            info["container"] = "webm"
+
+    segment_id, segment_size = _read_element_header(file)
+    if segment_id != SEGMENT:
+        raise MalformedMedia("no Segment element")
+    offset = file.tell()
+    end = size if segment_size is None else offset + segment_size
+    if end > size:
+        raise MalformedMedia("Segment is cut short")
+
+    found: set[int] = set()
+    while offset < end and found != {INFO, TRACKS}:
+        file.seek(offset)
+        element, element_size = _read_element_header(file)
+        start = file.tell()
+        if element == CLUSTER or element_size is None:
+            break  # media data from here on
+        if element in (INFO, TRACKS):
+            if element_size > MAX_METADATA_SIZE:
+                raise MalformedMedia("metadata element too large")
+            data = file.read(element_size)
+            if len(data) < element_size:
+                raise MalformedMedia("metadata element is cut short")
+            (_parse_info if element == INFO else _parse_tracks)(data, info)
+            found.add(element)
+        offset = start + element_size
+
+
+def _read_element_header(file: BinaryIO) -> tuple[int, int | None]:
+    """
+    Reads an element ID and size from the file; the size is None if unknown
+    """
+    head = file.read(12)
+    element, id_length = _vint(head, 0, keep_marker=True)
+    element_size, size_length = _vint(head, id_length)
+    file.seek(file.tell() - len(head) + id_length + size_length)
+    if element_size == (1 << (7 * size_length)) - 1:
+        return element, None
+    return element, element_size
+
+
+def _vint(data: bytes, offset: int, keep_marker: bool = False) -> tuple[int, int]:
+    """
+    Decodes an EBML variable-length integer, returning (value, length)
+    """
+    if offset >= len(data):
+        raise MalformedMedia("element header is cut short")
+    first = data[offset]
+    length = 1
+    while length <= 8 and not first & (0x80 >> (length - 1)):
+        length += 1
+    if length > 8 or offset + length > len(data):
+        raise MalformedMedia("bad element header")
+    value = first if keep_marker else first & (0xFF >> length)
+    for byte in data[offset + 1 : offset + length]:
+        value = (value << 8) | byte
+    return value, length
+
+
+def _elements(data: bytes, start: int = 0, end: int | None = None):
+    """
+    Yields (ID, payload start, end) of the elements in a buffer
+    """
+    end = len(data) if end is None else end
+    offset = start
+    while offset < end:
+        element, id_length = _vint(data, offset, keep_marker=True)
+        element_size, size_length = _vint(data, offset + id_length)
+        start = offset + id_length + size_length
+        if start + element_size > end:
+            raise MalformedMedia("element is cut short")
+        yield element, start, start + element_size
+        offset = start + element_size
+
+
+def _uint(data: bytes) -> int:
+    return int.from_bytes(data, "big")
+
+
+def _parse_info(data: bytes, info: MediaInfo) -> None:
+    scale, duration = 1_000_000, None
+    for element, start, end in _elements(data):
+        if element == TIMECODE_SCALE:
+            scale = _uint(data[start:end])
+        elif element == DURATION:
+            duration = struct.unpack(
+                ">f" if end - start == 4 else ">d", data[start:end]
+            )[0]
+    if duration:
+        info["duration"] = duration * scale / 1e9
+
+
+def _parse_tracks(data: bytes, info: MediaInfo) -> None:
+    for element, start, end in _elements(data):
+        if element != TRACK_ENTRY:
+            continue
+        track_type, codec, width, height = None, None, None, None
+        for child, child_start, child_end in _elements(data, start, end):
+            value = data[child_start:child_end]
+            if child == TRACK_TYPE:
+                track_type = _uint(value)
+            elif child == CODEC_ID:
+                codec = value.rstrip(b"\0").decode("ascii", errors="replace")
+            elif child == VIDEO:
+                for video, video_start, video_end in _elements(
+                    data, child_start, child_end
+                ):
+                    if video == PIXEL_WIDTH:
+                        width = _uint(data[video_start:video_end])
+                    elif video == PIXEL_HEIGHT:
+                        height = _uint(data[video_start:video_end])
+
+        if track_type == 1 and info["video_codec"] is None:
+            info["video_codec"] = codec
+            info["width"], info["height"] = width, height
+        elif track_type == 2 and info["audio_codec"] is None:
+            info["audio_codec"] = codec
@@ -0,0 +1,77 @@
+"""Remembers how @mentions resolved in the caption editor's suggestions"""
+
+import json
+import logging
+from os.path import abspath, exists
+from time import time
+
+from tiktok_uploader import config
+from tiktok_uploader.types import MentionEntry
+from tiktok_uploader.utils import atomic_write
+
+logger = logging.getLogger(__name__)
+
+
+class MentionCache:
+    """
+    Maps a mention to its position in the suggestion dropdown and the user ID
+    picked there, or to None when TikTok suggested no matching user
+
+    Entries expire after `config.mention_cache_ttl` seconds. With a `path` the
+    cache is kept in that (per-account) JSON file, otherwise only in memory.
+    """
+
+    def __init__(self, path: str | None = None, ttl: float | None = None) -> None:
+        self.path = abspath(path) if path else None
+        self.ttl = config.mention_cache_ttl if ttl is None else ttl
+        self._entries: dict[str, MentionEntry] = self._load()
+
+    def get(self, mention: str) -> MentionEntry | None:
+        """
+        Returns the cached resolution of a mention, if it has not expired
+        """
+        key = _key(mention)
+        entry = self._entries.get(key)
+        if entry is not None and self._expired(entry):
+            del self._entries[key]
+            return None
+        return entry
+
+    def put(self, mention: str, position: int | None, user_id: str | None) -> None:
+        """
+        Records how a mention resolved and saves the cache
+        """
+        self._entries[_key(mention)] = {
+            "position": position,
+            "user_id": user_id,
+            "cached_at": time(),
+        }
+        self._save()
+
+    def _expired(self, entry: MentionEntry) -> bool:
+        return time() - entry["cached_at"] >= self.ttl
+
+    def _load(self) -> dict[str, MentionEntry]:
+        if self.path is None or not exists(self.path):
+            return {}
+
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                entries: dict[str, MentionEntry] = json.load(file)
+        except (OSError, ValueError) as e:
+            logger.debug(f"Ignoring unreadable mention cache {self.path}: {e}")
+            return {}
+
+        return {k: v for k, v in entries.items() if not self._expired(v)}
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+
+        self._entries = {k: v for k, v in self._entries.items() if not self._expired(v)}
+        with atomic_write(self.path) as file:
+            json.dump(self._entries, file)
+
+
+def _key(mention: str) -> str:
+    return mention.lstrip("@").lower()
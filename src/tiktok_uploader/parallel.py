@@ -0,0 +1,219 @@
+"""
+Uploads videos for several accounts at once
+
+Each account runs in its own worker process with its own browser, so accounts
+never share a `Page` and throughput scales with the number of accounts.
+
+Key Classes
+-----------
+ParallelUploader : Fans `VideoDict` lists out to one worker process per account
+"""
+
+import logging
+import multiprocessing
+import os
+import time
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Literal
+
+from tiktok_uploader import spans
+from tiktok_uploader.auth import AuthBackend
+from tiktok_uploader.types import (
+    AccountDict,
+    ParallelResult,
+    SpanRecord,
+    VideoDict,
+    VideoTiming,
+)
+from tiktok_uploader.upload import TikTokUploader
+from tiktok_uploader.utils import bold, green
+
+logger = logging.getLogger(__name__)
+
+
+class ParallelUploader:
+    def __init__(
+        self,
+        accounts: Mapping[str, AccountDict],
+        workers: int | None = None,
+        browser: Literal["chrome", "safari", "chromium", "edge", "firefox"] = "chrome",
+        headless: bool = False,
+    ):
+        """
+        Initializes the parallel uploader.
+
+        Keyword arguments:
+        - accounts -> maps an account name to the credentials `TikTokUploader` takes
+        - workers -> the maximum number of worker processes (defaults to one per
+          account, capped at the number of CPUs)
+
+        Credentials are checked here so a bad account raises `InsufficientAuth`
+        before any process starts.
+        """
+        for account in accounts.values():
+            _auth_backend(account)
+
+        self.accounts = dict(accounts)
+        self.workers = workers
+        self.browser_name = browser
+        self.headless = headless
+
+    def upload_videos(
+        self,
+        videos: Mapping[str, list[VideoDict]],
+        num_retries: int = 1,
+        skip_split_window: bool = False,
+        **kwargs,
+    ) -> ParallelResult:
+        """
+        Uploads each account's videos in its own worker process.
+
+        Returns the failed videos and per-video timings of every worker, keyed by
+        account. Timing spans recorded in the workers are passed on to this
+        process' exporters.
+        """
+        unknown = set(videos) - set(self.accounts)
+        if unknown:
+            raise KeyError(f"No credentials for accounts: {', '.join(sorted(unknown))}")
+
+        jobs = {name: video_list for name, video_list in videos.items() if video_list}
+        result: ParallelResult = {"failed": {}, "timings": {}, "elapsed": 0.0}
+        if not jobs:
+            return result
+
+        workers = self.workers or min(len(jobs), os.cpu_count() or 1)
+        logger.debug(
+            green("Uploading for %d accounts with %d workers"), len(jobs), workers
+        )
+
+        start = time.perf_counter()
+        # Playwright's driver does not survive a fork, so always spawn fresh workers
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            futures = {
+                executor.submit(
+                    _upload_account,
+                    name,
+                    self.accounts[name],
+                    video_list,
+                    self.browser_name,
+                    self.headless,
+                    num_retries,
+                    skip_split_window,
+                    kwargs,
+                ): name
+                for name, video_list in jobs.items()
+            }
+
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    failed, timings, worker_spans = future.result()
+                except Exception as exception:
+                    logger.error("Worker for %s crashed: %s", bold(name), exception)
+                    failed, timings, worker_spans = list(jobs[name]), [], []
+
+                for span in worker_spans:
+                    spans.export(span)
+
+                result["failed"][name] = failed
+                result["timings"][name] = timings
+
+        result["elapsed"] = time.perf_counter() - start
+        return result
+
+
+def upload_videos_parallel(
+    accounts: Mapping[str, AccountDict],
+    videos: Mapping[str, list[VideoDict]],
+    workers: int | None = None,
+    browser: Literal["chrome", "safari", "chromium", "edge", "firefox"] = "chrome",
+    headless: bool = False,
+    **kwargs,
+) -> ParallelResult:
+    """
+    Uploads videos for several accounts at once using the ParallelUploader class.
+    """
+    uploader = ParallelUploader(
+        accounts, workers=workers, browser=browser, headless=headless
+    )
+    return uploader.upload_videos(videos, **kwargs)
+
+
+def _auth_backend(account: AccountDict) -> AuthBackend:
+    return AuthBackend(
+        username=account.get("username", ""),
+        password=account.get("password", ""),
+        cookies=account.get("cookies"),
+        cookies_list=account.get("cookies_list"),
+        cookies_str=account.get("cookies_str"),
+        sessionid=account.get("sessionid"),
+        storage_state=account.get("storage_state"),
+    )
+
+
+def _upload_account(
+    name: str,
+    account: AccountDict,
+    videos: list[VideoDict],
+    browser: Literal["chrome", "safari", "chromium", "edge", "firefox"],
+    headless: bool,
+    num_retries: int,
+    skip_split_window: bool,
+    kwargs: dict[str, Any],
+) -> tuple[list[VideoDict], list[VideoTiming], list[SpanRecord]]:
+    """
+    Uploads one account's videos inside a worker process
+
+    Each video is uploaded and timed on its own, so one rejected before upload
+    gets its own timing. The uploader is always closed, its process being
+    reused for the next account.
+    """
+    collector = spans.add_exporter(spans.SpanCollector())
+
+    uploader = TikTokUploader(
+        username=account.get("username", ""),
+        password=account.get("password", ""),
+        cookies=account.get("cookies", ""),
+        cookies_list=account.get("cookies_list", []),
+        cookies_str=account.get("cookies_str"),
+        sessionid=account.get("sessionid"),
+        proxy=account.get("proxy"),
+        browser=browser,
+        headless=headless,
+        storage_state=account.get("storage_state"),
+        mention_cache=account.get("mention_cache"),
+        route_profile=account.get("route_profile"),
+        dedup_index=account.get("dedup_index"),
+        browser_endpoint=account.get("browser_endpoint"),
+        account=name,
+    )
+
+    timings: list[VideoTiming] = []
+    failed: list[VideoDict] = []
+    try:
+        logger.debug(
+            green("Worker %d uploading %d videos for %s"),
+            os.getpid(),
+            len(videos),
+            bold(name),
+        )
+        uploader.page  # authenticate before timing the first video
+        for video in videos:
+            start = time.perf_counter()
+            failed += uploader.upload_videos(
+                [video], num_retries, skip_split_window, **kwargs
+            )
+            timings.append(
+                {
+                    "path": video.get("path", ""),
+                    "seconds": time.perf_counter() - start,
+                }
+            )
+    finally:
+        uploader.close()
+        spans.remove_exporter(collector)
+
+    return failed, timings, collector.spans
@@ -0,0 +1,172 @@
+"""
+Assigns TikTok-valid schedule slots to whole manifests
+
+TikTok accepts schedules 20 minutes to 10 days ahead, on a 5-minute boundary.
+`ScheduleBounds` captures that range for one `now` and checks a whole batch of
+timestamps against it; `forms.py` validates single schedules with it too.
+A planned video keeps the `planned_at` of its plan, so the uploader checks it
+against the same bounds rather than a later `now` its earliest slots miss.
+
+`plan` spreads a manifest over a cadence in one pass:
+
+    from tiktok_uploader.planner import plan
+
+    cadence: Cadence = {
+        "per_day": 3,
+        "windows": [("09:00", "12:00"), ("18:00", "22:00")],
+        "timezone": "Europe/Berlin",
+    }
+    scheduled, unplaced = plan(videos, cadence, booked=queue.schedules("main"))
+"""
+
+import datetime
+import math
+from bisect import bisect_left, insort
+from collections.abc import Iterable, Iterator, Sequence
+
+import pytz
+
+from tiktok_uploader.types import Cadence, VideoDict
+
+SLOT = 5 * 60  # TikTok's schedule grid, in seconds
+# 15 minutes TikTok asks for, plus 5 to fill in the upload form
+MIN_LEAD = 20 * 60
+MAX_LEAD = 10 * 24 * 3600
+
+
+class ScheduleBounds:
+    """
+    The schedules TikTok accepts at one moment, as epoch timestamps
+    """
+
+    def __init__(self, now: datetime.datetime | None = None) -> None:
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        self.now = now.timestamp()
+        self.earliest = self.now + MIN_LEAD
+        self.latest = self.now + MAX_LEAD
+
+    def check(self, timestamps: Sequence[float]) -> list[bool]:
+        """
+        Whether each timestamp is in range and on a 5-minute boundary
+        """
+        earliest, latest = self.earliest, self.latest
+        return [earliest <= t <= latest and int(t) // 60 % 5 == 0 for t in timestamps]
+
+
+def plan(
+    videos: Sequence[VideoDict],
+    cadence: Cadence,
+    booked: Iterable[datetime.datetime] = (),
+    now: datetime.datetime | None = None,
+) -> tuple[list[VideoDict], list[VideoDict]]:
+    """
+    Gives every video of a manifest a schedule following `cadence`
+
+    Videos with a valid schedule keep it; the others take the cadence's free
+    slots in manifest order. A slot closer than `min_gap` minutes to a booked
+    one (from `booked` or this plan) moves to the next free one in its window.
+
+    Returns copies of the scheduled videos, with UTC schedules and the plan's
+    `planned_at`, and the videos
+    that had an invalid schedule or found no slot within the horizon.
+    """
+    bounds = ScheduleBounds(now)
+    gap = cadence.get("min_gap", 5) * 60
+    taken = sorted(int(slot.timestamp()) for slot in booked)
+
+    given = [i for i, video in enumerate(videos) if video.get("schedule")]
+    valid = bounds.check([videos[i]["schedule"].timestamp() for i in given])
+    fixed = {
+        i: int(videos[i]["schedule"].timestamp()) for i, ok in zip(given, valid) if ok
+    }
+    for fixed_at in fixed.values():
+        insort(taken, fixed_at)
+
+    slots = _slots(cadence, bounds)
+    scheduled: list[VideoDict] = []
+    unplaced: list[VideoDict] = []
+    for i, video in enumerate(videos):
+        if i in fixed:
+            timestamp: int | None = fixed[i]
+        elif i in given:
+            timestamp = None  # an invalid schedule is left to the caller
+        else:
+            timestamp = _take(slots, taken, gap)
+
+        if timestamp is None:
+            unplaced.append(video)
+            continue
+        planned = video.copy()
+        planned["schedule"] = datetime.datetime.fromtimestamp(timestamp, pytz.UTC)
+        planned["planned_at"] = bounds.now
+        scheduled.append(planned)
+
+    return scheduled, unplaced
+
+
+def _slots(cadence: Cadence, bounds: ScheduleBounds) -> Iterator[tuple[int, int]]:
+    """
+    Yields each day's ideal slots, spread evenly over the windows, with the end
+    of their window
+    """
+    timezone = pytz.timezone(cadence.get("timezone", "UTC"))
+    windows = [
+        (_minutes(start), _minutes(end))
+        for start, end in cadence.get("windows", [("00:00", "24:00")])
+    ]
+    total = sum(end - start for start, end in windows)
+    per_day = cadence["per_day"]
+    if per_day < 1 or total <= 0:
+        raise ValueError("a cadence needs per_day >= 1 and non-empty windows")
+
+    first_day = datetime.datetime.fromtimestamp(bounds.earliest, timezone).date()
+    for offset in range(cadence.get("days", 10) + 1):
+        midnight = datetime.datetime.combine(
+            first_day + datetime.timedelta(days=offset), datetime.time()
+        )
+        for k in range(per_day):
+            position = (k + 0.5) * total / per_day  # minutes into the windows
+            for start, end in windows:
+                if position < end - start:
+                    break
+                position -= end - start
+            slot = _timestamp(timezone, midnight, start + position)
+            window_end = min(
+                _timestamp(timezone, midnight, end), int(bounds.latest) + 1
+            )
+            slot -= slot % SLOT
+            if slot > bounds.latest:
+                return
+            if slot < bounds.earliest:
+                # what is left of the window today
+                earliest = math.ceil(bounds.earliest)
+                slot = earliest + -earliest % SLOT
+            if slot < window_end:
+                yield slot, window_end
+
+
+def _take(slots: Iterator[tuple[int, int]], taken: list[int], gap: int) -> int | None:
+    """
+    The next slot at least `gap` seconds from every taken one, which it books
+    """
+    for slot, window_end in slots:
+        while slot < window_end:
+            i = bisect_left(taken, slot - gap + 1)
+            if i == len(taken) or taken[i] >= slot + gap:
+                insort(taken, slot)
+                return slot
+            slot = taken[i] + gap
+            slot += -slot % SLOT
+    return None
+
+
+def _timestamp(
+    timezone: pytz.BaseTzInfo, midnight: datetime.datetime, minutes: float
+) -> int:
+    local = midnight + datetime.timedelta(minutes=minutes)
+    return int(timezone.localize(local).timestamp())
+
+
+def _minutes(clock: str) -> int:
+    hours, minutes = clock.split(":")
+    return int(hours) * 60 + int(minutes)
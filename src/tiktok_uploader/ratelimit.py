@@ -0,0 +1,261 @@
+"""
+Per-account posting limits, and a scheduler that interleaves accounts
+
+Every account has token buckets for `posts_per_hour` and `posts_per_day` that
+refill continuously, plus a `min_spacing` between two of its posts (see
+`[rate_limit]` in the config). The buckets are kept in SQLite, so limits hold
+across restarts and across workers sharing the file, which can be the job
+queue's own database:
+
+    from tiktok_uploader.jobs import JobQueue
+    from tiktok_uploader.ratelimit import RateLimiter, run
+
+    queue = JobQueue("backlog.db")
+    run(queue, {"main": main, "alt": alt}, RateLimiter("backlog.db"))
+
+`run` always uploads for the next account allowed to post, so a throttled
+account does not keep the worker from the others.
+
+Key Classes
+-----------
+RateLimiter : Persistent token buckets per account
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from collections import deque
+from collections.abc import Mapping
+from os.path import abspath
+
+from tiktok_uploader import config
+from tiktok_uploader.jobs import JobQueue, upload_jobs
+from tiktok_uploader.retry import CircuitOpen, classify
+from tiktok_uploader.settings import RateLimit, RateLimits
+from tiktok_uploader.store import Transaction, connect, worker_name
+from tiktok_uploader.types import JobState
+from tiktok_uploader.upload import TikTokUploader
+from tiktok_uploader.utils import green
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_limits (
+    account TEXT PRIMARY KEY,
+    hour_tokens REAL NOT NULL,
+    day_tokens REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    last_post REAL,
+    previous_post REAL
+);
+"""
+
+HOUR = 3600
+DAY = 86400
+
+# (posts left this hour, posts left today, time of the last post)
+_Buckets = tuple[float, float, float | None]
+
+
+class RateLimiter:
+    """
+    Token buckets per account, limited by `limits` (`config.rate_limit`)
+    """
+
+    def __init__(self, path: str, limits: RateLimits | None = None) -> None:
+        self.path = abspath(path)
+        self.limits = limits or config.rate_limit
+        self._db = connect(self.path, SCHEMA)
+        self._lock = threading.Lock()
+
+    def ready_in(self, account: str, now: float | None = None) -> float:
+        """
+        Seconds until the account may post, 0 if it may now
+        """
+        now = time.time() if now is None else now
+        limit = self.limits.for_account(account)
+        with self._lock:
+            buckets = self._buckets(self._db, account, limit, now)
+        return _wait(limit, buckets, now)
+
+    def acquire(self, account: str, now: float | None = None) -> float:
+        """
+        Takes one post from the account's budget and returns 0 if it may post
+        now, otherwise returns the seconds to wait and takes nothing
+        """
+        now = time.time() if now is None else now
+        limit = self.limits.for_account(account)
+        with Transaction(self._db, self._lock) as db:
+            hour, day, last_post = self._buckets(db, account, limit, now)
+            wait = _wait(limit, (hour, day, last_post), now)
+            if wait > 0:
+                return wait
+            self._store(db, account, (hour - 1, day - 1, now), now, last_post)
+        return 0.0
+
+    def refund(self, account: str, now: float | None = None) -> None:
+        """
+        Gives back a post taken by `acquire` that never happened, along with
+        the time of the post before it
+        """
+        now = time.time() if now is None else now
+        limit = self.limits.for_account(account)
+        with Transaction(self._db, self._lock) as db:
+            hour, day, _ = self._buckets(db, account, limit, now)
+            hour = min(hour + 1, limit.posts_per_hour)
+            day = min(day + 1, limit.posts_per_day)
+            row = db.execute(
+                "SELECT previous_post FROM rate_limits WHERE account = ?", (account,)
+            ).fetchone()
+            previous = row["previous_post"] if row else None
+            self._store(db, account, (hour, day, previous), now, previous)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _buckets(
+        self, db: sqlite3.Connection, account: str, limit: RateLimit, now: float
+    ) -> _Buckets:
+        """
+        The account's buckets, refilled up to `now`
+        """
+        row = db.execute(
+            "SELECT hour_tokens, day_tokens, updated_at, last_post"
+            " FROM rate_limits WHERE account = ?",
+            (account,),
+        ).fetchone()
+        if row is None:
+            return float(limit.posts_per_hour), float(limit.posts_per_day), None
+
+        elapsed = max(now - row["updated_at"], 0)
+        hour = min(
+            row["hour_tokens"] + elapsed * limit.posts_per_hour / HOUR,
+            limit.posts_per_hour,
+        )
+        day = min(
+            row["day_tokens"] + elapsed * limit.posts_per_day / DAY,
+            limit.posts_per_day,
+        )
+        return hour, day, row["last_post"]
+
+    def _store(
+        self,
+        db: sqlite3.Connection,
+        account: str,
+        buckets: _Buckets,
+        now: float,
+        previous_post: float | None,
+    ) -> None:
+        """
+        Saves the account's buckets, with the time of the post before the last
+        one for `refund`
+        """
+        db.execute(
+            "INSERT INTO rate_limits"
+            " (account, hour_tokens, day_tokens, updated_at, last_post, previous_post)"
+            " VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (account) DO UPDATE SET"
+            " hour_tokens = excluded.hour_tokens, day_tokens = excluded.day_tokens,"
+            " updated_at = excluded.updated_at, last_post = excluded.last_post,"
+            " previous_post = excluded.previous_post",
+            (account, *buckets[:2], now, buckets[2], previous_post),
+        )
+
+    def __enter__(self) -> "RateLimiter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+def _wait(limit: RateLimit, buckets: _Buckets, now: float) -> float:
+    """
+    Seconds until every limit allows one more post
+    """
+    hour, day, last_post = buckets
+    waits = [0.0]
+    if limit.posts_per_hour and hour < 1:
+        waits.append((1 - hour) * HOUR / limit.posts_per_hour)
+    if limit.posts_per_day and day < 1:
+        waits.append((1 - day) * DAY / limit.posts_per_day)
+    if limit.min_spacing and last_post is not None:
+        waits.append(last_post + limit.min_spacing - now)
+    return max(waits)
+
+
+def run(
+    queue: JobQueue,
+    uploaders: Mapping[str, TikTokUploader],
+    limiter: RateLimiter,
+    worker: str | None = None,
+    wait: bool = False,
+    poll: float = 5,
+    **kwargs,
+) -> dict[JobState, int]:
+    """
+    Uploads the queued jobs of several accounts, one video at a time, and
+    returns the final counts
+
+    `uploaders` maps each account of the queue to its uploader. Accounts take
+    turns among those allowed to post; accounts that are throttled or whose
+    circuit breaker is open are passed over. The worker only sleeps when no
+    account may post, until the first one may (checking every `poll` seconds
+    for new jobs). With `wait`, keeps polling once the queue is drained.
+    """
+    worker = worker or worker_name()
+    turns = deque(uploaders)
+    while True:
+        pending = queue.pending_accounts()
+        accounts = [account for account in turns if account in pending]
+        if not accounts:
+            if not wait:
+                return queue.counts()
+            time.sleep(poll)
+            continue
+
+        account, delay = _next_account(accounts, uploaders, limiter)
+        if account is None:
+            logger.debug(f"Every account is throttled for {delay:.0f}s")
+            time.sleep(min(delay, poll))
+            continue
+
+        turns.remove(account)
+        turns.append(account)
+        jobs = queue.lease(worker, limit=1, account=account)
+        if not jobs:  # another worker got there first
+            limiter.refund(account)
+            continue
+
+        logger.debug(green(f"Posting job {jobs[0]['id']} as {account}"))
+        outcomes = upload_jobs(queue, uploaders[account], worker, jobs, **kwargs)
+        for exception in outcomes.values():
+            if exception is not None and _never_posted(exception):
+                limiter.refund(account)
+
+
+def _next_account(
+    accounts: list[str], uploaders: Mapping[str, TikTokUploader], limiter: RateLimiter
+) -> tuple[str | None, float]:
+    """
+    The first account that may post now, or None and the time until one may
+    """
+    delays = []
+    for account in accounts:
+        breaker = uploaders[account].breaker
+        if breaker.state == "open":
+            delays.append(breaker.retry_in)
+            continue
+        delay = limiter.acquire(account)
+        if delay == 0:
+            return account, 0.0
+        delays.append(delay)
+    return None, min(delays)
+
+
+def _never_posted(exception: Exception) -> bool:
+    """
+    Whether the upload failed before TikTok could have seen it, duplicates
+    skipped by the dedup index included
+    """
+    return isinstance(exception, CircuitOpen) or classify(exception) == "validation"
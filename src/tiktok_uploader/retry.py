@@ -0,0 +1,249 @@
+"""
+Classifies upload errors, retries them with backoff and stops failing accounts
+
+Every exception is sorted into an `ErrorClass` whose policy in `config.retry` says
+how often it is tried and how long to back off in between (with full jitter, so
+parallel workers do not retry in lockstep). Failures of classes with
+`breaker = true` count towards an account's `CircuitBreaker`, which fails the
+remaining videos at once instead of letting each one run into the same timeouts.
+
+Exceptions can declare their class with an `error_class` attribute, and opt out
+of retries with `retryable = False`. A Playwright timeout without one is a
+"timeout", whatever it was waiting for.
+
+Key Classes
+-----------
+CircuitBreaker : Opens after repeated failures, lets a trial through after a cooldown
+CircuitOpen : Raised for videos of an account whose breaker is open
+"""
+
+import asyncio
+import logging
+import random
+import socket
+import time
+from collections.abc import Awaitable, Callable
+from typing import Literal, TypeVar
+
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from tiktok_uploader import config
+from tiktok_uploader.settings import RetryPolicy
+from tiktok_uploader.spans import span
+from tiktok_uploader.types import ErrorClass
+from tiktok_uploader.utils import red
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Playwright messages of a browser, page or connection going away
+NETWORK_MESSAGES = (
+    "net::ERR_",
+    "NS_ERROR_",
+    "has been closed",
+    "Connection closed",
+    "Browser closed",
+    "WebSocket",
+    "ECONNREFUSED",
+    "ECONNRESET",
+)
+
+
+class CircuitOpen(Exception):
+    """
+    The account failed too often in a row and its uploads are paused
+    """
+
+    retryable = False
+
+    def __init__(self, error_class: ErrorClass, seconds: float) -> None:
+        super().__init__(
+            f"Skipped after repeated {error_class} errors, "
+            f"retrying the account in {seconds:.0f}s"
+        )
+        self.error_class = error_class
+
+
+def classify(exception: BaseException) -> ErrorClass:
+    """
+    Sorts an exception into the kind of failure it stands for
+    """
+    declared = getattr(exception, "error_class", None)
+    if declared is not None:
+        return declared
+
+    # FailedToUpload and friends wrap the exception that caused them
+    cause = exception.__cause__
+    if cause is None and exception.args and isinstance(exception.args[0], Exception):
+        cause = exception.args[0]
+    if cause is not None and cause is not exception:
+        return classify(cause)
+
+    if isinstance(exception, PlaywrightTimeoutError):
+        return "timeout"
+    if isinstance(exception, PlaywrightError):
+        message = str(exception)
+        if any(m in message for m in NETWORK_MESSAGES):
+            return "network"
+        return "unknown"
+    if isinstance(exception, TimeoutError):
+        return "timeout"
+    if isinstance(exception, (ConnectionError, socket.gaierror, socket.herror)):
+        return "network"
+    # missing or unreadable files, a file that did not make it into the page
+    if isinstance(exception, (OSError, ValueError, TypeError)):
+        return "validation"
+    return "unknown"
+
+
+def policy(error_class: ErrorClass) -> RetryPolicy:
+    """
+    The configured policy of an error class
+    """
+    return getattr(config.retry, error_class)
+
+
+def backoff(rule: RetryPolicy, attempt: int) -> float:
+    """
+    Seconds to wait before `attempt` (the second try is attempt 2), fully jittered
+    """
+    ceiling = min(rule.max_delay, rule.base_delay * 2 ** max(attempt - 2, 0))
+    return random.uniform(0, ceiling)
+
+
+def _next_delay(
+    exception: Exception, attempt: int, attempts: int | None
+) -> tuple[ErrorClass, float | None]:
+    """
+    The class of a failed attempt and the wait before the next one, or None to
+    give up
+    """
+    error_class = classify(exception)
+    rule = policy(error_class)
+    limit = rule.attempts if attempts is None else min(rule.attempts, attempts)
+    if attempt >= limit or not getattr(exception, "retryable", True):
+        return error_class, None
+
+    delay = backoff(rule, attempt + 1)
+    logger.debug(
+        red(f"Attempt {attempt} failed ({error_class}: {exception}), ")
+        + f"retrying in {delay:.1f}s"
+    )
+    return error_class, delay
+
+
+def retry(func: Callable[[], T], attempts: int | None = None) -> T:
+    """
+    Calls `func` until it succeeds or its error class runs out of attempts
+
+    `attempts` caps the attempts of every class, e.g. a step's `num_retries`.
+    Each backoff is recorded as a "backoff:<class>" span.
+    """
+    attempt = 1
+    while True:
+        try:
+            return func()
+        except Exception as exception:
+            error_class, delay = _next_delay(exception, attempt, attempts)
+            if delay is None:
+                raise
+        with span(f"backoff:{error_class}"):
+            time.sleep(delay)
+        attempt += 1
+
+
+async def retry_async(
+    func: Callable[[], Awaitable[T]], attempts: int | None = None
+) -> T:
+    """
+    asyncio version of `retry`
+    """
+    attempt = 1
+    while True:
+        try:
+            return await func()
+        except Exception as exception:
+            error_class, delay = _next_delay(exception, attempt, attempts)
+            if delay is None:
+                raise
+        with span(f"backoff:{error_class}"):
+            await asyncio.sleep(delay)
+        attempt += 1
+
+
+class CircuitBreaker:
+    """
+    Tracks an account's consecutive failures
+
+    After `threshold` failures of classes whose policy has `breaker = true`, the
+    breaker opens and `check` raises `CircuitOpen` for `cooldown` seconds. Then
+    one video is let through: its success closes the breaker, a failure opens it
+    again.
+    """
+
+    def __init__(
+        self,
+        threshold: int | None = None,
+        cooldown: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.threshold = threshold or config.retry.breaker_threshold
+        self.cooldown = config.retry.breaker_cooldown if cooldown is None else cooldown
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.error_class: ErrorClass | None = None
+
+    @property
+    def state(self) -> Literal["closed", "open", "half_open"]:
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+
+    @property
+    def retry_in(self) -> float:
+        """
+        Seconds until the breaker lets a video through, 0 if it does now
+        """
+        if self.opened_at is None:
+            return 0.0
+        return max(self.opened_at + self.cooldown - self.clock(), 0.0)
+
+    def check(self) -> None:
+        """
+        Raises `CircuitOpen` while the breaker is open
+        """
+        if self.state == "open":
+            assert self.error_class is not None
+            raise CircuitOpen(self.error_class, self.retry_in)
+
+    def success(self) -> None:
+        if self.opened_at is not None:
+            logger.debug("Circuit breaker closed")
+        self.failures = 0
+        self.opened_at = None
+
+    def failure(self, exception: BaseException) -> None:
+        """
+        Counts a failed video, opening the breaker when it had too many
+        """
+        if isinstance(exception, CircuitOpen):
+            return
+        error_class = classify(exception)
+        if not policy(error_class).breaker:
+            return
+
+        self.failures += 1
+        self.error_class = error_class
+        if self.state == "half_open" or self.failures >= self.threshold:
+            self.opened_at = self.clock()
+            logger.error(
+                red(
+                    f"Circuit breaker open after {self.failures} failures "
+                    f"({error_class}), pausing for {self.cooldown}s"
+                )
+            )
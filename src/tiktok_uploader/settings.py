@@ -1,9 +1,16 @@
 from enum import Enum
 from pathlib import Path
-from typing import Annotated
+from typing import Annotated, Literal
 
 import toml
-from pydantic import BaseModel, ConfigDict, Field, HttpUrl, field_validator
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    HttpUrl,
+    field_validator,
+    model_validator,
+)
 
 
 class StrictModel(BaseModel):
@@ -18,6 +25,9 @@ class VisibilityOption(str, Enum):
 
 PositiveSeconds = Annotated[int, Field(ge=0)]
 PositiveChars = Annotated[int, Field(ge=1)]
+FractionalSeconds = Annotated[float, Field(ge=0)]
+PositiveCount = Annotated[int, Field(ge=1)]
+Limit = Annotated[int, Field(ge=0)]  # 0 for no limit
 
 
 class Paths(StrictModel):
@@ -103,16 +113,78 @@ class ScheduleSelectors(StrictModel):
     timepicker_minutes: str
 
 
+class RouteProfile(StrictModel):
+    block_resource_types: list[str] = []
+    block_url_patterns: list[str] = []
+    stub_url_patterns: list[str] = []
+
+    @field_validator("block_resource_types")
+    @classmethod
+    def _keep_documents(cls, v: list[str]) -> list[str]:
+        if "document" in v:
+            raise ValueError("documents cannot be blocked")
+        return v
+
+
+class RateLimit(StrictModel):
+    posts_per_hour: Limit = 0
+    posts_per_day: Limit = 0
+    min_spacing: FractionalSeconds = 0
+
+
+class RateLimits(RateLimit):
+    accounts: dict[str, RateLimit] = {}
+
+    def for_account(self, account: str) -> RateLimit:
+        """
+        The limits of an account, its overrides on top of the defaults
+        """
+        override = self.accounts.get(account)
+        defaults = RateLimit(
+            posts_per_hour=self.posts_per_hour,
+            posts_per_day=self.posts_per_day,
+            min_spacing=self.min_spacing,
+        )
+        if override is None:
+            return defaults
+        return defaults.model_copy(
+            update={k: getattr(override, k) for k in override.model_fields_set}
+        )
+
+
+class RetryPolicy(StrictModel):
+    attempts: PositiveCount = 1
+    base_delay: FractionalSeconds = 0
+    max_delay: FractionalSeconds = 0
+    breaker: bool = False
+
+
+class Retry(StrictModel):
+    breaker_threshold: PositiveCount
+    breaker_cooldown: PositiveSeconds
+
+    auth: RetryPolicy
+    selector: RetryPolicy
+    timeout: RetryPolicy
+    validation: RetryPolicy
+    network: RetryPolicy
+    unknown: RetryPolicy
+
+
 class Selectors(StrictModel):
     login: LoginSelectors
     upload: UploadSelectors
     schedule: ScheduleSelectors
+    # alternatives tried after a selector, by dotted name ("upload.post")
+    fallbacks: dict[str, list[str]] = {}
 
 
 class TikTokConfig(StrictModel):
     # Booleans
     headless: bool
     quit_on_end: bool
+    overlap_upload: bool
+    fast_description: bool
 
     # Lists of accepted input aliases
     valid_path_names: list[str]
@@ -123,12 +195,54 @@ class TikTokConfig(StrictModel):
     explicit_wait: PositiveSeconds
     uploading_wait: PositiveSeconds
     add_hashtag_wait: PositiveSeconds
+    storage_state_max_age: PositiveSeconds
+    popover_settle_wait: FractionalSeconds
+    mention_cache_ttl: PositiveSeconds
+
+    # Adaptive timeouts
+    adaptive_timeouts: bool
+    timeout_multiple: Annotated[float, Field(ge=1)]
+    timeout_floor: FractionalSeconds
+    timeout_min_samples: PositiveCount
+    timeout_stats: str
+
+    # Duplicate videos
+    dedup_policy: Literal["skip", "warn", "force"]
+
+    # Job queue
+    job_lease: PositiveSeconds
+    job_max_attempts: PositiveCount
+
+    # Remote browsers
+    browser_endpoint: str
+    browser_protocol: Literal["playwright", "cdp"]
+    transfer_chunk_size: PositiveCount
+
+    # Posting limits
+    rate_limit: RateLimits
+
+    # Retries and circuit breaking
+    retry: Retry
+
+    # Browser contexts
+    browser_timezone: str
+
+    # Network filtering
+    route_profile: str
+    route_profiles: dict[str, RouteProfile]
 
     # Files / text
     supported_file_types: list[str]
     supported_image_file_types: list[str]
     max_description_length: PositiveChars
 
+    # Preflight
+    preflight: bool
+    max_video_size: PositiveCount
+    max_video_duration: PositiveSeconds
+    faststart: bool
+    faststart_cache: str
+
     # Nested
     paths: Paths
     disguising: Disguising
@@ -160,6 +274,12 @@ class TikTokConfig(StrictModel):
             raise ValueError("supported_file_types must be unique")
         return v
 
+    @model_validator(mode="after")
+    def _known_route_profile(self) -> "TikTokConfig":
+        if self.route_profile and self.route_profile not in self.route_profiles:
+            raise ValueError(f"unknown route_profile: {self.route_profile!r}")
+        return self
+
 
 def load_config(path: str | Path) -> TikTokConfig:
     """
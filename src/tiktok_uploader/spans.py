@@ -0,0 +1,328 @@
+"""
+Times each step of an upload as a span and hands it to the registered exporters
+
+Spans carry the step name, video path, account and outcome, with the class of
+the error (see `tiktok_uploader.retry`) when the step failed. The path and account
+are inherited from enclosing spans, so a step only names itself:
+
+    from tiktok_uploader import spans
+
+    histograms = spans.add_exporter(spans.HistogramExporter())
+    spans.add_exporter(spans.JsonlExporter("spans.jsonl"))
+    spans.add_exporter(spans.PrometheusExporter("uploader.prom"))
+
+    uploader.upload_videos(videos)
+    print(histograms.quantile("set_description", 0.99))
+
+Key Classes
+-----------
+HistogramExporter : In-memory latency histograms per step
+JsonlExporter : Appends every span to a JSON Lines file
+PrometheusExporter : Histograms in the Prometheus text format
+"""
+
+import inspect
+import json
+import logging
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from os import makedirs
+from os.path import abspath, dirname
+from typing import Any, Literal, TypeVar
+
+from tiktok_uploader.types import ErrorClass, SpanRecord
+from tiktok_uploader.utils import atomic_write
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+E = TypeVar("E", bound="Exporter")
+
+# Upper bounds in seconds, from a quick click up to a slow upload
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_attributes: ContextVar[dict[str, str]] = ContextVar("span_attributes", default={})
+_exporters: list["Exporter"] = []
+
+
+class Exporter(ABC):
+    """
+    Receives every finished span
+    """
+
+    @abstractmethod
+    def export(self, span: SpanRecord) -> None: ...
+
+
+def add_exporter(exporter: E) -> E:
+    """
+    Registers an exporter and returns it
+    """
+    _exporters.append(exporter)
+    return exporter
+
+
+def remove_exporter(exporter: "Exporter") -> None:
+    """
+    Unregisters an exporter
+    """
+    if exporter in _exporters:
+        _exporters.remove(exporter)
+
+
+def export(span: SpanRecord) -> None:
+    """
+    Sends a span to every registered exporter
+    """
+    for exporter in list(_exporters):
+        try:
+            exporter.export(span)
+        except Exception as e:
+            logger.debug(f"Span exporter {type(exporter).__name__} failed: {e}")
+
+
+@contextmanager
+def span_attributes(
+    path: str | None = None, account: str | None = None
+) -> Iterator[None]:
+    """
+    Sets the path and/or account of the spans opened inside the block
+    """
+    current = _attributes.get()
+    updated = dict(current)
+    if path:
+        updated["path"] = path
+    if account:
+        updated["account"] = account
+
+    token = _attributes.set(updated)
+    try:
+        yield
+    finally:
+        _attributes.reset(token)
+
+
+@contextmanager
+def span(
+    name: str,
+    path: str | None = None,
+    account: str | None = None,
+    size: int | None = None,
+) -> Iterator[None]:
+    """
+    Times the block as a span named `name`
+
+    `size` is the number of bytes the step moved, for throughput.
+    """
+    with span_attributes(path, account):
+        start = time.time()
+        began = time.perf_counter()
+        outcome: Literal["ok", "error"] = "ok"
+        error: str | None = None
+        error_class: ErrorClass | None = None
+        try:
+            yield
+        except BaseException as exception:
+            from tiktok_uploader.retry import classify
+
+            outcome, error = "error", type(exception).__name__
+            error_class = classify(exception)
+            raise
+        finally:
+            if _exporters:
+                attributes = _attributes.get()
+                export(
+                    {
+                        "name": name,
+                        "path": attributes.get("path", ""),
+                        "account": attributes.get("account", ""),
+                        "outcome": outcome,
+                        "error": error,
+                        "error_class": error_class,
+                        "start": start,
+                        "seconds": time.perf_counter() - began,
+                        "bytes": size,
+                    }
+                )
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """
+    Decorates a function or coroutine function to run inside a span
+    """
+
+    def decorator(func: F) -> F:
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+class Histogram:
+    """
+    Per-bucket (not cumulative) counts of span durations
+    """
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        index = next(
+            (i for i, bound in enumerate(self.buckets) if seconds <= bound),
+            len(self.buckets),
+        )
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+
+
+class HistogramExporter(Exporter):
+    """
+    Keeps a latency histogram per (step, account, outcome) in memory
+    """
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.histograms: dict[tuple[str, str, str], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def export(self, span: SpanRecord) -> None:
+        key = (span["name"], span["account"], span["outcome"])
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(span["seconds"])
+
+    def quantile(self, name: str, q: float, account: str | None = None) -> float | None:
+        """
+        Estimates a quantile of a step's duration, over all accounts by default
+
+        Interpolates inside the bucket like Prometheus' `histogram_quantile`.
+        Returns None before the step was seen.
+        """
+        counts = [0] * (len(self.buckets) + 1)
+        with self._lock:
+            for (step, step_account, _), histogram in self.histograms.items():
+                if step == name and account in (None, step_account):
+                    counts = [a + b for a, b in zip(counts, histogram.counts)]
+
+        total = sum(counts)
+        if not total:
+            return None
+
+        rank = q * total
+        seen = 0
+        for i, count in enumerate(counts):
+            if seen + count >= rank and count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]  # above the last bound
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class JsonlExporter(Exporter):
+    """
+    Appends every span as one JSON object per line
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = abspath(path)
+        makedirs(dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, span: SpanRecord) -> None:
+        line = json.dumps(span) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as file:
+            file.write(line)
+
+
+class PrometheusExporter(HistogramExporter):
+    """
+    Renders the histograms in the Prometheus text exposition format
+
+    With a `path` the file is rewritten after every span, ready for the node
+    exporter's textfile collector.
+    """
+
+    metric = "tiktok_uploader_step_seconds"
+
+    def __init__(
+        self, path: str | None = None, buckets: Iterable[float] = DEFAULT_BUCKETS
+    ) -> None:
+        super().__init__(buckets)
+        self.path = abspath(path) if path else None
+
+    def export(self, span: SpanRecord) -> None:
+        super().export(span)
+        if self.path:
+            self.write(self.path)
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.metric} Duration of each tiktok-uploader step",
+            f"# TYPE {self.metric} histogram",
+        ]
+        with self._lock:
+            for (step, account, outcome), histogram in sorted(self.histograms.items()):
+                labels = (
+                    f'step="{_escape(step)}",account="{_escape(account)}",'
+                    f'outcome="{outcome}"'
+                )
+                cumulative = 0
+                for bound, count in zip((*self.buckets, math.inf), histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == math.inf else repr(float(bound))
+                    lines.append(
+                        f'{self.metric}_bucket{{{labels},le="{le}"}} {cumulative}'
+                    )
+                lines.append(f"{self.metric}_sum{{{labels}}} {histogram.sum}")
+                lines.append(f"{self.metric}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """
+        Writes the metrics to a file, atomically
+        """
+        with atomic_write(path) as file:
+            file.write(self.render())
+
+
+class SpanCollector(Exporter):
+    """
+    Keeps the spans in a list, e.g. to ship them out of a worker process
+    """
+
+    def __init__(self) -> None:
+        self.spans: list[SpanRecord] = []
+
+    def export(self, span: SpanRecord) -> None:
+        self.spans.append(span)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,65 @@
+"""
+SQLite helpers shared by the job queue and the rate limiter
+
+Both keep their state in a database in WAL mode that several local workers can
+share, possibly the same file.
+
+Key Classes
+-----------
+Transaction : A write transaction that takes the database's lock up front
+"""
+
+import os
+import socket
+import sqlite3
+import threading
+from os.path import dirname
+
+
+class Transaction:
+    """
+    BEGIN IMMEDIATE takes the write lock up front, so a transaction's reads and
+    updates cannot interleave with another worker's
+    """
+
+    def __init__(self, db: sqlite3.Connection, lock: threading.Lock) -> None:
+        self.db = db
+        self.lock = lock
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.lock.acquire()
+        try:
+            self.db.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            self.lock.release()
+            raise
+        return self.db
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        try:
+            self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.lock.release()
+
+
+def connect(path: str, schema: str) -> sqlite3.Connection:
+    """
+    Opens a database in WAL mode, so several local workers can share the file
+    """
+    os.makedirs(dirname(path), exist_ok=True)
+    # autocommit, so every write picks its own transaction
+    db = sqlite3.connect(
+        path, timeout=30, isolation_level=None, check_same_thread=False
+    )
+    db.row_factory = sqlite3.Row
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(schema)
+    return db
+
+
+def worker_name() -> str:
+    """
+    Names the worker after its host and process
+    """
+    return f"{socket.gethostname()}:{os.getpid()}"
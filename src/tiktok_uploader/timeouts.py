@@ -0,0 +1,165 @@
+"""
+Timeouts learned from how long each wait usually takes
+
+With `adaptive_timeouts = true` every wait site (a selector resolved through
+`locators`, the upload page loading, ...) keeps its latest timings. Once a site
+has `timeout_min_samples` of them, its timeout becomes `timeout_multiple` times
+their p99, at least `timeout_floor` and at most the configured wait
+(`implicit_wait`, `explicit_wait`). A broken selector then fails after a few
+seconds instead of the full wait.
+
+A wait cut short is counted at its timeout, so a site that got slower for real
+raises its own p99 after a few timeouts. Waits for something that may never
+show up (a suggestion popover) learn how long it takes when it does, and only
+give up once the page was quiet for that long (`settle_window`). The timings are kept in
+`config.timeout_stats` between runs.
+"""
+
+import atexit
+import json
+import logging
+import math
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from functools import lru_cache
+from os.path import abspath, exists, expanduser
+
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+from tiktok_uploader import config
+from tiktok_uploader.utils import atomic_write
+
+logger = logging.getLogger(__name__)
+
+WINDOW = 200  # latest timings kept per site
+SAVE_INTERVAL = 30  # seconds between two saves of the timings
+
+
+class LatencyStats:
+    """
+    The latest timings of each wait site, saved to `path` if given
+    """
+
+    def __init__(self, path: str | None = None) -> None:
+        self.path = abspath(expanduser(path)) if path else None
+        self._timings: dict[str, deque[float]] = self._load()
+        self._lock = threading.Lock()
+        self._saved_at = time.monotonic()
+
+    def observe(self, site: str, seconds: float) -> None:
+        """
+        Records how long a wait took, saving the timings now and then
+        """
+        with self._lock:
+            self._timings.setdefault(site, deque(maxlen=WINDOW)).append(seconds)
+            due = time.monotonic() - self._saved_at >= SAVE_INTERVAL
+        if due:
+            try:
+                self.save()
+            except OSError as e:  # a wait must not fail over its bookkeeping
+                logger.debug(f"Could not save timeout stats {self.path}: {e}")
+
+    def quantile(self, site: str, q: float = 0.99) -> float | None:
+        """
+        The `q` quantile of a site's timings, None until it has
+        `config.timeout_min_samples` of them
+        """
+        with self._lock:
+            timings = sorted(self._timings.get(site, ()))
+        if not timings or len(timings) < config.timeout_min_samples:
+            return None
+        return timings[math.ceil(q * len(timings)) - 1]
+
+    def timeout(self, site: str, bound: float) -> float:
+        """
+        The seconds a wait at `site` should take at most, `bound` until the site
+        has enough timings
+        """
+        p99 = self.quantile(site)
+        if p99 is None:
+            return bound
+        return min(max(p99 * config.timeout_multiple, config.timeout_floor), bound)
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+
+        with self._lock:
+            data = {site: list(timings) for site, timings in self._timings.items()}
+            self._saved_at = time.monotonic()
+        with atomic_write(self.path) as file:
+            json.dump(data, file)
+
+    def _load(self) -> dict[str, deque[float]]:
+        if self.path is None or not exists(self.path):
+            return {}
+
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                data: dict[str, list[float]] = json.load(file)
+        except (OSError, ValueError) as e:
+            logger.debug(f"Ignoring unreadable timeout stats {self.path}: {e}")
+            return {}
+
+        return {site: deque(timings, maxlen=WINDOW) for site, timings in data.items()}
+
+
+@lru_cache(maxsize=1)
+def latency_stats() -> LatencyStats:
+    """
+    The timings shared by every uploader of the process
+    """
+    stats = LatencyStats(config.timeout_stats or None)
+    atexit.register(stats.save)
+    return stats
+
+
+@contextmanager
+def adaptive(
+    site: str, bound: float, stats: LatencyStats | None = None
+) -> Iterator[float]:
+    """
+    Yields the timeout in ms for a wait at `site`, at most `bound` seconds, and
+    records how long the wait in the block took
+
+    Yields `bound` and records nothing while `config.adaptive_timeouts` is off.
+    """
+    if not config.adaptive_timeouts:
+        yield bound * 1000
+        return
+
+    stats = stats or latency_stats()
+    timeout = stats.timeout(site, bound)
+    start = time.perf_counter()
+    try:
+        yield timeout * 1000
+    except PlaywrightTimeoutError:
+        stats.observe(site, timeout)
+        if timeout < bound:
+            logger.debug(f"{site} timed out after an adaptive {timeout:.1f}s")
+        raise
+    stats.observe(site, time.perf_counter() - start)
+
+
+def settle_window(
+    site: str, quiet: float, bound: float, stats: LatencyStats | None = None
+) -> float:
+    """
+    Seconds without a DOM change after which what `site` waits for counts as
+    absent: `quiet`, or with adaptive timeouts at least as long as it takes to
+    show up (see `record`), at most `bound`
+    """
+    if not config.adaptive_timeouts:
+        return quiet
+    return max(quiet, (stats or latency_stats()).timeout(site, bound))
+
+
+def record(site: str, seconds: float, stats: LatencyStats | None = None) -> None:
+    """
+    Records how long something a wait at `site` looked for took to show up
+    """
+    if config.adaptive_timeouts:
+        (stats or latency_stats()).observe(site, seconds)
@@ -20,6 +20,22 @@ class VideoDict(TypedDict, total=False):
     product_id: str
     cover: str
     visibility: Literal["everyone", "friends", "only_you"]
+    planned_at: float  # the moment `plan` checked the schedule, as a timestamp
+
+
+class Cadence(TypedDict, total=False):
+    per_day: int
+    windows: list[tuple[str, str]]  # local "HH:MM" ranges, the whole day by default
+    timezone: str
+    days: int  # horizon, TikTok allows up to 10 days ahead
+    min_gap: int  # minutes between two posts of the account
+
+
+class SelectorStats(TypedDict):
+    selector: str  # one alternative of a selector chain
+    hits: int
+    misses: int
+    seconds: float  # total time to resolve, over the hits
 
 
 class Cookie(TypedDict, total=False):
@@ -30,6 +46,110 @@ class Cookie(TypedDict, total=False):
     expiry: int
     expires: int
     sameSite: str
+    secure: bool
+    httpOnly: bool
+
+
+class CookieRejection(TypedDict):
+    name: str
+    reason: str
+
+
+class AccountDict(TypedDict, total=False):
+    username: str
+    password: str
+    cookies: str
+    cookies_list: list[Cookie]
+    cookies_str: str
+    sessionid: str
+    proxy: ProxyDict
+    storage_state: str
+    mention_cache: str
+    route_profile: str
+    dedup_index: str
+    browser_endpoint: str
+
+
+class MediaInfo(TypedDict):
+    container: Literal["mp4", "mov", "webm", "matroska"] | None
+    size: int
+    duration: float | None
+    width: int | None
+    height: int | None
+    video_codec: str | None
+    audio_codec: str | None
+    faststart: bool | None
+    problems: list[str]
+    warnings: list[str]
+
+
+DedupPolicy = Literal["skip", "warn", "force"]
+
+
+class HashEntry(TypedDict):
+    size: int
+    mtime_ns: int
+    sha256: str
+
+
+class PostedEntry(TypedDict):
+    path: str
+    posted_at: float
+
+
+JobState = Literal["pending", "in_progress", "posted", "skipped", "failed"]
+
+
+class Job(TypedDict):
+    id: int
+    account: str
+    video: VideoDict
+    state: JobState
+    attempts: int
+    error: str | None
+    worker: str | None
+    leased_until: float | None
+    created_at: float
+    updated_at: float
+
+
+class MentionEntry(TypedDict):
+    position: int | None
+    user_id: str | None
+    cached_at: float
+
+
+class RouteStats(TypedDict):
+    blocked: int
+    stubbed: int
+    bytes_saved: int
+    by_resource_type: dict[str, int]
+
+
+ErrorClass = Literal["auth", "selector", "timeout", "validation", "network", "unknown"]
+
+
+class SpanRecord(TypedDict):
+    name: str
+    path: str
+    account: str
+    outcome: Literal["ok", "error"]
+    error: str | None
+    error_class: ErrorClass | None
+    start: float
+    seconds: float
+    bytes: int | None
+
+
+class VideoTiming(TypedDict):
+    path: str
+    seconds: float
+
+
+class ParallelResult(TypedDict):
+    failed: dict[str, list[VideoDict]]
+    timings: dict[str, list[VideoTiming]]
+    elapsed: float
 
 
 def cookie_from_dict(data: Cookie) -> HttpCookie:
@@ -9,19 +9,63 @@ TikTokUploader : Client for uploading videos to TikTok
 import datetime
 import logging
 import time
+from collections import deque
 from collections.abc import Callable
-from os.path import abspath, exists
+from os.path import abspath
 from typing import Any, Literal
 
 import pytz
+from playwright.sync_api import Error as PlaywrightError
 from playwright.sync_api import Page
 from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
 
 from tiktok_uploader import config
 from tiktok_uploader.auth import AuthBackend
-from tiktok_uploader.browsers import get_browser
-from tiktok_uploader.types import Cookie, ProxyDict, VideoDict
-from tiktok_uploader.utils import bold, green, red
+from tiktok_uploader.browsers import (
+    RouteFilter,
+    close_browser,
+    get_browser,
+    page_timezone,
+)
+from tiktok_uploader.dedup import DedupIndex, DuplicateVideo
+from tiktok_uploader.forms import (  # noqa: F401 - re-exported for existing callers
+    ATTRIBUTE_CHANGED_JS,
+    DAY_TEXTS_JS,
+    POPOVER_SETTLED_JS,
+    POST_ENABLED_JS,
+    SCHEDULE_SHOWN_JS,
+    SET_SCHEDULE_JS,
+    TEXT_EQUALS_JS,
+    VISIBLE_TEXTS_JS,
+    DescriptionTooLong,
+    FailedToUpload,
+    PostNotConfirmed,
+    VideoNotProcessed,
+    _check_valid_cover_path,
+    _check_valid_path,
+    _check_valid_schedule,
+    _convert_videos_dict,
+    _get_valid_schedule_minute,
+    _match_mention,
+    _normalize_schedule,
+    _pick_mention,
+    _prepare_video,
+    _PreparedVideo,
+    _split_description,
+)
+from tiktok_uploader.locators import SelectorRegistry, locate, resolve
+from tiktok_uploader.mentions import MentionCache
+from tiktok_uploader.retry import CircuitBreaker, retry
+from tiktok_uploader.spans import span, span_attributes, timed
+from tiktok_uploader.timeouts import adaptive, record, settle_window
+from tiktok_uploader.transfer import set_input_file
+from tiktok_uploader.types import (
+    Cookie,
+    DedupPolicy,
+    ProxyDict,
+    VideoDict,
+)
+from tiktok_uploader.utils import green, red
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +82,14 @@ class TikTokUploader:
         proxy: ProxyDict | None = None,
         browser: Literal["chrome", "safari", "chromium", "edge", "firefox"] = "chrome",
         headless: bool = False,
+        tabs: int = 1,
+        storage_state: str | None = None,
+        mention_cache: str | None = None,
+        route_profile: str | None = None,
+        account: str | None = None,
+        dedup_index: str | None = None,
+        dedup_policy: DedupPolicy | None = None,
+        browser_endpoint: str | None = None,
         *args,
         **kwargs,
     ):
@@ -45,7 +97,33 @@ class TikTokUploader:
         Initializes the TikTok Uploader client.
 
         The browser is not started until the first upload is attempted (lazy initialization).
+
+        `storage_state` is a per-account file holding the browser session; it is
+        saved after a successful login and restored on the next run.
+
+        `mention_cache` is a per-account file remembering which suggestion each
+        @mention resolved to, so repeated mentions skip reading the dropdown.
+
+        `route_profile` names an entry of `config.route_profiles` (such as "lean")
+        whose resource filter is installed on the browser context, defaulting to
+        `config.route_profile`. Its counters are in `route_filter.stats`.
+
+        `account` labels this uploader's timing spans (see `tiktok_uploader.spans`),
+        defaulting to the username.
+
+        `dedup_index` is a per-account file of the content hashes already posted;
+        a video posted before is handled by `dedup_policy` (`config.dedup_policy`).
+
+        `browser_endpoint` is a remote browser to connect to instead of launching
+        one, defaulting to `config.browser_endpoint` (see `browsers.get_browser`).
+
+        With `tabs` greater than one, `upload_videos` keeps that many uploads in
+        flight on separate pages of the same authenticated context, filling one
+        tab's form while the others are still transferring or processing.
         """
+        if tabs < 1:
+            raise ValueError("tabs must be at least 1")
+
         self.auth = AuthBackend(
             username=username,
             password=password,
@@ -53,14 +131,23 @@ class TikTokUploader:
             cookies_list=cookies_list,
             cookies_str=cookies_str,
             sessionid=sessionid,
+            storage_state=storage_state,
         )
         self.proxy = proxy
         self.browser_name = browser
         self.headless = headless
         self.browser_args = args
         self.browser_kwargs = kwargs
+        self.tabs = tabs
+        self.mentions = MentionCache(mention_cache)
+        self.route_filter = RouteFilter.from_config(route_profile)
+        self.account = account or username
+        self.dedup = DedupIndex(dedup_index, dedup_policy) if dedup_index else None
+        self.browser_endpoint = browser_endpoint
+        self.breaker = CircuitBreaker()
 
         self._page: Page | None = None
+        self._tabs: list[Page] = []
         self._browser_context: Any = (
             None  # Stored implicitly via page.context if needed
         )
@@ -73,16 +160,34 @@ class TikTokUploader:
                 self.browser_name,
                 "in headless mode" if self.headless else "",
             )
-            self._page = get_browser(
-                self.browser_name,
-                headless=self.headless,
-                proxy=self.proxy,
-                *self.browser_args,
-                **self.browser_kwargs,
-            )  # type: ignore[misc]
-            self._page = self.auth.authenticate_agent(self._page)
+            with span_attributes(account=self.account):
+                self._page = get_browser(
+                    self.browser_name,
+                    headless=self.headless,
+                    proxy=self.proxy,
+                    *self.browser_args,
+                    storage_state=self.auth.saved_storage_state(),
+                    route_filter=self.route_filter,
+                    endpoint=self.browser_endpoint,
+                    **self.browser_kwargs,
+                )  # type: ignore[misc]
+                self._page = self.auth.authenticate_agent(self._page)
         return self._page
 
+    @property
+    def pages(self) -> list[Page]:
+        """
+        The pages used for pipelined uploads, all sharing the authenticated context
+        """
+        page = self.page
+        if not self._tabs or self._tabs[0] is not page:
+            self._tabs = [page]
+        while len(self._tabs) < self.tabs:
+            tab = page.context.new_page()
+            tab.set_default_timeout(config.implicit_wait * 1000)
+            self._tabs.append(tab)
+        return self._tabs
+
     def upload_video(
         self,
         filename: str,
@@ -126,78 +231,186 @@ class TikTokUploader:
         skip_split_window: bool = False,
         on_complete: Callable[[VideoDict], None] | None = None,
         *args,
+        on_error: Callable[[VideoDict, Exception], None] | None = None,
         **kwargs,
     ) -> list[VideoDict]:
         """
         Uploads multiple videos to TikTok.
         Returns a list of failed videos.
+
+        A failed video is tried again as its error class allows (`config.retry`).
+        Once `self.breaker` opens, the remaining videos fail with `CircuitOpen`.
+        `on_error` is called with a video and its exception before `on_complete`
+        when the upload raised, and with `DuplicateVideo` when the dedup index
+        skipped it. Skipped videos are not failed ones.
         """
         videos = _convert_videos_dict(videos)  # type: ignore
+        # replaces a cache path passed through the upload_video(s) wrappers
+        kwargs["mention_cache"] = self.mentions
 
         if videos and len(videos) > 1:
             logger.debug("Uploading %d videos", len(videos))
 
+        if self.tabs > 1:
+            return self._upload_videos_pipelined(
+                videos,
+                num_retries,
+                skip_split_window,
+                on_complete,
+                *args,
+                on_error=on_error,
+                **kwargs,
+            )
+
         page = self.page  # Triggers lazy loading/authentication
 
         failed = []
         # uploads each video
         for video in videos:
+            path = abspath(video.get("path", "."))
+            allowed = False
             try:
-                path = abspath(video.get("path", "."))
-                description = video.get("description", "")
-                schedule = video.get("schedule", None)
-                product_id = video.get("product_id", None)
-                cover_path = video.get("cover", None)
-                if cover_path is not None:
-                    cover_path = abspath(cover_path)
-
-                visibility = video.get("visibility", "everyone")
-
-                logger.debug(
-                    "Posting %s%s",
-                    bold(video.get("path", "")),
-                    (
-                        f"\n{' ' * 15}with description: {bold(description)}"
-                        if description
-                        else ""
-                    ),
+                prepared = _prepare_video(video)
+                if prepared is None:
+                    failed.append(video)
+                    continue
+
+                path, description, schedule, cover_path, product_id, visibility = (
+                    prepared
                 )
+                allowed = self._allow_upload(path)
+                if allowed:
+                    with span("upload", path=path, account=self.account):
+                        self.breaker.check()
+                        retry(
+                            lambda: complete_upload_form(
+                                page,
+                                path,
+                                description,
+                                schedule,
+                                skip_split_window,
+                                cover_path,
+                                product_id,
+                                visibility,
+                                num_retries,
+                                self.headless,
+                                *args,
+                                **kwargs,
+                            )  # type: ignore[misc]
+                        )
+                    self.breaker.success()
+                    self._record_upload(path)
+                elif on_error:
+                    on_error(video, DuplicateVideo(path))
+            except Exception as exception:
+                if allowed:
+                    self._release_upload(path)
+                self.breaker.failure(exception)
+                logger.error("Failed to upload %s", path)
+                logger.error(exception)
+                failed.append(video)
+                if on_error:
+                    on_error(video, exception)
+                # import traceback
+                # traceback.print_exc()
 
-                # Video must be of supported type
-                if not _check_valid_path(path):
-                    print(f"{path} is invalid, skipping")
+            if on_complete and callable(
+                on_complete
+            ):  # calls the user-specified on-complete function
+                on_complete(video)
+
+        if self.dedup is not None:
+            self.dedup.save()  # keeps the hashes of skipped videos too
+        return failed
+
+    def _upload_videos_pipelined(
+        self,
+        videos: list[VideoDict],
+        num_retries: int,
+        skip_split_window: bool,
+        on_complete: Callable[[VideoDict], None] | None,
+        *args,
+        on_error: Callable[[VideoDict, Exception], None] | None = None,
+        **kwargs,
+    ) -> list[VideoDict]:
+        """
+        Uploads videos round-robin across `self.tabs` pages.
+
+        Each free tab navigates and starts its file transfer right away; the oldest
+        in-flight upload is then finished (processing wait, form, post) while the
+        other tabs keep transferring in the browser. Videos complete in order.
+
+        Both steps are retried as `config.retry` allows; a retried finish starts
+        the upload over on the same tab.
+        """
+        free_tabs = deque(self.pages)
+        in_flight: deque[tuple[Page, VideoDict, _PreparedVideo]] = deque()
+        pending = iter(videos)
+        failed: list[VideoDict] = []
+
+        def complete(video: VideoDict, exception: Exception | None = None) -> None:
+            if exception is not None:
+                self.breaker.failure(exception)
+                logger.error("Failed to upload %s", video.get("path", ""))
+                logger.error(exception)
+                failed.append(video)
+                if on_error:
+                    on_error(video, exception)
+            if on_complete and callable(on_complete):
+                on_complete(video)
+
+        def start_uploads() -> None:
+            while free_tabs:
+                video = next(pending, None)
+                if video is None:
+                    return
+
+                try:
+                    prepared = _prepare_video(video)
+                except Exception as exception:
+                    complete(video, exception)
+                    continue
+                if prepared is None:
                     failed.append(video)
                     continue
+                try:
+                    allowed = self._allow_upload(prepared[0])
+                except Exception as exception:
+                    complete(video, exception)
+                    continue
+                if not allowed:
+                    if on_error:
+                        on_error(video, DuplicateVideo(prepared[0]))
+                    complete(video)
+                    continue
 
-                # Video must have a valid datetime for tiktok's scheduler
-                if schedule:
-                    timezone = pytz.UTC
-                    if schedule.tzinfo is None:
-                        schedule = schedule.astimezone(timezone)
-                    elif (utc_offset := schedule.utcoffset()) is not None and int(
-                        utc_offset.total_seconds()
-                    ) == 0:  # Equivalent to UTC
-                        schedule = timezone.localize(schedule)
-                    else:
-                        print(
-                            f"{schedule} is invalid, the schedule datetime must be naive or aware with UTC timezone, skipping"
-                        )
-                        failed.append(video)
-                        continue
-
-                    valid_tiktok_minute_multiple = 5
-                    schedule = _get_valid_schedule_minute(
-                        schedule, valid_tiktok_minute_multiple
-                    )
-                    if not _check_valid_schedule(schedule):
-                        print(
-                            f"{schedule} is invalid, the schedule datetime must be as least 20 minutes in the future, and a maximum of 10 days, skipping"
-                        )
-                        failed.append(video)
-                        continue
+                tab = free_tabs.popleft()
+                try:
+                    with span("start_upload", path=prepared[0], account=self.account):
+                        self.breaker.check()
+                        retry(lambda: _start_upload_form(tab, prepared[0], num_retries))
+                except Exception as exception:
+                    self._release_upload(prepared[0])
+                    free_tabs.append(tab)
+                    complete(video, exception)
+                    continue
 
-                complete_upload_form(
-                    page,
+                in_flight.append((tab, video, prepared))
+
+        start_uploads()
+        while in_flight:
+            tab, video, prepared = in_flight.popleft()
+            path, description, schedule, cover_path, product_id, visibility = prepared
+            exception: Exception | None = None
+            restart = False
+
+            def finish() -> None:
+                nonlocal restart
+                if restart:
+                    _start_upload_form(tab, path, num_retries)
+                restart = True
+                _finish_upload_form(
+                    tab,
                     path,
                     description,
                     schedule,
@@ -210,28 +423,51 @@ class TikTokUploader:
                     *args,
                     **kwargs,
                 )  # type: ignore[misc]
-            except Exception as exception:
-                logger.error("Failed to upload %s", path)
-                logger.error(exception)
-                failed.append(video)
-                # import traceback
-                # traceback.print_exc()
-
-            if on_complete and callable(
-                on_complete
-            ):  # calls the user-specified on-complete function
-                on_complete(video)
 
+            try:
+                with span("finish_upload", path=path, account=self.account):
+                    retry(finish)
+            except Exception as error:
+                exception = error
+                self._release_upload(path)
+            else:
+                self.breaker.success()
+                self._record_upload(path)
+            complete(video, exception)
+            free_tabs.append(tab)
+            start_uploads()
+
+        if self.dedup is not None:
+            self.dedup.save()
         return failed
 
+    def _allow_upload(self, path: str) -> bool:
+        """
+        Checks a video against the dedup index before its form is filled in,
+        reserving its content until `_record_upload` or `_release_upload`
+        """
+        return self.dedup is None or self.dedup.allow(path)
+
+    def _record_upload(self, path: str) -> None:
+        if self.dedup is not None:
+            self.dedup.record(path)
+
+    def _release_upload(self, path: str) -> None:
+        if self.dedup is not None:
+            self.dedup.release(path)
+
     def close(self):
         """Closes the browser instance."""
         if self._page:
             try:
-                self._page.context.browser.close()
+                close_browser(self._page)
             except Exception as e:
                 logger.debug(f"Error closing browser: {e}")
             self._page = None
+            self._tabs = []
+
+        if self.route_filter is not None:
+            logger.debug("Route filter: %s", self.route_filter.stats)
 
     def __enter__(self):
         return self
@@ -353,31 +589,139 @@ def complete_upload_form(
     num_retries: int = 1,
     headless: bool = False,
     *args,
+    overlap: bool | None = None,
     **kwargs,
 ) -> None:
     """
     Actually uploads each video
+
+    With `overlap` (defaults to `config.overlap_upload`) every field is filled
+    while the video is still transferring and processing, and only posting waits
+    for the upload to complete.
     """
+    if overlap is None:
+        overlap = config.overlap_upload
+
     _go_to_upload(page)
     _remove_cookies_window(page)
 
+    if overlap:
+        _set_video(page, path=path, num_retries=num_retries, wait=False)
+        _finish_upload_form(
+            page,
+            path,
+            description,
+            schedule,
+            skip_split_window,
+            cover_path,
+            product_id,
+            visibility,
+            num_retries,
+            headless,
+            *args,
+            overlap=True,
+            **kwargs,
+        )
+        return
+
     _set_video(page, path=path, num_retries=num_retries, **kwargs)
 
+    _fill_upload_form(
+        page,
+        description,
+        schedule,
+        skip_split_window,
+        cover_path,
+        product_id,
+        visibility,
+        **kwargs,
+    )
+    _post_video(page)
+
+
+def _start_upload_form(page: Page, path: str, num_retries: int = 1) -> None:
+    """
+    Opens the upload page and starts the file transfer without waiting for it
+    """
+    _go_to_upload(page)
+    _remove_cookies_window(page)
+
+    _set_video(page, path=path, num_retries=num_retries, wait=False)
+
+
+def _finish_upload_form(
+    page: Page,
+    path: str,
+    description: str,
+    schedule: datetime.datetime | None,
+    skip_split_window: bool,
+    cover_path: str | None = None,
+    product_id: str | None = None,
+    visibility: Literal["everyone", "friends", "only_you"] = "everyone",
+    num_retries: int = 1,
+    headless: bool = False,
+    *args,
+    overlap: bool | None = None,
+    **kwargs,
+) -> None:
+    """
+    Completes an upload whose file was set with `_set_video(wait=False)`
+    """
+    if overlap is None:
+        overlap = config.overlap_upload
+
+    if not overlap:
+        _wait_for_video(page, path=path, num_retries=num_retries)
+
+    _fill_upload_form(
+        page,
+        description,
+        schedule,
+        skip_split_window,
+        None if overlap else cover_path,
+        product_id,
+        visibility,
+        **kwargs,
+    )
+
+    if overlap:
+        _wait_for_video(page, path=path, num_retries=num_retries)
+        # cover frames are only offered once TikTok has processed the video
+        if cover_path:
+            _set_cover(page, cover_path)
+
+    _post_video(page)
+
+
+def _fill_upload_form(
+    page: Page,
+    description: str,
+    schedule: datetime.datetime | None,
+    skip_split_window: bool,
+    cover_path: str | None = None,
+    product_id: str | None = None,
+    visibility: Literal["everyone", "friends", "only_you"] = "everyone",
+    mention_cache: MentionCache | None = None,
+    **kwargs,
+) -> None:
+    """
+    Fills every field of the upload form except the video itself
+    """
     if cover_path:
         _set_cover(page, cover_path)
     if not skip_split_window:
         _remove_split_window(page)
     _set_interactivity(page, **kwargs)
-    _set_description(page, description)
+    _set_description(page, description, mention_cache)
     if visibility != "everyone":
         _set_visibility(page, visibility)
     if schedule:
         _set_schedule_video(page, schedule)
     if product_id:
         _add_product_link(page, product_id)
-    _post_video(page)
 
 
+@timed("go_to_upload")
 def _go_to_upload(page: Page) -> None:
     """
     Navigates to the upload page
@@ -393,10 +737,14 @@ def _go_to_upload(page: Page) -> None:
         page.on("dialog", lambda dialog: dialog.accept())
 
     # waits for the root to load
-    page.wait_for_selector("#root", timeout=config.explicit_wait * 1000)
+    with adaptive("upload_page", config.explicit_wait) as timeout:
+        page.wait_for_selector("#root", timeout=timeout)
 
 
-def _set_description(page: Page, description: str) -> None:
+@timed("set_description")
+def _set_description(
+    page: Page, description: str, mention_cache: MentionCache | None = None
+) -> None:
     """
     Sets the description of the video
     """
@@ -410,8 +758,9 @@ def _set_description(page: Page, description: str) -> None:
     saved_description = description
 
     try:
-        desc_locator = page.locator(f"xpath={config.selectors.upload.description}")
-        desc_locator.wait_for(state="visible", timeout=config.implicit_wait * 1000)
+        desc_locator = resolve(page, "upload.description")
+        with adaptive("description", config.implicit_wait) as timeout:
+            desc_locator.wait_for(state="visible", timeout=timeout)
 
         desc_locator.click()
 
@@ -420,66 +769,158 @@ def _set_description(page: Page, description: str) -> None:
         desc_locator.press("Backspace")
 
         desc_locator.click()
-        time.sleep(1)
 
-        words = description.split(" ")
-        for word in words:
-            if word[0] == "#":
-                desc_locator.press_sequentially(word, delay=50)
-                time.sleep(0.5)
+        if config.fast_description:
+            _type_description(page, desc_locator, description, mention_cache)
+        else:
+            _type_description_by_word(page, desc_locator, description, mention_cache)
 
-                mention_box = page.locator(
-                    f"xpath={config.selectors.upload.mention_box}"
-                )
-                try:
-                    mention_box.wait_for(
-                        state="visible", timeout=config.add_hashtag_wait * 1000
-                    )
-                    desc_locator.press("Enter")
-                except Exception:
-                    pass
-
-            elif word[0] == "@":
-                logger.debug(green("- Adding Mention: " + word))
-                desc_locator.press_sequentially(word)
-                time.sleep(1)
-
-                mention_box_user_id = page.locator(
-                    f"xpath={config.selectors.upload.mention_box_user_id}"
-                )
-                try:
-                    mention_box_user_id.first.wait_for(state="visible", timeout=5000)
+    except Exception as exception:
+        print("Failed to set description: ", exception)
+        # fallback
+        _clear(desc_locator)
+        desc_locator.fill(saved_description)
 
-                    found = False
-                    user_ids = mention_box_user_id.all()
 
-                    target_username = word[1:].lower()
+def _type_description(
+    page: Page,
+    desc_locator,
+    description: str,
+    mention_cache: MentionCache | None = None,
+) -> None:
+    """
+    Inserts plain text in one go and only types hashtags and mentions key by key
+    """
+    autocompleted = False
+    for kind, text in _split_description(description):
+        if kind == "text":
+            # the editor already adds a space after an accepted suggestion
+            if autocompleted and text.startswith(" "):
+                text = text[1:]
+            _insert_text(page, text)
+            autocompleted = False
+
+        elif kind == "#":
+            desc_locator.press_sequentially(text, delay=50)
+            autocompleted = _wait_for_popover(
+                page, config.selectors.upload.mention_box, config.add_hashtag_wait
+            )
+            if autocompleted:
+                desc_locator.press("Enter")
 
-                    for i, user_el in enumerate(user_ids):
-                        if user_el.is_visible():
-                            text = user_el.inner_text().split(" ")[0]
-                            if text.lower() == target_username:
-                                found = True
-                                print("Matching User found : Clicking User")
-                                for _ in range(i):
-                                    desc_locator.press("ArrowDown")
-                                desc_locator.press("Enter")
-                                break
+        else:
+            autocompleted = _add_mention(page, desc_locator, text, mention_cache)
 
-                    if not found:
-                        desc_locator.press_sequentially(" ")
 
-                except Exception:
-                    desc_locator.press_sequentially(" ")
+def _type_description_by_word(
+    page: Page,
+    desc_locator,
+    description: str,
+    mention_cache: MentionCache | None = None,
+) -> None:
+    """
+    Types the description one word at a time, the slower fallback
+    """
+    time.sleep(1)
 
-            else:
-                desc_locator.press_sequentially(word + " ")
+    words = description.split(" ")
+    for word in words:
+        if not word:
+            continue
 
-    except Exception as exception:
-        print("Failed to set description: ", exception)
-        # fallback
-        _clear(desc_locator)
-        desc_locator.fill(saved_description)
+        if word[0] == "#":
+            desc_locator.press_sequentially(word, delay=50)
+            time.sleep(0.5)
+
+            mention_box = locate(page, "upload.mention_box")
+            try:
+                with adaptive(
+                    "hashtag_suggestions", config.add_hashtag_wait
+                ) as timeout:
+                    mention_box.wait_for(state="visible", timeout=timeout)
+                desc_locator.press("Enter")
+            except Exception:
+                pass
+
+        elif word[0] == "@":
+            if not _add_mention(page, desc_locator, word, mention_cache):
+                desc_locator.press_sequentially(" ")
+
+        else:
+            desc_locator.press_sequentially(word + " ")
+
+
+def _insert_text(page: Page, text: str) -> None:
+    """
+    Inserts text at the cursor, pressing Enter for line breaks
+    """
+    for i, line in enumerate(text.split("\n")):
+        if i:
+            page.keyboard.press("Enter")
+        if line:
+            page.keyboard.insert_text(line)
+
+
+def _wait_for_popover(page: Page, xpath: str, timeout: float) -> bool:
+    """
+    Waits until the autocomplete popover shows up or the page settles without it
+
+    Suggestions are fetched while the page stays quiet, so with adaptive
+    timeouts the settle window grows to how long the popover takes to show up.
+    """
+    settle = settle_window("popover", config.popover_settle_wait, timeout)
+    start = time.perf_counter()
+    try:
+        shown = bool(
+            page.evaluate(POPOVER_SETTLED_JS, [xpath, settle * 1000, timeout * 1000])
+        )
+    except Exception:
+        return False
+
+    if shown:
+        record("popover", time.perf_counter() - start)
+    return shown
+
+
+def _add_mention(
+    page: Page,
+    desc_locator,
+    mention: str,
+    mention_cache: MentionCache | None = None,
+) -> bool:
+    """
+    Types a mention and picks the matching user from the popover
+
+    Returns whether a user was picked.
+    """
+    logger.debug(green("- Adding Mention: " + mention))
+
+    cached = mention_cache.get(mention) if mention_cache else None
+    if cached is not None and cached["position"] is None:
+        # TikTok had no matching user last time, so don't wait for suggestions
+        _insert_text(page, mention)
+        return False
+
+    desc_locator.press_sequentially(mention)
+
+    mention_box_user_id = locate(page, "upload.mention_box_user_id")
+    if not _wait_for_popover(page, config.selectors.upload.mention_box_user_id, 5):
+        return False
+
+    try:
+        texts = mention_box_user_id.evaluate_all(VISIBLE_TEXTS_JS)
+    except Exception:
+        return False
+
+    position = _pick_mention(texts, mention, cached, mention_cache)
+    if position is None:
+        return False
+
+    print("Matching User found : Clicking User")
+    for _ in range(position):
+        desc_locator.press("ArrowDown")
+    desc_locator.press("Enter")
+    return True
 
 
 def _clear(locator) -> None:
@@ -490,32 +931,58 @@ def _clear(locator) -> None:
     locator.press("Backspace")
 
 
-def _set_video(page: Page, path: str = "", num_retries: int = 3, **kwargs) -> None:
+@timed("set_video")
+def _set_video(
+    page: Page, path: str = "", num_retries: int = 3, wait: bool = True, **kwargs
+) -> None:
     """
-    Sets the video to upload
+    Sets the video to upload, tried up to `num_retries` times as `config.retry`
+    allows
+
+    With `wait=False` only the file is set; call `_wait_for_video` before posting.
     """
     logger.debug(green("Uploading video file"))
 
-    for _ in range(num_retries):
-        try:
-            upload_box = page.locator(f"xpath={config.selectors.upload.upload_video}")
-            upload_box.set_input_files(path)
+    def attempt() -> None:
+        upload_box = resolve(page, "upload.upload_video")
+        set_input_file(upload_box, path)
 
+        if wait:
             # wait until a non-draggable image is found (process confirmation)
-            process_confirmation = page.locator(
-                f"xpath={config.selectors.upload.process_confirmation}"
-            )
-            process_confirmation.wait_for(
-                state="attached", timeout=config.explicit_wait * 1000
-            )
-            return
-        except PlaywrightTimeoutError as exception:
-            print("TimeoutException occurred:\n", exception)
-        except Exception as exception:
-            print(exception)
-            raise FailedToUpload(exception)
+            process_confirmation = locate(page, "upload.process_confirmation")
+            try:
+                with adaptive("video_processed", config.explicit_wait) as timeout:
+                    process_confirmation.wait_for(state="attached", timeout=timeout)
+            except PlaywrightTimeoutError as exception:
+                raise VideoNotProcessed(exception) from exception
+
+    try:
+        retry(attempt, attempts=num_retries)
+    except Exception as exception:
+        print(exception)
+        raise FailedToUpload(exception) from exception
+
+
+@timed("wait_for_video")
+def _wait_for_video(page: Page, path: str = "", num_retries: int = 1) -> None:
+    """
+    Waits for a video set with `_set_video(wait=False)` to finish processing,
+    setting the file again on timeout while retries remain
+    """
+    process_confirmation = locate(page, "upload.process_confirmation")
+    try:
+        with adaptive("video_processed", config.explicit_wait) as timeout:
+            process_confirmation.wait_for(state="attached", timeout=timeout)
+    except PlaywrightTimeoutError as exception:
+        if num_retries <= 1:
+            raise VideoNotProcessed(exception) from exception
+        logger.debug(
+            red(f"Video did not finish processing, setting it again: {exception}")
+        )
+        _set_video(page, path=path, num_retries=num_retries - 1)
 
 
+@timed("remove_cookies_window")
 def _remove_cookies_window(page: Page) -> None:
     """
     Removes the cookies window if it is open
@@ -536,6 +1003,7 @@ def _remove_cookies_window(page: Page) -> None:
         """)
 
 
+@timed("remove_split_window")
 def _remove_split_window(page: Page) -> None:
     """
     Remove the split window if it is open
@@ -545,12 +1013,14 @@ def _remove_split_window(page: Page) -> None:
 
     try:
         window = page.locator(f"xpath={window_xpath}")
-        if window.is_visible(timeout=config.implicit_wait * 1000):
+        # is_visible checks once, there is no wait to adapt
+        if window.is_visible():
             window.click()
     except PlaywrightTimeoutError:
         logger.debug(red("Split window not found or operation timed out"))
 
 
+@timed("set_interactivity")
 def _set_interactivity(
     page: Page,
     comment: bool = True,
@@ -565,9 +1035,9 @@ def _set_interactivity(
     try:
         logger.debug(green("Setting interactivity settings"))
 
-        comment_box = page.locator(f"xpath={config.selectors.upload.comment}")
-        stitch_box = page.locator(f"xpath={config.selectors.upload.stitch}")
-        duet_box = page.locator(f"xpath={config.selectors.upload.duet}")
+        comment_box = locate(page, "upload.comment")
+        stitch_box = locate(page, "upload.stitch")
+        duet_box = locate(page, "upload.duet")
 
         if comment ^ comment_box.is_checked():
             comment_box.click()
@@ -582,6 +1052,7 @@ def _set_interactivity(
         logger.error("Failed to set interactivity settings")
 
 
+@timed("set_visibility")
 def _set_visibility(
     page: Page, visibility: Literal["everyone", "friends", "only_you"]
 ) -> None:
@@ -596,7 +1067,6 @@ def _set_visibility(
         )
         dropdown = page.locator(f"xpath={dropdown_xpath}")
         dropdown.click()
-        time.sleep(1.5)
 
         visibility_text_map = {
             "everyone": "Everyone",
@@ -608,8 +1078,8 @@ def _set_visibility(
         option_xpath = f"//div[@role='option' and contains(., '{option_text}')]"
 
         option = page.locator(f"xpath={option_xpath}")
+        option.wait_for(state="visible")
         option.scroll_into_view_if_needed()
-        time.sleep(0.5)
         option.click()
 
         logger.debug(green(f"Successfully set visibility to: {visibility}"))
@@ -618,16 +1088,14 @@ def _set_visibility(
         logger.error(red(f"Failed to set visibility: {e}"))
 
 
+@timed("set_schedule_video")
 def _set_schedule_video(page: Page, schedule: datetime.datetime) -> None:
     """
     Sets the schedule of the video
     """
     logger.debug(green("Setting schedule"))
 
-    timezone_str = page.evaluate("Intl.DateTimeFormat().resolvedOptions().timeZone")
-    driver_timezone = pytz.timezone(timezone_str)
-
-    schedule = schedule.astimezone(driver_timezone)
+    schedule = schedule.astimezone(pytz.timezone(page_timezone(page)))
 
     month = schedule.month
     day = schedule.day
@@ -635,58 +1103,72 @@ def _set_schedule_video(page: Page, schedule: datetime.datetime) -> None:
     minute = schedule.minute
 
     try:
-        switch = page.locator(f"xpath={config.selectors.schedule.switch}")
+        switch = locate(page, "schedule.switch")
         switch.click()
-        __date_picker(page, month, day)
-        __time_picker(page, hour, minute)
+        if not __type_schedule(page, schedule):
+            __date_picker(page, month, day)
+            __time_picker(page, hour, minute)
     except Exception as e:
         msg = f"Failed to set schedule: {e}"
         logger.error(red(msg))
         raise FailedToUpload()
 
 
+def __type_schedule(page: Page, schedule: datetime.datetime) -> bool:
+    """
+    Types the date and time into the pickers and checks they took, returning
+    False to pick them by clicking instead
+    """
+    selectors = config.selectors.schedule
+    arg = [
+        selectors.date_picker,
+        selectors.time_picker,
+        schedule.strftime("%Y-%m-%d"),
+        schedule.strftime("%H:%M"),
+    ]
+    try:
+        if not page.evaluate(SET_SCHEDULE_JS, arg):
+            return False
+        arg[1] = selectors.time_picker_text
+        page.wait_for_function(SCHEDULE_SHOWN_JS, arg=arg, timeout=500)
+    except PlaywrightError as e:
+        logger.debug(f"Typing the schedule did not take ({e}), picking it instead")
+        return False
+
+    logger.debug(green("Schedule typed correctly"))
+    return True
+
+
 def __date_picker(page: Page, month: int, day: int) -> None:
     logger.debug(green("Picking date"))
 
-    date_picker = page.locator(f"xpath={config.selectors.schedule.date_picker}")
+    date_picker = locate(page, "schedule.date_picker")
     date_picker.click()
 
-    calendar = page.locator(f"xpath={config.selectors.schedule.calendar}")
+    calendar = locate(page, "schedule.calendar")
     calendar.wait_for(state="visible")
 
-    calendar_month = page.locator(
-        f"xpath={config.selectors.schedule.calendar_month}"
-    ).inner_text()
+    calendar_month = locate(page, "schedule.calendar_month").inner_text()
     n_calendar_month = datetime.datetime.strptime(calendar_month, "%B").month
 
     if n_calendar_month != month:
-        arrows = page.locator(f"xpath={config.selectors.schedule.calendar_arrows}")
+        arrows = locate(page, "schedule.calendar_arrows")
         if n_calendar_month < month:
             arrows.last.click()
         else:
             arrows.first.click()
 
-    valid_days = page.locator(
-        f"xpath={config.selectors.schedule.calendar_valid_days}"
-    ).all()
-
-    day_to_click = None
-    for day_option in valid_days:
-        if int(day_option.inner_text()) == day:
-            day_to_click = day_option
-            break
-    if day_to_click:
-        day_to_click.click()
-    else:
+    valid_days = locate(page, "schedule.calendar_valid_days")
+    days = [int(text) for text in valid_days.evaluate_all(DAY_TEXTS_JS)]
+    if day not in days:
         raise Exception("Day not found in calendar")
+    valid_days.nth(days.index(day)).click()
 
     __verify_date_picked_is_correct(page, month, day)
 
 
 def __verify_date_picked_is_correct(page: Page, month: int, day: int) -> None:
-    date_selected = page.locator(
-        f"xpath={config.selectors.schedule.date_picker}"
-    ).inner_text()
+    date_selected = locate(page, "schedule.date_picker").inner_text()
     date_selected_month = int(date_selected.split("-")[1])
     date_selected_day = int(date_selected.split("-")[2])
 
@@ -701,41 +1183,44 @@ def __verify_date_picked_is_correct(page: Page, month: int, day: int) -> None:
 def __time_picker(page: Page, hour: int, minute: int) -> None:
     logger.debug(green("Picking time"))
 
-    time_picker = page.locator(f"xpath={config.selectors.schedule.time_picker}")
+    time_picker = locate(page, "schedule.time_picker")
     time_picker.click()
 
-    time_picker_container = page.locator(
-        f"xpath={config.selectors.schedule.time_picker_container}"
-    )
+    time_picker_container = locate(page, "schedule.time_picker_container")
     time_picker_container.wait_for(state="visible")
 
-    hour_options = page.locator(f"xpath={config.selectors.schedule.timepicker_hours}")
-    minute_options = page.locator(
-        f"xpath={config.selectors.schedule.timepicker_minutes}"
-    )
+    hour_options = locate(page, "schedule.timepicker_hours")
+    minute_options = locate(page, "schedule.timepicker_minutes")
 
     hour_to_click = hour_options.nth(hour)
     minute_option_correct_index = int(minute / 5)
     minute_to_click = minute_options.nth(minute_option_correct_index)
 
+    # clicks wait for the scrolled option to be stable, no need to sleep
     hour_to_click.scroll_into_view_if_needed()
-    time.sleep(0.5)
     hour_to_click.click()
 
     minute_to_click.scroll_into_view_if_needed()
-    time.sleep(0.5)
     minute_to_click.click()
 
     time_picker.click()
-    time.sleep(0.5)
+    try:
+        page.wait_for_function(
+            TEXT_EQUALS_JS,
+            arg=[
+                config.selectors.schedule.time_picker_text,
+                f"{hour:02d}:{minute:02d}",
+            ],
+            timeout=500,
+        )
+    except PlaywrightTimeoutError:
+        pass  # the verification below reports what was picked instead
 
     __verify_time_picked_is_correct(page, hour, minute)
 
 
 def __verify_time_picked_is_correct(page: Page, hour: int, minute: int) -> None:
-    time_selected = page.locator(
-        f"xpath={config.selectors.schedule.time_picker_text}"
-    ).inner_text()
+    time_selected = locate(page, "schedule.time_picker_text").inner_text()
     time_selected_hour = int(time_selected.split(":")[0])
     time_selected_minute = int(time_selected.split(":")[1])
 
@@ -750,22 +1235,24 @@ def __verify_time_picked_is_correct(page: Page, hour: int, minute: int) -> None:
         raise Exception(msg)
 
 
+@timed("post_video")
 def _post_video(page: Page) -> None:
     """
     Posts the video
     """
     logger.debug(green("Clicking the post button"))
 
-    post_btn = page.locator(f"xpath={config.selectors.upload.post}")
     try:
-
-        def is_enabled():
-            return post_btn.get_attribute("data-disabled") == "false"
-
-        for _ in range(int(config.uploading_wait / 2)):
-            if is_enabled():
-                break
-            time.sleep(2)
+        post_btn = resolve(page, "upload.post")
+        try:
+            with adaptive("post_enabled", config.uploading_wait) as timeout:
+                page.wait_for_function(
+                    POST_ENABLED_JS,
+                    arg=SelectorRegistry.of(page).selector("upload.post"),
+                    timeout=timeout,
+                )
+        except PlaywrightTimeoutError:
+            logger.debug(red("Post button is still disabled, clicking anyway"))
 
         post_btn.scroll_into_view_if_needed()
         post_btn.click()
@@ -774,21 +1261,29 @@ def _post_video(page: Page) -> None:
         logger.debug(green("Trying to click on the button again (fallback)"))
         page.evaluate('document.querySelector(".TUXButton--primary").click()')
 
+    post_now = locate(page, "upload.post_now")
+    post_confirmation = locate(page, "upload.post_confirmation")
     try:
-        post_now = page.locator(f"xpath={config.selectors.upload.post_now}")
-        if post_now.is_visible(timeout=5000):
+        # the "Post now" dialog either shows up or the upload is confirmed directly
+        with adaptive("post_dialog", 5) as timeout:
+            post_now.or_(post_confirmation).first.wait_for(
+                state="visible", timeout=timeout
+            )
+        if post_now.is_visible():
             post_now.click()
     except Exception:
         pass
 
-    post_confirmation = page.locator(
-        f"xpath={config.selectors.upload.post_confirmation}"
-    )
-    post_confirmation.wait_for(state="attached", timeout=config.explicit_wait * 1000)
+    try:
+        with adaptive("post_confirmation", config.explicit_wait) as timeout:
+            post_confirmation.wait_for(state="attached", timeout=timeout)
+    except PlaywrightTimeoutError as exception:
+        raise PostNotConfirmed(exception) from exception
 
     logger.debug(green("Video posted successfully"))
 
 
+@timed("add_product_link")
 def _add_product_link(page: Page, product_id: str) -> None:
     """
     Adds the product link
@@ -799,34 +1294,35 @@ def _add_product_link(page: Page, product_id: str) -> None:
             "//button[contains(@class, 'Button__root') and contains(., 'Add')]"
         )
         add_link_button.click()
-        time.sleep(1)
 
+        search_input = page.locator("//input[@placeholder='Search products']")
         try:
             first_next = page.locator(
                 "//button[contains(@class, 'TUXButton--primary') and .//div[text()='Next']]"
             )
-            if first_next.is_visible(timeout=3000):
+            # the modal opens either on a "Next" step or straight on the search
+            with adaptive("product_modal", 3) as timeout:
+                first_next.or_(search_input).first.wait_for(
+                    state="visible", timeout=timeout
+                )
+            if first_next.is_visible():
                 first_next.click()
-                time.sleep(1)
         except Exception:
             pass
 
-        search_input = page.locator("//input[@placeholder='Search products']")
+        # actions below auto-wait for their element, so the fixed sleeps are gone
         search_input.fill(product_id)
         search_input.press("Enter")
-        time.sleep(3)
 
         product_radio = page.locator(
             f"//tr[.//span[contains(text(), '{product_id}')] or .//div[contains(text(), '{product_id}')]]//input[@type='radio' and contains(@class, 'TUXRadioStandalone-input')]"
         )
         product_radio.click()
-        time.sleep(1)
 
         second_next = page.locator(
             "//button[contains(@class, 'TUXButton--primary') and .//div[text()='Next']]"
         )
         second_next.click()
-        time.sleep(1)
 
         final_add = page.locator(
             "//button[contains(@class, 'TUXButton--primary') and .//div[text()='Add']]"
@@ -839,6 +1335,7 @@ def _add_product_link(page: Page, product_id: str) -> None:
         logger.error(red(f"Error adding product link: {e}"))
 
 
+@timed("set_cover")
 def _set_cover(page: Page, cover_path: str) -> None:
     """
     Adds a custom cover
@@ -848,155 +1345,40 @@ def _set_cover(page: Page, cover_path: str) -> None:
         if not _check_valid_cover_path(cover_path):
             raise Exception("Invalid cover image file path")
 
-        preview_loc = page.locator(
-            f"xpath={config.selectors.upload.cover.cover_preview}"
-        )
+        preview_loc = locate(page, "upload.cover.cover_preview")
         current_cover_src = preview_loc.get_attribute("src")
 
-        edit_cover_btn = page.locator(
-            f"xpath={config.selectors.upload.cover.edit_cover_button}"
-        )
+        edit_cover_btn = locate(page, "upload.cover.edit_cover_button")
         edit_cover_btn.click()
 
-        upload_tab = page.locator(
-            f"xpath={config.selectors.upload.cover.upload_cover_tab}"
-        )
+        upload_tab = locate(page, "upload.cover.upload_cover_tab")
         upload_tab.click()
 
-        upload_box = page.locator(f"xpath={config.selectors.upload.cover.upload_cover}")
-        upload_box.set_input_files(cover_path)
+        upload_box = locate(page, "upload.cover.upload_cover")
+        set_input_file(upload_box, cover_path)
 
-        confirm_btn = page.locator(
-            f"xpath={config.selectors.upload.cover.upload_confirmation}"
-        )
+        confirm_btn = locate(page, "upload.cover.upload_confirmation")
         confirm_btn.click()
 
-        def check_src_change():
-            return preview_loc.get_attribute("src") != current_cover_src
-
-        for _ in range(20):
-            if check_src_change():
-                break
-            time.sleep(0.5)
+        try:
+            with adaptive("cover_preview", 10) as timeout:
+                page.wait_for_function(
+                    ATTRIBUTE_CHANGED_JS,
+                    arg=[
+                        config.selectors.upload.cover.cover_preview,
+                        "src",
+                        current_cover_src,
+                    ],
+                    timeout=timeout,
+                )
+        except PlaywrightTimeoutError:
+            logger.debug(red("Cover preview did not change"))
 
     except Exception as e:
         logger.error(red(f"Error setting cover: {e}"))
         try:
-            exit_icon = page.locator(
-                f"xpath={config.selectors.upload.cover.exit_cover_container}"
-            )
+            exit_icon = locate(page, "upload.cover.exit_cover_container")
             if exit_icon.is_visible():
                 exit_icon.click()
         except Exception:
             pass
-
-
-def _check_valid_path(path: str) -> bool:
-    return exists(path) and path.split(".")[-1] in config.supported_file_types
-
-
-def _check_valid_cover_path(path: str) -> bool:
-    return exists(path) and path.split(".")[-1] in config.supported_image_file_types
-
-
-def _get_valid_schedule_minute(
-    schedule: datetime.datetime, valid_multiple
-) -> datetime.datetime:
-    if _is_valid_schedule_minute(schedule.minute, valid_multiple):
-        return schedule
-    else:
-        return _set_valid_schedule_minute(schedule, valid_multiple)
-
-
-def _is_valid_schedule_minute(minute: int, valid_multiple) -> bool:
-    if minute % valid_multiple != 0:
-        return False
-    else:
-        return True
-
-
-def _set_valid_schedule_minute(
-    schedule: datetime.datetime, valid_multiple: int
-) -> datetime.datetime:
-    minute = schedule.minute
-    remainder = minute % valid_multiple
-    integers_to_valid_multiple = 5 - remainder
-    schedule += datetime.timedelta(minutes=integers_to_valid_multiple)
-    return schedule
-
-
-def _check_valid_schedule(schedule: datetime.datetime) -> bool:
-    valid_tiktok_minute_multiple = 5
-    margin_to_complete_upload_form = 5
-    datetime_utc_now = pytz.UTC.localize(datetime.datetime.utcnow())
-    min_datetime_tiktok_valid = datetime_utc_now + datetime.timedelta(minutes=15)
-    min_datetime_tiktok_valid += datetime.timedelta(
-        minutes=margin_to_complete_upload_form
-    )
-    max_datetime_tiktok_valid = datetime_utc_now + datetime.timedelta(days=10)
-    if schedule < min_datetime_tiktok_valid or schedule > max_datetime_tiktok_valid:
-        return False
-    elif not _is_valid_schedule_minute(schedule.minute, valid_tiktok_minute_multiple):
-        return False
-    else:
-        return True
-
-
-def _convert_videos_dict(
-    videos_list_of_dictionaries: list[dict[str, Any]],
-) -> list[VideoDict]:
-    if not videos_list_of_dictionaries:
-        raise RuntimeError("No videos to upload")
-
-    valid_path = config.valid_path_names
-    valid_description = config.valid_descriptions
-
-    correct_path = valid_path[0]
-    correct_description = valid_description[0]
-
-    def intersection(lst1, lst2):
-        return list(set(lst1) & set(lst2))
-
-    return_list: list[VideoDict] = []
-    for elem in videos_list_of_dictionaries:
-        elem = {k.strip().lower(): v for k, v in elem.items()}
-        keys = elem.keys()
-        path_intersection = intersection(valid_path, keys)
-        description_intersection = intersection(valid_description, keys)
-
-        if path_intersection:
-            path = elem[path_intersection.pop()]
-            if not _check_valid_path(path):
-                raise RuntimeError("Invalid path: " + path)
-            elem[correct_path] = path
-        else:
-            for _, value in elem.items():
-                if _check_valid_path(value):
-                    elem[correct_path] = value
-                    break
-            else:
-                raise RuntimeError("Path not found in dictionary: " + str(elem))
-
-        if description_intersection:
-            elem[correct_description] = elem[description_intersection.pop()]
-        else:
-            for _, value in elem.items():
-                if not _check_valid_path(value):
-                    elem[correct_description] = value
-                    break
-            else:
-                elem[correct_description] = ""
-
-        return_list.append(elem)  # type: ignore
-
-    return return_list
-
-
-class DescriptionTooLong(Exception):
-    def __init__(self, message: str | None = None):
-        super().__init__(message or self.__doc__)
-
-
-class FailedToUpload(Exception):
-    def __init__(self, message=None):
-        super().__init__(message or self.__doc__)
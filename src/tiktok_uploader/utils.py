@@ -2,6 +2,13 @@
 Utilities for TikTok Uploader
 """
 
+import os
+import tempfile
+from collections.abc import Iterator
+from contextlib import contextmanager
+from os.path import abspath, basename, dirname, exists
+from typing import Any
+
 HEADER = "\033[95m"
 OKBLUE = "\033[94m"
 OKCYAN = "\033[96m"
@@ -39,3 +46,28 @@ def cyan(to_cyan: str) -> str:
     Returns the cyan green
     """
     return OKCYAN + to_cyan + ENDC
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = "w") -> Iterator[Any]:
+    """
+    Opens a temporary sibling of `path` for writing and moves it over `path` once
+    the block is done, so a crash never leaves a half written file behind
+
+    Every call gets its own temporary file, so concurrent writers never write
+    into each other's; the last one to finish wins.
+    """
+    path = abspath(path)
+    os.makedirs(dirname(path), exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(
+        dir=dirname(path), prefix=f"{basename(path)}.", suffix=".tmp"
+    )
+    try:
+        os.chmod(temporary, 0o644)  # mkstemp makes it private to the user
+        with open(descriptor, mode, encoding=None if "b" in mode else "utf-8") as file:
+            yield file
+        os.replace(temporary, path)
+    except BaseException:
+        if exists(temporary):
+            os.remove(temporary)
+        raise
@@ -0,0 +1,107 @@
+"""
+Tests for the AsyncTikTokUploader class
+"""
+
+import asyncio
+import os
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from tiktok_uploader.async_upload import AsyncTikTokUploader, _set_visibility
+
+FILENAME = "test.mp4"
+
+
+def setup_function() -> None:
+    """
+    Creates a dummy file
+    """
+    with open(FILENAME, "w", encoding="utf-8") as file:
+        file.write("test")
+
+
+def teardown_function() -> None:
+    """
+    Deletes the dummy file
+    """
+    if os.path.exists(FILENAME):
+        os.remove(FILENAME)
+
+
+@patch("tiktok_uploader.async_upload.async_playwright")
+@patch("tiktok_uploader.async_upload.get_async_browser", new_callable=AsyncMock)
+@patch(
+    "tiktok_uploader.auth.AuthBackend.authenticate_agent_async",
+    new_callable=AsyncMock,
+)
+@patch("tiktok_uploader.async_upload.complete_upload_form", new_callable=AsyncMock)
+def test_async_uploader_lazy_loading_and_reuse(
+    mock_complete_upload, mock_auth, mock_browser, mock_async_playwright
+) -> None:
+    """
+    Tests that the browser starts on the first upload and is reused afterwards
+    """
+    mock_playwright = AsyncMock()
+    mock_async_playwright.return_value.start = AsyncMock(return_value=mock_playwright)
+    mock_page = MagicMock()
+    mock_browser.return_value = mock_page
+    mock_auth.return_value = mock_page
+
+    async def run() -> None:
+        async with AsyncTikTokUploader(sessionid="test_session") as uploader:
+            mock_browser.assert_not_called()
+
+            assert await uploader.upload_video(FILENAME, description="Test 1")
+            assert await uploader.upload_video(FILENAME, description="Test 2")
+
+    asyncio.run(run())
+
+    mock_browser.assert_called_once()
+    mock_auth.assert_called_once()
+    assert mock_complete_upload.call_count == 2
+    mock_playwright.stop.assert_awaited_once()
+
+
+@patch("tiktok_uploader.async_upload.async_playwright")
+@patch("tiktok_uploader.async_upload.get_async_browser", new_callable=AsyncMock)
+@patch(
+    "tiktok_uploader.auth.AuthBackend.authenticate_agent_async",
+    new_callable=AsyncMock,
+)
+@patch("tiktok_uploader.async_upload.complete_upload_form", new_callable=AsyncMock)
+def test_async_uploader_reports_failures(
+    mock_complete_upload, mock_auth, mock_browser, mock_async_playwright
+) -> None:
+    """
+    Tests that failed uploads are returned and awaitable callbacks are awaited
+    """
+    mock_async_playwright.return_value.start = AsyncMock(return_value=AsyncMock())
+    error = RuntimeError("boom")
+    mock_complete_upload.side_effect = error
+    on_complete = AsyncMock()
+    on_error = MagicMock()
+
+    async def run() -> list:
+        uploader = AsyncTikTokUploader(sessionid="test_session")
+        return await uploader.upload_videos(
+            [{"path": FILENAME}], on_complete=on_complete, on_error=on_error
+        )
+
+    failed = asyncio.run(run())
+
+    assert len(failed) == 1
+    on_error.assert_called_once_with(failed[0], error)
+    on_complete.assert_awaited_once()
+
+
+def test_async_set_visibility_dropdown_interaction() -> None:
+    """
+    Tests the async _set_visibility function's interaction with the dropdown
+    """
+    mock_page = MagicMock()
+    mock_page.locator.return_value = AsyncMock()
+
+    with patch("tiktok_uploader.async_upload.asyncio.sleep", new_callable=AsyncMock):
+        asyncio.run(_set_visibility(mock_page, "only_you"))
+
+    assert mock_page.locator.call_count >= 2
+    mock_page.locator.return_value.click.assert_awaited()
@@ -0,0 +1,187 @@
+"""
+Tests the authentication backend
+"""
+
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+from pytest import raises
+
+from tiktok_uploader.auth import AuthBackend, InsufficientAuth, normalize_cookies
+from tiktok_uploader.types import Cookie
+
+
+def make_page(cookies: list[dict]) -> MagicMock:
+    page = MagicMock()
+    page.url = "https://www.tiktok.com/"
+    page.context.cookies.return_value = cookies
+    return page
+
+
+def write_state(path, validated_at: float) -> None:
+    path.write_text(json.dumps({"cookies": [], "origins": []}))
+    (path.parent / f"{path.name}.meta.json").write_text(
+        json.dumps({"validated_at": validated_at})
+    )
+
+
+def test_storage_state_counts_as_auth_source(tmp_path) -> None:
+    """
+    Tests that a saved storage state is enough to create the backend
+    """
+    state = tmp_path / "state.json"
+    with raises(InsufficientAuth):
+        AuthBackend(storage_state=str(state))
+
+    write_state(state, time.time())
+    assert AuthBackend(storage_state=str(state)).saved_storage_state() == str(state)
+
+
+@patch("tiktok_uploader.auth.expect")
+def test_fresh_storage_state_skips_validation(mock_expect, tmp_path) -> None:
+    """
+    Tests that a recently validated storage state skips the navigation
+    """
+    state = tmp_path / "state.json"
+    write_state(state, time.time())
+    page = make_page([{"name": "sessionid", "value": "abc"}])
+
+    AuthBackend(sessionid="abc", storage_state=str(state)).authenticate_agent(page)
+
+    page.goto.assert_not_called()
+    page.context.add_cookies.assert_not_called()
+
+
+@patch("tiktok_uploader.auth.expect")
+def test_stale_storage_state_is_revalidated_and_saved(mock_expect, tmp_path) -> None:
+    """
+    Tests that an old storage state is validated again and its timestamp renewed
+    """
+    state = tmp_path / "accounts" / "state.json"
+    state.parent.mkdir()
+    write_state(state, time.time() - 10 * 24 * 3600)
+    page = make_page([{"name": "sessionid", "value": "abc"}])
+
+    AuthBackend(sessionid="abc", storage_state=str(state)).authenticate_agent(page)
+
+    page.goto.assert_called_once()
+    page.context.add_cookies.assert_not_called()
+    page.context.storage_state.assert_called_once_with(path=str(state))
+    meta = json.loads((state.parent / "state.json.meta.json").read_text())
+    assert time.time() - meta["validated_at"] < 60
+
+
+@patch("tiktok_uploader.auth.expect")
+def test_signed_out_storage_state_falls_back_to_cookies(mock_expect, tmp_path) -> None:
+    """
+    Tests that the supplied cookies are only installed once the restored
+    session turned out to be signed out
+    """
+    state = tmp_path / "state.json"
+    write_state(state, time.time() - 10 * 24 * 3600)
+    page = make_page([])
+
+    AuthBackend(sessionid="abc", storage_state=str(state)).authenticate_agent(page)
+
+    installed = page.context.add_cookies.call_args.args[0]
+    assert [(c["name"], c["value"]) for c in installed] == [("sessionid", "abc")]
+
+
+@patch("tiktok_uploader.auth.login")
+@patch("tiktok_uploader.auth.expect")
+def test_signed_in_storage_state_skips_login(mock_expect, mock_login, tmp_path) -> None:
+    """
+    Tests that a stale storage state is checked before logging in again, and
+    that login only runs once the restored session is gone
+    """
+    state = tmp_path / "state.json"
+    write_state(state, time.time() - 10 * 24 * 3600)
+    auth = AuthBackend(username="user", password="pass", storage_state=str(state))
+    page = make_page([{"name": "sessionid", "value": "abc"}])
+
+    auth.authenticate_agent(page)
+
+    mock_login.assert_not_called()
+    page.context.storage_state.assert_called_once_with(path=str(state))
+
+    mock_login.return_value = [{"name": "sessionid", "value": "new"}]
+    signed_out = make_page([])
+    auth.authenticate_agent(signed_out)
+
+    mock_login.assert_called_once_with(signed_out, username="user", password="pass")
+
+
+def test_normalize_cookies() -> None:
+    """
+    Tests cookie normalization ahead of the batched insert
+    """
+    now = 1_700_000_000
+    cookies, rejected = normalize_cookies(
+        [
+            {
+                "name": "sessionid",
+                "value": "abc",
+                "expiry": now + 60,
+                "sameSite": "lax",
+            },
+            {"name": "old", "value": "x", "domain": ".tiktok.com", "expires": now - 1},
+            {"name": "cross", "value": "y", "sameSite": "no_restriction"},
+            {"name": "weird", "value": "z", "sameSite": "unspecified", "expiry": 0},
+            {"name": "", "value": "nameless"},
+            {"name": "url", "value": "u", "domain": "https://tiktok.com"},
+        ],
+        now=now,
+    )
+
+    assert [c["name"] for c in cookies] == ["sessionid", "cross", "weird", "url"]
+    assert cookies[0] == {
+        "name": "sessionid",
+        "value": "abc",
+        "domain": ".tiktok.com",
+        "path": "/",
+        "expires": now + 60,
+        "sameSite": "Lax",
+    }
+    assert cookies[1]["sameSite"] == "None" and cookies[1]["secure"] is True
+    assert "sameSite" not in cookies[2] and "expires" not in cookies[2]
+    assert cookies[3]["domain"] == "tiktok.com"
+    assert rejected == [
+        {"name": "old", "reason": "expired"},
+        {"name": "", "reason": "missing name or value"},
+    ]
+
+
+@patch("tiktok_uploader.auth.expect")
+def test_cookies_installed_in_one_call(mock_expect) -> None:
+    """
+    Tests that all cookies are installed with a single add_cookies call
+    """
+    page = make_page([{"name": "sessionid", "value": "abc"}])
+    cookies_list: list[Cookie] = [{"name": f"c{i}", "value": str(i)} for i in range(40)]
+
+    AuthBackend(cookies_list=cookies_list).authenticate_agent(page)
+
+    page.context.add_cookies.assert_called_once()
+    assert len(page.context.add_cookies.call_args[0][0]) == 40
+
+
+@patch("tiktok_uploader.auth.expect")
+def test_rejected_cookies_fall_back_and_are_reported(mock_expect) -> None:
+    """
+    Tests that a failed batch retries per cookie and reports the rejected ones
+    """
+    page = make_page([{"name": "sessionid", "value": "abc"}])
+
+    def add_cookies(cookies):
+        if any(c["name"] == "bad" for c in cookies):
+            raise ValueError("invalid cookie")
+
+    page.context.add_cookies.side_effect = add_cookies
+    backend = AuthBackend(
+        cookies_list=[{"name": "good", "value": "1"}, {"name": "bad", "value": "2"}]
+    )
+    backend.authenticate_agent(page)
+
+    assert page.context.add_cookies.call_count == 3
+    assert backend.rejected_cookies == [{"name": "bad", "reason": "invalid cookie"}]
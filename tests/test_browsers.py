@@ -7,6 +7,13 @@ from unittest.mock import MagicMock, patch
 import tiktok_uploader.browsers as browsers
 
 
+def setup_function() -> None:
+    """
+    Starts every test with a fresh Playwright runtime
+    """
+    browsers.PlaywrightRuntime._local.runtime = None
+
+
 @patch("tiktok_uploader.browsers.sync_playwright")
 def test_get_browser(mock_sync_playwright):
     mock_p = MagicMock()
@@ -31,3 +38,134 @@ def test_get_browser(mock_sync_playwright):
     browsers.get_browser("chrome", headless=True)
     args, kwargs = mock_browser_type.launch.call_args
     assert kwargs["headless"] is True
+
+
+@patch("tiktok_uploader.browsers.sync_playwright")
+def test_get_browser_shares_browser_and_driver(mock_sync_playwright):
+    mock_p = mock_sync_playwright.return_value.start.return_value
+    mock_browser = mock_p.chromium.launch.return_value
+    contexts = [MagicMock(), MagicMock()]
+    mock_browser.new_context.side_effect = contexts
+    for context in contexts:
+        context.browser = mock_browser
+        context.new_page.return_value.context = context
+
+    first = browsers.get_browser("chromium", headless=True)
+    second = browsers.get_browser("chromium", headless=True)
+
+    # one driver and one browser, a context per caller
+    mock_sync_playwright.return_value.start.assert_called_once()
+    mock_p.chromium.launch.assert_called_once()
+    assert mock_browser.new_context.call_count == 2
+
+    browsers.close_browser(first)
+    contexts[0].close.assert_called_once()
+    mock_browser.close.assert_not_called()
+    mock_p.stop.assert_not_called()
+
+    browsers.close_browser(second)
+    mock_browser.close.assert_called_once()
+    mock_p.stop.assert_called_once()
+
+
+@patch("tiktok_uploader.browsers.sync_playwright")
+def test_get_browser_proxy_is_per_context(mock_sync_playwright):
+    mock_p = mock_sync_playwright.return_value.start.return_value
+
+    browsers.get_browser("chromium", proxy={"host": "127.0.0.1", "port": "8080"})
+    browsers.get_browser("chromium", proxy={"host": "127.0.0.2", "port": "8080"})
+
+    mock_p.chromium.launch.assert_called_once()
+    _, kwargs = mock_p.chromium.launch.return_value.new_context.call_args
+    assert kwargs["proxy"] == {"server": "127.0.0.2:8080"}
+
+
+def make_route(resource_type: str, url: str) -> MagicMock:
+    route = MagicMock()
+    route.request.resource_type = resource_type
+    route.request.url = url
+    return route
+
+
+def test_route_filter_lean_profile():
+    route_filter = browsers.RouteFilter.from_config("lean")
+    assert route_filter is not None
+
+    image = make_route("image", "https://p16-sign.tiktokcdn.com/cover.jpeg")
+    beacon = make_route("xhr", "https://mon-va.tiktokv.com/monitor_browser/collect")
+    tag = make_route("script", "https://www.googletagmanager.com/gtag/js?id=1")
+    upload = make_route("fetch", "https://www.tiktok.com/api/upload/video/")
+    page = make_route("document", "https://www.tiktok.com/creator-center/upload")
+
+    for route in (image, beacon, tag, upload, page):
+        route_filter.handle(route)
+
+    image.abort.assert_called_once()
+    beacon.abort.assert_called_once()
+    tag.fulfill.assert_called_once_with(status=204, body="")
+    upload.fallback.assert_called_once()
+    page.fallback.assert_called_once()
+    assert route_filter.stats == {
+        "blocked": 2,
+        "stubbed": 1,
+        "bytes_saved": browsers.ESTIMATED_BYTES["image"]
+        + browsers.ESTIMATED_BYTES["xhr"]
+        + browsers.ESTIMATED_BYTES["script"],
+        "by_resource_type": {"image": 1, "xhr": 1, "script": 1},
+    }
+
+
+@patch("tiktok_uploader.browsers.sync_playwright")
+def test_get_browser_installs_route_filter(mock_sync_playwright):
+    route_filter = browsers.RouteFilter.from_config("lean")
+    context = mock_sync_playwright.return_value.start.return_value.chromium.launch.return_value.new_context.return_value
+
+    browsers.get_browser("chromium", route_filter=route_filter)
+
+    context.route.assert_called_once_with("**/*", route_filter.handle)
+    assert browsers.RouteFilter.from_config("") is None
+
+
+@patch("tiktok_uploader.browsers.sync_playwright")
+def test_get_browser_connects_to_endpoints(mock_sync_playwright):
+    mock_p = mock_sync_playwright.return_value.start.return_value
+    remote = mock_p.chromium.connect.return_value
+    remote.new_context.return_value.browser = remote
+    remote.new_context.return_value.new_page.return_value.context = (
+        remote.new_context.return_value
+    )
+
+    page = browsers.get_browser("chromium", headless=True, endpoint="ws://farm:3000/")
+    browsers.get_browser("chromium", headless=True, endpoint="ws://farm:3000/")
+
+    mock_p.chromium.launch.assert_not_called()
+    mock_p.chromium.connect.assert_called_once()
+    args, kwargs = mock_p.chromium.connect.call_args
+    assert args == ("ws://farm:3000/",)
+    assert '"headless": true' in kwargs["headers"]["x-playwright-launch-options"]
+    assert browsers.is_remote(page)
+
+    with patch.object(browsers.config, "browser_protocol", "cdp"):
+        browsers.get_browser("chromium", endpoint="http://farm:9222")
+        mock_p.chromium.connect_over_cdp.assert_called_once_with("http://farm:9222")
+
+
+@patch("tiktok_uploader.browsers.sync_playwright")
+def test_page_timezone_is_pinned_or_read_once(mock_sync_playwright):
+    mock_p = mock_sync_playwright.return_value.start.return_value
+    context = mock_p.chromium.launch.return_value.new_context.return_value
+    page = context.new_page.return_value
+    page.context = context
+
+    with patch.object(browsers.config, "browser_timezone", "Europe/Berlin"):
+        assert browsers.get_browser("chromium") is page
+    _, kwargs = mock_p.chromium.launch.return_value.new_context.call_args
+    assert kwargs["timezone_id"] == "Europe/Berlin"
+    assert browsers.page_timezone(page) == "Europe/Berlin"
+    page.evaluate.assert_not_called()
+
+    unpinned = MagicMock()
+    unpinned.evaluate.return_value = "Asia/Tokyo"
+    assert browsers.page_timezone(unpinned) == "Asia/Tokyo"
+    assert browsers.page_timezone(unpinned) == "Asia/Tokyo"
+    unpinned.evaluate.assert_called_once()
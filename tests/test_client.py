@@ -82,3 +82,63 @@ def test_tiktok_uploader_reuse_browser(
 
     # Complete upload should be called twice
     assert mock_complete_upload.call_count == 2
+
+
+@patch("tiktok_uploader.upload.get_browser")
+@patch("tiktok_uploader.auth.AuthBackend.authenticate_agent")
+@patch("tiktok_uploader.upload._finish_upload_form")
+@patch("tiktok_uploader.upload._start_upload_form")
+def test_tiktok_uploader_tabs_pipeline(
+    mock_start, mock_finish, mock_auth, mock_browser
+) -> None:
+    """
+    Tests that uploads are pipelined round-robin across tabs of one context
+    """
+    mock_page = MagicMock()
+    second_tab = MagicMock()
+    mock_page.context.new_page.return_value = second_tab
+    mock_browser.return_value = mock_page
+    mock_auth.return_value = mock_page
+
+    events: list[tuple[str, object]] = []
+    mock_start.side_effect = lambda page, *a, **k: events.append(("start", page))
+    mock_finish.side_effect = lambda page, *a, **k: events.append(("finish", page))
+
+    uploader = TikTokUploader(sessionid="test_session", tabs=2)
+    failed = uploader.upload_videos([{"path": FILENAME}] * 3)
+
+    assert failed == []
+    mock_browser.assert_called_once()
+    mock_auth.assert_called_once()
+    mock_page.context.new_page.assert_called_once()
+    assert events == [
+        ("start", mock_page),
+        ("start", second_tab),
+        ("finish", mock_page),
+        ("start", mock_page),
+        ("finish", second_tab),
+        ("finish", mock_page),
+    ]
+
+
+@patch("tiktok_uploader.upload.get_browser")
+@patch("tiktok_uploader.auth.AuthBackend.authenticate_agent")
+@patch("tiktok_uploader.upload._finish_upload_form")
+@patch("tiktok_uploader.upload._start_upload_form")
+def test_tiktok_uploader_tabs_failure_frees_tab(
+    mock_start, mock_finish, mock_auth, mock_browser
+) -> None:
+    """
+    Tests that a failed pipelined upload is reported and its tab is reused
+    """
+    mock_page = MagicMock()
+    mock_browser.return_value = mock_page
+    mock_auth.return_value = mock_page
+    mock_finish.side_effect = [RuntimeError("boom"), None, None]
+
+    uploader = TikTokUploader(sessionid="test_session", tabs=2)
+    failed = uploader.upload_videos([{"path": FILENAME}] * 3)
+
+    assert len(failed) == 1
+    assert mock_start.call_count == 3
+    assert mock_finish.call_count == 3
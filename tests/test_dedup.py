@@ -0,0 +1,121 @@
+"""
+Tests content-hash deduplication of uploads
+"""
+
+import hashlib
+from unittest.mock import MagicMock, patch
+
+from tiktok_uploader.dedup import DedupIndex, DuplicateVideo, content_hash
+from tiktok_uploader.types import VideoDict
+from tiktok_uploader.upload import TikTokUploader
+
+
+def test_content_hash_streams_in_chunks(tmp_path) -> None:
+    """
+    Tests that the mapped, chunked hash matches hashing the whole file
+    """
+    data = bytes(range(256)) * 1000
+    (tmp_path / "video.mp4").write_bytes(data)
+    (tmp_path / "empty.mp4").write_bytes(b"")
+
+    assert content_hash(str(tmp_path / "video.mp4"), chunk_size=4096) == (
+        hashlib.sha256(data).hexdigest()
+    )
+    assert content_hash(str(tmp_path / "empty.mp4")) == hashlib.sha256().hexdigest()
+
+
+def test_index_caches_hashes_and_applies_policy(tmp_path) -> None:
+    """
+    Tests that an unchanged file is hashed once and duplicates follow the policy
+    """
+    index_path = str(tmp_path / "main" / "posted.json")
+    first, renamed = tmp_path / "first.mp4", tmp_path / "renamed.mp4"
+    first.write_bytes(b"same video")
+    renamed.write_bytes(b"same video")
+
+    index = DedupIndex(index_path, policy="skip")
+    assert index.allow(str(first))
+    index.record(str(first))
+
+    reloaded = DedupIndex(index_path, policy="skip")
+    with patch("tiktok_uploader.dedup.content_hash") as mock_hash:
+        mock_hash.return_value = reloaded.hashes[str(first)]["sha256"]
+        assert not reloaded.allow(str(first))  # only a stat
+        mock_hash.assert_not_called()
+        assert not reloaded.allow(str(renamed))
+        mock_hash.assert_called_once_with(str(renamed))
+
+    renamed.write_bytes(b"edited video")
+    assert reloaded.allow(str(renamed))
+
+    first.touch()
+    assert DedupIndex(index_path, policy="warn").allow(str(first))
+    assert DedupIndex(index_path, policy="force").allow(str(first))
+
+
+@patch("tiktok_uploader.upload.get_browser")
+@patch("tiktok_uploader.auth.AuthBackend.authenticate_agent")
+@patch("tiktok_uploader.upload.complete_upload_form")
+def test_upload_videos_skips_posted_content(
+    mock_complete_upload, mock_auth, mock_browser, tmp_path
+) -> None:
+    """
+    Tests that a re-emitted video is skipped before its form is filled in
+    """
+    mock_browser.return_value = mock_auth.return_value = MagicMock()
+    for name in ("a.mp4", "b.mp4", "c.mp4"):
+        (tmp_path / name).write_bytes(b"other" if name == "c.mp4" else b"video")
+
+    uploader = TikTokUploader(
+        sessionid="test_session", dedup_index=str(tmp_path / "posted.json")
+    )
+    completed: list[VideoDict] = []
+    on_error = MagicMock()
+    failed = uploader.upload_videos(
+        [{"path": str(tmp_path / name)} for name in ("a.mp4", "b.mp4", "c.mp4")],
+        on_complete=completed.append,
+        on_error=on_error,
+    )
+
+    assert failed == []
+    assert len(completed) == 3
+    on_error.assert_called_once()
+    video, exception = on_error.call_args.args
+    assert video["path"] == str(tmp_path / "b.mp4")
+    assert isinstance(exception, DuplicateVideo)
+    uploaded = [call.args[1] for call in mock_complete_upload.call_args_list]
+    assert uploaded == [str(tmp_path / "a.mp4"), str(tmp_path / "c.mp4")]
+
+
+@patch("tiktok_uploader.upload.get_browser")
+@patch("tiktok_uploader.auth.AuthBackend.authenticate_agent")
+@patch("tiktok_uploader.upload._finish_upload_form")
+@patch("tiktok_uploader.upload._start_upload_form")
+def test_pipelined_uploads_skip_copies_in_flight(
+    mock_start, mock_finish, mock_auth, mock_browser, tmp_path
+) -> None:
+    """
+    Tests that two copies of a video in one batch are not both posted while
+    their tabs upload side by side, and that a failed upload frees its content
+    """
+    mock_browser.return_value = mock_auth.return_value = MagicMock()
+    for name in ("a.mp4", "b.mp4", "c.mp4"):
+        (tmp_path / name).write_bytes(b"other" if name == "c.mp4" else b"video")
+    paths = [str(tmp_path / name) for name in ("a.mp4", "b.mp4", "c.mp4")]
+
+    uploader = TikTokUploader(
+        sessionid="test_session", tabs=2, dedup_index=str(tmp_path / "posted.json")
+    )
+    on_error = MagicMock()
+    videos: list[VideoDict] = [{"path": path} for path in paths]
+    assert uploader.upload_videos(videos, on_error=on_error) == []
+    assert isinstance(on_error.call_args.args[1], DuplicateVideo)
+    started = [call.args[1] for call in mock_start.call_args_list]
+    assert started == [paths[0], paths[2]]
+
+    mock_start.reset_mock()
+    mock_finish.side_effect = RuntimeError("lost the tab")
+    other = tmp_path / "d.mp4"
+    other.write_bytes(b"another")
+    uploader.upload_videos([{"path": str(other)}, {"path": str(other)}])
+    assert uploader.dedup is not None and uploader.dedup.reserved == {}
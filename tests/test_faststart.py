@@ -0,0 +1,94 @@
+"""
+Tests moving the moov box to the front of MP4 files
+"""
+
+import struct
+from unittest.mock import patch
+
+from tests.test_media import box, full_box, mp4
+from tiktok_uploader.faststart import faststart
+from tiktok_uploader.media import probe
+
+CHUNKS = [b"first chunk", b"second chunk", b"third chunk"]
+
+
+def moov_last(co64: bool = False) -> tuple[bytes, list[int]]:
+    """
+    An MP4 with moov after mdat whose chunk offset table points into mdat
+    """
+    ftyp = box(b"ftyp", b"isom", bytes(4))
+    free = box(b"free", bytes(10))
+    mdat = box(b"mdat", *CHUNKS)
+
+    offsets, position = [], len(ftyp) + len(free) + 8
+    for chunk in CHUNKS:
+        offsets.append(position)
+        position += len(chunk)
+
+    code = ">Q" if co64 else ">I"
+    table = struct.pack(">I", len(offsets)) + b"".join(
+        struct.pack(code, o) for o in offsets
+    )
+    stbl = box(
+        b"stbl",
+        full_box(b"stsd", struct.pack(">I", 1) + box(b"avc1", bytes(8))),
+        full_box(b"co64" if co64 else b"stco", table),
+    )
+    hdlr = full_box(b"hdlr", bytes(4) + b"vide" + bytes(12))
+    tkhd = full_box(b"tkhd", bytes(80))
+    trak = box(b"trak", tkhd, box(b"mdia", hdlr, box(b"minf", stbl)))
+    mvhd = full_box(b"mvhd", bytes(8) + struct.pack(">II", 1000, 5000))
+    return ftyp + free + mdat + box(b"moov", mvhd, trak), offsets
+
+
+def chunk_offsets(data: bytes) -> list[int]:
+    for kind in (b"stco", b"co64"):
+        at = data.find(kind)
+        if at != -1:
+            (count,) = struct.unpack_from(">I", data, at + 8)
+            code, width = (">I", 4) if kind == b"stco" else (">Q", 8)
+            return [
+                struct.unpack_from(code, data, at + 12 + i * width)[0]
+                for i in range(count)
+            ]
+    return []
+
+
+def test_faststart_moves_moov_and_fixes_offsets(tmp_path) -> None:
+    """
+    Tests that the rewritten file starts with moov and its offsets still
+    point at the same chunks, for both offset table widths
+    """
+    for co64 in (False, True):
+        source = tmp_path / f"video-{co64}.mp4"
+        data, _ = moov_last(co64)
+        source.write_bytes(data)
+
+        staged = faststart(str(source), cache_dir=str(tmp_path / "cache"))
+        assert staged != str(source)
+
+        rewritten = open(staged, "rb").read()
+        assert len(rewritten) == len(data)
+        assert rewritten[4:8] == b"ftyp" and rewritten[20:24] == b"moov"
+        info = probe(staged)
+        assert info["faststart"] is True and info["problems"] == []
+
+        offsets = chunk_offsets(rewritten)
+        for offset, chunk in zip(offsets, CHUNKS):
+            assert rewritten[offset : offset + len(chunk)] == chunk
+
+
+def test_faststart_skips_and_reuses(tmp_path) -> None:
+    """
+    Tests that faststart files are left alone and rewrites are cached
+    """
+    ready = tmp_path / "ready.mp4"
+    ready.write_bytes(mp4(faststart=True))
+    assert faststart(str(ready), cache_dir=str(tmp_path)) == str(ready)
+
+    source = tmp_path / "video.mp4"
+    source.write_bytes(moov_last()[0])
+    staged = faststart(str(source), cache_dir=str(tmp_path / "cache"))
+    with patch("tiktok_uploader.faststart.rewrite") as mock_rewrite:
+        assert faststart(str(source), cache_dir=str(tmp_path / "cache")) == staged
+        mock_rewrite.assert_not_called()
@@ -0,0 +1,166 @@
+"""
+Tests the SQLite upload job queue and its worker loop
+"""
+
+import datetime
+from unittest.mock import MagicMock, patch
+
+from tiktok_uploader.dedup import DuplicateVideo
+from tiktok_uploader.jobs import JobQueue, work
+from tiktok_uploader.retry import CircuitBreaker, CircuitOpen
+from tiktok_uploader.types import VideoDict
+
+
+def test_leases_are_exclusive_and_expire(tmp_path) -> None:
+    """
+    Tests that two workers never get the same job and a dead worker's jobs
+    are resumed once its lease runs out
+    """
+    path = str(tmp_path / "jobs.db")
+    schedule = datetime.datetime(2030, 1, 1, 12, tzinfo=datetime.timezone.utc)
+    first, second = JobQueue(path, lease=60), JobQueue(path, lease=60)
+    ids = first.add(
+        [{"path": "a.mp4", "schedule": schedule}, {"path": "b.mp4"}, {"path": "c.mp4"}]
+    )
+
+    a = first.lease("one", limit=2)
+    b = second.lease("two", limit=2)
+    assert [job["id"] for job in a] == ids[:2]
+    assert [job["id"] for job in b] == ids[2:]
+    assert a[0]["video"]["schedule"] == schedule
+    assert second.lease("two") == []
+
+    # "one" crashes; after its lease its jobs go to the next worker
+    now = (a[0]["leased_until"] or 0) + 1
+    with patch("tiktok_uploader.jobs.time.time", return_value=now):
+        resumed = second.lease("two", limit=2)
+    assert [job["id"] for job in resumed] == ids[:2]
+    assert all(job["attempts"] == 2 for job in resumed)
+    assert first.counts() == {
+        "pending": 0,
+        "in_progress": 3,
+        "posted": 0,
+        "skipped": 0,
+        "failed": 0,
+    }
+
+
+def test_fail_retries_until_attempts_run_out(tmp_path) -> None:
+    """
+    Tests that failures put the job back in line until max_attempts
+    """
+    queue = JobQueue(str(tmp_path / "jobs.db"), max_attempts=2)
+    (job_id,) = queue.add([{"path": "a.mp4"}], account="main")
+
+    assert queue.lease("w", account="other") == []
+    queue.lease("w", account="main")
+    assert queue.fail(job_id, "TimeoutError: post button") == "pending"
+    queue.lease("w")
+    assert queue.fail(job_id, "TimeoutError: post button") == "failed"
+    assert queue.lease("w") == []
+
+    job = queue.get(job_id)
+    assert job is not None and job["attempts"] == 2
+    assert job["error"] == "TimeoutError: post button"
+
+    assert queue.retry_failed() == 1
+    assert queue.counts()["pending"] == 1
+
+
+def test_work_records_each_outcome(tmp_path) -> None:
+    """
+    Tests that the worker marks posted, skipped and failed jobs with their errors
+    """
+    videos: list[VideoDict] = []
+    for name in ("ok", "broken", "copy"):
+        (tmp_path / f"{name}.mp4").write_bytes(b"")
+        videos.append({"path": str(tmp_path / f"{name}.mp4"), "description": name})
+    videos.append({"path": str(tmp_path / "missing.mp4")})
+
+    queue = JobQueue(str(tmp_path / "jobs.db"), max_attempts=1)
+    ids = queue.add(videos)
+
+    def upload_videos(batch, on_complete, on_error):
+        failed = []
+        for video in batch:
+            if video["description"] == "broken":
+                failed.append(video)
+                on_error(video, TimeoutError("no confirmation"))
+            elif video["description"] == "copy":
+                on_error(video, DuplicateVideo(video["path"]))
+            on_complete(video)
+        return failed
+
+    uploader = MagicMock(tabs=2, account=None)
+    uploader.upload_videos.side_effect = upload_videos
+
+    counts = work(queue, uploader)
+
+    assert counts == {
+        "pending": 0,
+        "in_progress": 0,
+        "posted": 1,
+        "skipped": 1,
+        "failed": 2,
+    }
+    jobs = {job["id"]: job for job in queue.jobs()}
+    assert jobs[ids[0]]["state"] == "posted"
+    assert jobs[ids[1]]["error"] == "TimeoutError: no confirmation"
+    assert jobs[ids[2]]["state"] == "skipped"
+    assert "missing.mp4" in (jobs[ids[3]]["error"] or "")
+
+
+def test_work_leases_only_its_account(tmp_path) -> None:
+    """
+    Tests that a worker never posts another account's videos, and that videos
+    rejected before upload are not retried
+    """
+    (tmp_path / "a.mp4").write_bytes(b"")
+    queue = JobQueue(str(tmp_path / "jobs.db"), max_attempts=3)
+    (mine,) = queue.add([{"path": str(tmp_path / "a.mp4")}], account="main")
+    (theirs,) = queue.add([{"path": str(tmp_path / "a.mp4")}], account="alt")
+
+    uploader = MagicMock(tabs=2, account="main")
+    uploader.upload_videos.return_value = []  # rejected, on_complete never runs
+
+    work(queue, uploader)
+
+    assert uploader.upload_videos.call_count == 1
+    assert queue.get(mine)["state"] == "failed"  # type: ignore[index]
+    assert queue.get(theirs)["state"] == "pending"  # type: ignore[index]
+
+
+def test_work_waits_out_an_open_breaker(tmp_path) -> None:
+    """
+    Tests that jobs skipped by an open circuit breaker keep their attempts and
+    are leased again once it lets videos through
+    """
+    (tmp_path / "a.mp4").write_bytes(b"")
+    queue = JobQueue(str(tmp_path / "jobs.db"), max_attempts=1)
+    ids = queue.add([{"path": str(tmp_path / "a.mp4")}] * 3)
+
+    clock = [0.0]
+    breaker = CircuitBreaker(cooldown=600, clock=lambda: clock[0])
+    calls: list[int] = []
+
+    def upload_videos(videos, on_complete, on_error):
+        calls.append(len(videos))
+        if len(calls) == 1:
+            breaker.opened_at, breaker.error_class = clock[0], "network"
+        for video in videos:
+            if breaker.state == "open":
+                on_error(video, CircuitOpen("network", breaker.retry_in))
+            on_complete(video)
+        return []
+
+    def sleep(seconds: float) -> None:
+        clock[0] += seconds
+
+    uploader = MagicMock(tabs=2, account="", breaker=breaker)
+    uploader.upload_videos.side_effect = upload_videos
+    with patch("tiktok_uploader.jobs.time.sleep", side_effect=sleep) as mock_sleep:
+        work(queue, uploader)
+
+    mock_sleep.assert_called_once_with(600)
+    assert calls == [2, 2, 1]
+    assert [queue.get(i)["state"] for i in ids] == ["posted"] * 3  # type: ignore[index]
@@ -0,0 +1,65 @@
+"""
+Tests the selector registry and its fallback chains
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+from tiktok_uploader import config
+from tiktok_uploader.locators import SelectorRegistry, locate, normalize, resolve
+from tiktok_uploader.retry import classify
+
+
+def test_registry_chains() -> None:
+    """
+    Tests that every selector of the config gets an engine and its fallbacks
+    """
+    selectors = config.selectors.model_copy(
+        update={"fallbacks": {"upload.post": ["data-e2e=post", "button.post"]}}
+    )
+    registry = SelectorRegistry(selectors)
+
+    assert registry.chains["upload.post"] == [
+        f"xpath={config.selectors.upload.post}",
+        'css=[data-e2e="post"]',
+        "css=button.post",
+    ]
+    assert registry.chains["schedule.switch"] == [
+        f"xpath={config.selectors.schedule.switch}"
+    ]
+    assert "login.cookie_of_interest" not in registry.chains
+    assert normalize("(//div)[2]") == "xpath=(//div)[2]"
+
+    bad = config.selectors.model_copy(update={"fallbacks": {"upload.typo": ["a"]}})
+    with pytest.raises(ValueError):
+        SelectorRegistry(bad)
+
+
+def test_resolve_falls_through_and_keeps_stats() -> None:
+    """
+    Tests that a stale primary selector is passed over in one round trip, and
+    that the alternative that matched is used from then on
+    """
+    page = MagicMock()
+    chain = SelectorRegistry.of(page).chains["upload.post"]
+
+    # until an alternative matched, locators match any of them
+    locate(page, "upload.post")
+    page.locator.return_value.or_.assert_called_once()
+
+    page.evaluate.return_value = 1
+    resolve(page, "upload.post")
+    page.evaluate.assert_called_once()
+    page.locator.assert_called_with(chain[1])
+    assert SelectorRegistry.of(page).selector("upload.post") == chain[1]
+
+    page.evaluate.return_value = -1
+    with pytest.raises(PlaywrightTimeoutError) as error:
+        resolve(page, "upload.post", timeout=0.1)
+    assert classify(error.value) == "selector"
+
+    stats = SelectorRegistry.of(page).stats["upload.post"]
+    assert [(s["hits"], s["misses"]) for s in stats] == [(0, 2), (1, 1)]
+    assert stats[1]["seconds"] > 0
@@ -0,0 +1,127 @@
+"""
+Tests the container preflight on small hand-built MP4 and WebM files
+"""
+
+import struct
+from unittest.mock import patch
+
+from tiktok_uploader import config
+from tiktok_uploader.forms import _prepare_video
+from tiktok_uploader.media import preflight, probe
+
+
+def box(kind: bytes, *children: bytes) -> bytes:
+    payload = b"".join(children)
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+def full_box(kind: bytes, body: bytes, version: int = 0) -> bytes:
+    return box(kind, bytes([version, 0, 0, 0]), body)
+
+
+def track(handler: bytes, codec: bytes, width: int = 0, height: int = 0) -> bytes:
+    tkhd = full_box(b"tkhd", bytes(72) + struct.pack(">II", width << 16, height << 16))
+    hdlr = full_box(b"hdlr", bytes(4) + handler + bytes(12))
+    stsd = full_box(b"stsd", struct.pack(">I", 1) + box(codec, bytes(8)))
+    stbl = box(b"stbl", stsd)
+    return box(b"trak", tkhd, box(b"mdia", hdlr, box(b"minf", stbl)))
+
+
+def mp4(seconds: int = 12, faststart: bool = True, brand: bytes = b"isom") -> bytes:
+    mvhd = full_box(b"mvhd", bytes(8) + struct.pack(">II", 1000, seconds * 1000))
+    moov = box(
+        b"moov",
+        mvhd,
+        track(b"vide", b"avc1", 1080, 1920),
+        track(b"soun", b"mp4a"),
+    )
+    mdat = box(b"mdat", bytes(4096))
+    ftyp = box(b"ftyp", brand, bytes(4))
+    return ftyp + (moov + mdat if faststart else mdat + moov)
+
+
+def element(element_id: int, payload: bytes) -> bytes:
+    length = (element_id.bit_length() + 7) // 8
+    return element_id.to_bytes(length, "big") + bytes([0x80 | len(payload)]) + payload
+
+
+def webm(seconds: float) -> bytes:
+    header = element(0x1A45DFA3, element(0x4282, b"webm"))
+    info = element(
+        0x1549A966,
+        element(0x2AD7B1, (1_000_000).to_bytes(3, "big"))
+        + element(0x4489, struct.pack(">d", seconds * 1000)),
+    )
+    video = element(0xE0, element(0xB0, bytes([2, 208])) + element(0xBA, bytes([5])))
+    tracks = element(
+        0x1654AE6B,
+        element(0xAE, element(0x83, b"\x01") + element(0x86, b"V_VP9") + video),
+    )
+    cluster = element(0x1F43B675, bytes(64))
+    segment = info + tracks + cluster
+    return header + b"\x18\x53\x80\x67\x01\xff\xff\xff\xff\xff\xff\xff" + segment
+
+
+def test_probe_mp4(tmp_path) -> None:
+    """
+    Tests reading duration, resolution, codecs and moov placement
+    """
+    (tmp_path / "a.mp4").write_bytes(mp4())
+    (tmp_path / "b.mov").write_bytes(mp4(faststart=False, brand=b"qt  "))
+
+    info = probe(str(tmp_path / "a.mp4"))
+    assert info["problems"] == []
+    assert info["container"] == "mp4"
+    assert info["duration"] == 12
+    assert (info["width"], info["height"]) == (1080, 1920)
+    assert (info["video_codec"], info["audio_codec"]) == ("avc1", "mp4a")
+    assert info["faststart"] is True
+
+    info = probe(str(tmp_path / "b.mov"))
+    assert info["container"] == "mov"
+    assert info["faststart"] is False
+
+
+def test_probe_webm(tmp_path) -> None:
+    """
+    Tests reading the EBML header, Info and Tracks of a WebM file
+    """
+    (tmp_path / "a.webm").write_bytes(webm(30.5))
+
+    info = probe(str(tmp_path / "a.webm"))
+    assert info["problems"] == []
+    assert info["container"] == "webm"
+    assert info["duration"] == 30.5
+    assert (info["width"], info["height"], info["video_codec"]) == (720, 5, "V_VP9")
+
+
+def test_preflight_rejects_and_caches(tmp_path) -> None:
+    """
+    Tests that empty, truncated and too long videos are rejected, once per file
+    """
+    (tmp_path / "empty.mp4").write_bytes(b"")
+    (tmp_path / "cut.mp4").write_bytes(mp4(faststart=False)[:-20])
+    (tmp_path / "long.mp4").write_bytes(mp4(seconds=config.max_video_duration + 1))
+    (tmp_path / "ok.mp4").write_bytes(mp4())
+
+    assert preflight(str(tmp_path / "empty.mp4"))["problems"] == ["the file is empty"]
+    assert "cut short" in preflight(str(tmp_path / "cut.mp4"))["problems"][0]
+    assert "max_video_duration" in preflight(str(tmp_path / "long.mp4"))["problems"][0]
+
+    with patch("tiktok_uploader.media.probe", wraps=probe) as mock_probe:
+        assert preflight(str(tmp_path / "ok.mp4"))["problems"] == []
+        assert preflight(str(tmp_path / "ok.mp4"))["problems"] == []
+        assert mock_probe.call_count == 1
+
+
+def test_rejected_videos_are_logged(tmp_path) -> None:
+    """
+    Tests that a video failing the preflight is skipped with a logged warning
+    """
+    (tmp_path / "empty.mp4").write_bytes(b"")
+
+    with patch("tiktok_uploader.forms.logger") as mock_logger:
+        assert _prepare_video({"path": str(tmp_path / "empty.mp4")}) is None
+
+    mock_logger.warning.assert_called_once()
+    assert "the file is empty" in mock_logger.warning.call_args.args
@@ -0,0 +1,82 @@
+"""
+Tests resolving mentions and the mention cache
+"""
+
+from unittest.mock import MagicMock, patch
+
+from tiktok_uploader.mentions import MentionCache
+from tiktok_uploader.upload import _add_mention, _match_mention
+
+
+def test_mention_cache_persists_and_expires(tmp_path) -> None:
+    """
+    Tests that entries are saved per file and dropped once past their TTL
+    """
+    path = str(tmp_path / "account" / "mentions.json")
+
+    cache = MentionCache(path, ttl=60)
+    cache.put("@Coach", 2, "coach")
+    cache.put("@nobody", None, None)
+
+    reloaded = MentionCache(path, ttl=60)
+    entry = reloaded.get("@coach")
+    assert entry is not None and entry["position"] == 2
+    assert entry["user_id"] == "coach"
+    assert reloaded.get("@nobody") is not None
+    assert reloaded.get("@unknown") is None
+
+    with patch("tiktok_uploader.mentions.time", return_value=entry["cached_at"] + 61):
+        assert reloaded.get("@coach") is None
+        assert MentionCache(path, ttl=60).get("@nobody") is None
+
+
+def test_match_mention() -> None:
+    """
+    Tests picking the visible suggestion whose user ID matches
+    """
+    texts = [None, "coachy Coach Y", "coach The Coach"]
+    assert _match_mention(texts, "@Coach") == (2, "coach")
+    assert _match_mention(texts, "@someone") == (None, None)
+
+
+@patch("tiktok_uploader.upload._wait_for_popover", return_value=True)
+def test_add_mention_follows_the_cached_user(mock_wait) -> None:
+    """
+    Tests that suggestions are read in one round-trip each time, and that the
+    cached user is found again after TikTok reorders them
+    """
+    mock_page = MagicMock()
+    user_ids = mock_page.locator.return_value
+    user_ids.evaluate_all.return_value = ["first", "coach The Coach"]
+    desc_locator = MagicMock()
+    cache = MentionCache()
+
+    assert _add_mention(mock_page, desc_locator, "@coach", cache)
+    user_ids.evaluate_all.return_value = ["coach The Coach", "first"]
+    assert _add_mention(mock_page, desc_locator, "@coach", cache)
+
+    assert user_ids.evaluate_all.call_count == 2
+    user_ids.all.assert_not_called()
+    assert [c.args[0] for c in desc_locator.press.call_args_list] == [
+        "ArrowDown",
+        "Enter",
+        "Enter",
+    ]
+    assert cache.get("@coach")["position"] == 0  # type: ignore[index]
+
+
+@patch("tiktok_uploader.upload._wait_for_popover")
+def test_add_mention_skips_known_misses(mock_wait) -> None:
+    """
+    Tests that a mention without a matching user is inserted as plain text
+    """
+    mock_page = MagicMock()
+    desc_locator = MagicMock()
+    cache = MentionCache()
+    cache.put("@nobody", None, None)
+
+    assert not _add_mention(mock_page, desc_locator, "@nobody", cache)
+
+    mock_wait.assert_not_called()
+    desc_locator.press_sequentially.assert_not_called()
+    mock_page.keyboard.insert_text.assert_called_once_with("@nobody")
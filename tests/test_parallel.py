@@ -0,0 +1,131 @@
+"""
+Tests the parallel uploader
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+from pytest import raises
+
+from tiktok_uploader.auth import InsufficientAuth
+from tiktok_uploader.parallel import ParallelUploader, _upload_account
+
+
+def thread_pool(max_workers, mp_context=None):
+    """
+    Stands in for ProcessPoolExecutor so mocks are shared with the workers
+    """
+    return ThreadPoolExecutor(max_workers=max_workers)
+
+
+def test_parallel_uploader_rejects_bad_credentials() -> None:
+    """
+    Tests that missing credentials fail before any worker starts
+    """
+    with raises(InsufficientAuth):
+        ParallelUploader({"good": {"sessionid": "a"}, "bad": {"username": "x"}})
+
+
+@patch("tiktok_uploader.parallel.ProcessPoolExecutor", thread_pool)
+@patch("tiktok_uploader.parallel.TikTokUploader")
+def test_parallel_uploader_merges_results(mock_uploader) -> None:
+    """
+    Tests that every account gets its own uploader and results are merged
+    """
+
+    def upload_videos(videos, num_retries, skip_split_window, **kwargs):
+        return [video for video in videos if video["path"] == "bad.mp4"]
+
+    mock_uploader.return_value.upload_videos.side_effect = upload_videos
+
+    uploader = ParallelUploader(
+        {"first": {"sessionid": "a"}, "second": {"sessionid": "b"}}, workers=2
+    )
+    result = uploader.upload_videos(
+        {
+            "first": [{"path": "a.mp4"}, {"path": "bad.mp4"}],
+            "second": [{"path": "c.mp4"}],
+        }
+    )
+
+    assert mock_uploader.call_count == 2
+    assert result["failed"] == {"first": [{"path": "bad.mp4"}], "second": []}
+    assert [t["path"] for t in result["timings"]["first"]] == ["a.mp4", "bad.mp4"]
+    assert len(result["timings"]["second"]) == 1
+
+
+@patch("tiktok_uploader.parallel.ProcessPoolExecutor", thread_pool)
+@patch("tiktok_uploader.parallel._upload_account")
+def test_parallel_uploader_crashed_worker_fails_all(mock_upload_account) -> None:
+    """
+    Tests that a crashed worker marks all of its account's videos as failed
+    """
+    mock_upload_account.side_effect = RuntimeError("browser died")
+
+    uploader = ParallelUploader({"first": {"sessionid": "a"}})
+    result = uploader.upload_videos({"first": [{"path": "a.mp4"}]})
+
+    assert result["failed"] == {"first": [{"path": "a.mp4"}]}
+    assert result["timings"] == {"first": []}
+
+
+@patch("tiktok_uploader.parallel.TikTokUploader")
+def test_upload_account_closes_uploader(mock_uploader) -> None:
+    """
+    Tests that the worker closes its browser even when the upload raises
+    """
+    instance = mock_uploader.return_value
+    instance.upload_videos.side_effect = RuntimeError("boom")
+
+    with raises(RuntimeError):
+        _upload_account(
+            "first",
+            {"sessionid": "a"},
+            [{"path": "a.mp4"}],
+            "chrome",
+            True,
+            1,
+            False,
+            {},
+        )
+
+    instance.close.assert_called_once()
+    assert mock_uploader.call_args.kwargs["sessionid"] == "a"
+
+
+@patch("tiktok_uploader.config.quit_on_end", False)
+@patch("tiktok_uploader.parallel.TikTokUploader")
+def test_upload_account_times_each_video(mock_uploader) -> None:
+    """
+    Tests that a video rejected before upload is timed on its own, and that the
+    browser is closed even without quit_on_end
+    """
+    instance = mock_uploader.return_value
+    instance.upload_videos.side_effect = lambda videos, *args, **kwargs: (
+        list(videos) if videos[0]["path"] == "bad.mp4" else []
+    )
+
+    failed, timings, _ = _upload_account(
+        "first",
+        {"sessionid": "a"},
+        [{"path": "bad.mp4"}, {"path": "a.mp4"}],
+        "chrome",
+        True,
+        1,
+        False,
+        {},
+    )
+
+    assert failed == [{"path": "bad.mp4"}]
+    assert [t["path"] for t in timings] == ["bad.mp4", "a.mp4"]
+    assert instance.upload_videos.call_count == 2
+    instance.close.assert_called_once()
+
+
+def test_unknown_account_raises() -> None:
+    """
+    Tests that videos for an account without credentials are rejected
+    """
+    uploader = ParallelUploader({"first": {"sessionid": "a"}})
+    with raises(KeyError):
+        uploader.upload_videos({"second": [MagicMock()]})
@@ -0,0 +1,112 @@
+"""
+Tests the bulk schedule planner
+"""
+
+import datetime
+import time
+
+import pytz
+from freezegun import freeze_time
+
+from tiktok_uploader.forms import _normalize_schedule
+from tiktok_uploader.jobs import JobQueue
+from tiktok_uploader.planner import ScheduleBounds, plan
+from tiktok_uploader.types import Cadence, VideoDict
+
+NOW = datetime.datetime(2024, 3, 29, 6, 0, tzinfo=pytz.UTC)
+BERLIN = pytz.timezone("Europe/Berlin")
+
+
+def test_plan_spreads_videos_over_windows() -> None:
+    """
+    Tests the even spread, the slot grid, the gap to booked slots and DST
+    """
+    cadence: Cadence = {
+        "per_day": 2,
+        "windows": [("09:00", "10:00"), ("18:00", "19:00")],
+        "timezone": "Europe/Berlin",
+        "min_gap": 30,
+    }
+    videos: list[VideoDict] = [
+        {"path": f"{i}.mp4", "description": ""} for i in range(6)
+    ]
+    booked = [BERLIN.localize(datetime.datetime(2024, 3, 29, 9, 20))]
+
+    scheduled, unplaced = plan(videos, cadence, booked=booked, now=NOW)
+
+    assert not unplaced
+    assert [v["path"] for v in scheduled] == [v["path"] for v in videos]
+    local = [v["schedule"].astimezone(BERLIN) for v in scheduled]
+    assert [t.strftime("%m-%d %H:%M") for t in local] == [
+        "03-29 09:50",  # 09:30 is 10 minutes from the booked slot
+        "03-29 18:30",
+        # Berlin switches to summer time on the 31st, the slots stay put
+        "03-30 09:30",
+        "03-30 18:30",
+        "03-31 09:30",
+        "03-31 18:30",
+    ]
+    assert all(ScheduleBounds(NOW).check([t.timestamp() for t in local]))
+    assert videos[0].get("schedule") is None
+
+
+def test_plan_keeps_valid_schedules_and_returns_the_rest() -> None:
+    """
+    Tests fixed schedules, invalid ones and running out of horizon
+    """
+    fixed = NOW + datetime.timedelta(hours=2)
+    videos: list[VideoDict] = [
+        {"path": "fixed.mp4", "description": "", "schedule": fixed},
+        {"path": "past.mp4", "description": "", "schedule": NOW},
+    ]
+    videos += [{"path": f"{i}.mp4", "description": ""} for i in range(30)]
+
+    scheduled, unplaced = plan(videos, {"per_day": 2, "days": 3}, now=NOW)
+
+    assert scheduled[0]["schedule"] == fixed
+    assert unplaced[0]["path"] == "past.mp4"
+    # today's passed slot moves to the earliest valid one, then 2 slots a day
+    assert len(scheduled) == 1 + 2 * 4
+    assert len(unplaced) == 1 + 22
+    stamps = [v["schedule"].timestamp() for v in scheduled]
+    assert len(set(stamps)) == len(stamps)
+
+
+def test_plan_large_manifest(tmp_path) -> None:
+    """
+    Tests that a manifest of thousands of videos is planned in one pass
+    """
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    booked: VideoDict = {
+        "path": "a.mp4",
+        "description": "",
+        "schedule": NOW + datetime.timedelta(hours=1),
+    }
+    queue.add([booked], account="main")
+    assert queue.schedules("main") == [booked["schedule"]]
+
+    videos: list[VideoDict] = [
+        {"path": f"{i}.mp4", "description": ""} for i in range(5000)
+    ]
+    start = time.perf_counter()
+    scheduled, unplaced = plan(
+        videos, {"per_day": 288}, booked=queue.schedules("main"), now=NOW
+    )
+
+    assert time.perf_counter() - start < 2
+    assert len(scheduled) + len(unplaced) == 5000
+    assert booked["schedule"] not in {v["schedule"] for v in scheduled}
+
+
+def test_planned_schedules_are_checked_against_their_plan() -> None:
+    """
+    Tests that a slot at the plan's lower bound is still accepted at upload time
+    """
+    videos: list[VideoDict] = [{"path": "a.mp4", "description": ""}]
+    scheduled, _ = plan(videos, {"per_day": 288}, now=NOW)
+    schedule = scheduled[0]["schedule"]
+    assert schedule == NOW + datetime.timedelta(minutes=20)
+
+    with freeze_time(NOW + datetime.timedelta(minutes=10)):
+        assert _normalize_schedule(schedule) is None
+        assert _normalize_schedule(schedule, scheduled[0]["planned_at"]) == schedule
@@ -0,0 +1,135 @@
+"""
+Tests the persistent per-account token buckets and the interleaving scheduler
+"""
+
+from os.path import basename
+from unittest.mock import MagicMock, patch
+
+from tiktok_uploader.dedup import DuplicateVideo
+from tiktok_uploader.jobs import JobQueue
+from tiktok_uploader.ratelimit import RateLimiter, run
+from tiktok_uploader.settings import RateLimit, RateLimits
+from tiktok_uploader.types import VideoDict
+
+LIMITS = RateLimits(
+    posts_per_hour=2,
+    posts_per_day=3,
+    min_spacing=60,
+    accounts={"fast": RateLimit(posts_per_day=0, posts_per_hour=0, min_spacing=0)},
+)
+
+
+def test_buckets_refill_and_persist(tmp_path) -> None:
+    """
+    Tests the hourly, daily and spacing limits, refunds and restarts
+    """
+    path = str(tmp_path / "limits.db")
+    limiter = RateLimiter(path, LIMITS)
+
+    assert limiter.acquire("main", now=0) == 0
+    assert limiter.acquire("main", now=10) == 50  # min_spacing
+    assert limiter.acquire("main", now=60) == 0
+    # the hourly bucket is empty and refills one post per 30 minutes
+    assert round(limiter.acquire("main", now=120)) == 1680
+    limiter.refund("main", now=120)
+    assert limiter.acquire("main", now=180) == 0
+
+    # limits hold across restarts
+    before = limiter.ready_in("main", now=200)
+    assert before > 0
+    assert RateLimiter(path, LIMITS).ready_in("main", now=200) == before
+    assert limiter.ready_in("fast", now=0) == 0
+
+    # a refund brings back the spacing of the post before
+    assert limiter.acquire("alt", now=0) == 0
+    assert limiter.acquire("alt", now=1000) == 0
+    limiter.refund("alt", now=1000)
+    assert limiter.ready_in("alt", now=1001) == 0
+
+    daily = RateLimiter(str(tmp_path / "daily.db"), RateLimits(posts_per_day=1))
+    assert daily.acquire("main", now=0) == 0
+    assert daily.acquire("main", now=43200) == 43200
+
+
+def test_run_interleaves_accounts(tmp_path) -> None:
+    """
+    Tests that a throttled account's jobs wait while another account posts
+    """
+    path = str(tmp_path / "jobs.db")
+    queue = JobQueue(path)
+    for account in ("slow", "fast"):
+        videos: list[VideoDict] = []
+        for i in (1, 2):
+            video = tmp_path / f"{account}-{i}.mp4"
+            video.write_bytes(b"")
+            videos.append({"path": str(video)})
+        queue.add(videos, account=account)
+    limiter = RateLimiter(
+        path, RateLimits(accounts={"slow": RateLimit(min_spacing=600)})
+    )
+
+    posted: list[str] = []
+
+    def uploader() -> MagicMock:
+        def upload_videos(videos, on_complete, on_error):
+            posted.extend(video["path"] for video in videos)
+            for video in videos:
+                on_complete(video)
+            return []
+
+        mock = MagicMock(tabs=1)
+        mock.breaker.state = "closed"
+        mock.upload_videos.side_effect = upload_videos
+        return mock
+
+    clock = [1000.0]
+    fake_time = MagicMock()
+    fake_time.time.side_effect = lambda: clock[0]
+    fake_time.sleep.side_effect = lambda seconds: clock.__setitem__(
+        0, clock[0] + seconds
+    )
+    with patch("tiktok_uploader.ratelimit.time", fake_time):
+        counts = run(queue, {"slow": uploader(), "fast": uploader()}, limiter)
+
+    assert counts["posted"] == 4
+    order = [basename(path).split("-")[0] for path in posted]
+    assert order == ["slow", "fast", "fast", "slow"]
+    assert clock[0] >= 1600
+
+
+def test_run_refunds_skipped_duplicates(tmp_path) -> None:
+    """
+    Tests that a job the dedup index skipped does not use up the account's posts
+    """
+    path = str(tmp_path / "jobs.db")
+    queue = JobQueue(path)
+    videos: list[VideoDict] = []
+    for name in ("copy", "new"):
+        video = tmp_path / f"{name}.mp4"
+        video.write_bytes(b"")
+        videos.append({"path": str(video)})
+    queue.add(videos, account="main")
+    limiter = RateLimiter(path, RateLimits(min_spacing=600))
+
+    def upload_videos(videos, on_complete, on_error):
+        for video in videos:
+            if basename(video["path"]) == "copy.mp4":
+                on_error(video, DuplicateVideo(video["path"]))
+            on_complete(video)
+        return []
+
+    uploader = MagicMock(tabs=1)
+    uploader.breaker.state = "closed"
+    uploader.upload_videos.side_effect = upload_videos
+
+    clock = [1000.0]
+    fake_time = MagicMock()
+    fake_time.time.side_effect = lambda: clock[0]
+    fake_time.sleep.side_effect = lambda seconds: clock.__setitem__(
+        0, clock[0] + seconds
+    )
+    with patch("tiktok_uploader.ratelimit.time", fake_time):
+        counts = run(queue, {"main": uploader}, limiter)
+
+    assert (counts["skipped"], counts["posted"]) == (1, 1)
+    assert clock[0] == 1000.0
@@ -0,0 +1,143 @@
+"""
+Tests error classification, retries with backoff and the circuit breaker
+"""
+
+import socket
+from unittest.mock import MagicMock, patch
+
+import pytest
+from playwright.sync_api import Error as PlaywrightError
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+from tiktok_uploader import spans
+from tiktok_uploader.auth import InsufficientAuth
+from tiktok_uploader.locators import SelectorNotFound
+from tiktok_uploader.retry import CircuitBreaker, CircuitOpen, classify, retry
+from tiktok_uploader.upload import (
+    FailedToUpload,
+    PostNotConfirmed,
+    TikTokUploader,
+    _set_video,
+)
+
+
+def test_classify() -> None:
+    """
+    Tests sorting exceptions, including wrapped ones, into error classes
+    """
+    locator_timeout = PlaywrightTimeoutError(
+        'Timeout 30000ms exceeded.\nwaiting for locator("xpath=//input")'
+    )
+    assert classify(InsufficientAuth()) == "auth"
+    assert classify(SelectorNotFound("upload.post")) == "selector"
+    assert classify(locator_timeout) == "timeout"
+    assert classify(PlaywrightError("net::ERR_CONNECTION_RESET at ...")) == "network"
+    assert classify(ConnectionResetError()) == "network"
+    assert classify(socket.gaierror()) == "network"
+    assert classify(FileNotFoundError("test.mp4")) == "validation"
+    assert classify(ValueError("bad schedule")) == "validation"
+    assert classify(FailedToUpload(SelectorNotFound("upload.post"))) == "selector"
+    assert classify(PostNotConfirmed(locator_timeout)) == "timeout"
+    assert classify(RuntimeError()) == "unknown"
+
+
+@patch("tiktok_uploader.retry.time.sleep")
+def test_retry_backs_off_per_class(mock_sleep) -> None:
+    """
+    Tests that network errors are retried with jittered, growing backoff
+    spans while validation errors and unretryable ones are raised at once
+    """
+    func = MagicMock(side_effect=[ConnectionResetError(), ConnectionResetError(), 42])
+    collector = spans.add_exporter(spans.SpanCollector())
+    try:
+        with patch("tiktok_uploader.retry.random.uniform", side_effect=lambda a, b: b):
+            assert retry(func) == 42
+    finally:
+        spans.remove_exporter(collector)
+
+    assert [c.args[0] for c in mock_sleep.call_args_list] == [5, 10]
+    assert [s["name"] for s in collector.spans] == ["backoff:network"] * 2
+
+    for exception in (ValueError("bad"), PostNotConfirmed("maybe posted")):
+        func = MagicMock(side_effect=exception)
+        with pytest.raises(type(exception)):
+            retry(func)
+        func.assert_called_once()
+
+    # a step's num_retries caps the attempts
+    func = MagicMock(side_effect=ConnectionResetError())
+    with pytest.raises(ConnectionResetError):
+        retry(func, attempts=1)
+    func.assert_called_once()
+
+
+def test_circuit_breaker() -> None:
+    """
+    Tests that the breaker opens after repeated failures, ignores validation
+    errors and lets one trial through after its cooldown
+    """
+    now = [0.0]
+    breaker = CircuitBreaker(threshold=2, cooldown=60, clock=lambda: now[0])
+
+    breaker.failure(ValueError("bad caption"))
+    breaker.failure(InsufficientAuth())
+    breaker.check()
+    breaker.failure(InsufficientAuth())
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpen) as error:
+        breaker.check()
+    assert classify(error.value) == "auth"
+
+    now[0] = 61
+    breaker.check()  # half open: one trial
+    breaker.failure(PlaywrightTimeoutError("Timeout 60000ms exceeded."))
+    assert breaker.state == "open"
+
+    now[0] = 122
+    breaker.success()
+    assert breaker.state == "closed"
+
+
+def test_set_video_raises_when_out_of_retries() -> None:
+    """
+    Tests that a video which never finishes processing fails instead of passing
+    """
+    page = MagicMock()
+    page.evaluate.return_value = 0  # the file input is found
+    page.locator.return_value.wait_for.side_effect = PlaywrightTimeoutError(
+        "Timeout 60000ms exceeded."
+    )
+    with (
+        patch("tiktok_uploader.upload.set_input_file"),
+        patch("tiktok_uploader.retry.time.sleep"),
+        pytest.raises(FailedToUpload),
+    ):
+        _set_video(page, path="video.mp4", num_retries=3)
+
+    # config.retry.timeout allows two attempts
+    assert page.locator.return_value.wait_for.call_count == 2
+
+
+@patch("tiktok_uploader.retry.time.sleep")
+@patch("tiktok_uploader.upload.get_browser")
+@patch("tiktok_uploader.auth.AuthBackend.authenticate_agent")
+@patch("tiktok_uploader.upload._finish_upload_form")
+@patch("tiktok_uploader.upload._start_upload_form")
+def test_pipelined_uploads_retry_on_the_same_tab(
+    mock_start, mock_finish, mock_auth, mock_browser, mock_sleep, tmp_path
+) -> None:
+    """
+    Tests that a pipelined upload whose finish failed with a network error is
+    started over on its tab and finished
+    """
+    mock_browser.return_value = mock_auth.return_value = MagicMock()
+    video = tmp_path / "a.mp4"
+    video.write_bytes(b"video")
+    mock_finish.side_effect = [ConnectionResetError(), None]
+
+    uploader = TikTokUploader(sessionid="test_session", tabs=2)
+    assert uploader.upload_videos([{"path": str(video)}]) == []
+
+    assert mock_start.call_count == mock_finish.call_count == 2
+    assert mock_start.call_args_list[0].args[0] is mock_start.call_args.args[0]
+    mock_sleep.assert_called_once()
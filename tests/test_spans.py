@@ -0,0 +1,100 @@
+"""
+Tests the span timing layer and its exporters
+"""
+
+import asyncio
+import json
+
+from pytest import raises
+
+from tiktok_uploader import spans
+from tiktok_uploader.types import SpanRecord
+
+
+def record(name: str, seconds: float, account: str = "main") -> SpanRecord:
+    return {
+        "name": name,
+        "path": "video.mp4",
+        "account": account,
+        "outcome": "ok",
+        "error": None,
+        "error_class": None,
+        "start": 0.0,
+        "seconds": seconds,
+        "bytes": None,
+    }
+
+
+def test_spans_inherit_path_account_and_record_errors() -> None:
+    """
+    Tests that steps carry the enclosing path and account, and failures
+    """
+    collector = spans.add_exporter(spans.SpanCollector())
+
+    @spans.timed("set_description")
+    def step(fail: bool) -> str:
+        if fail:
+            raise ValueError("bad")
+        return "done"
+
+    @spans.timed("post_video")
+    async def async_step() -> None:
+        pass
+
+    try:
+        with spans.span("upload", path="video.mp4", account="main"):
+            assert step(False) == "done"
+            with raises(ValueError):
+                step(True)
+            asyncio.run(async_step())
+    finally:
+        spans.remove_exporter(collector)
+
+    names = [(s["name"], s["outcome"], s["error"]) for s in collector.spans]
+    assert names == [
+        ("set_description", "ok", None),
+        ("set_description", "error", "ValueError"),
+        ("post_video", "ok", None),
+        ("upload", "ok", None),
+    ]
+    assert all(s["path"] == "video.mp4" for s in collector.spans)
+    assert all(s["account"] == "main" for s in collector.spans)
+
+
+def test_histogram_quantile() -> None:
+    """
+    Tests quantile estimates from the bucketed durations
+    """
+    histograms = spans.HistogramExporter(buckets=(1, 2, 4))
+    for seconds in (0.5, 1.5, 1.5, 3):
+        histograms.export(record("set_video", seconds))
+    histograms.export(record("set_video", 100, account="other"))
+
+    assert histograms.quantile("go_to_upload", 0.5) is None
+    assert histograms.quantile("set_video", 0.5, account="main") == 1.5
+    assert histograms.quantile("set_video", 1.0, account="main") == 4
+    assert histograms.quantile("set_video", 1.0) == 4  # +Inf is capped
+
+
+def test_jsonl_and_prometheus_exporters(tmp_path) -> None:
+    """
+    Tests the file based exporters
+    """
+    jsonl = spans.JsonlExporter(str(tmp_path / "spans.jsonl"))
+    prometheus = spans.PrometheusExporter(str(tmp_path / "metrics.prom"), (1, 5))
+
+    for exporter in (jsonl, prometheus):
+        exporter.export(record("post_video", 0.5))
+        exporter.export(record("post_video", 2))
+
+    lines = (tmp_path / "spans.jsonl").read_text().splitlines()
+    assert [json.loads(line)["seconds"] for line in lines] == [0.5, 2]
+
+    labels = 'step="post_video",account="main",outcome="ok"'
+    text = (tmp_path / "metrics.prom").read_text()
+    assert "# TYPE tiktok_uploader_step_seconds histogram" in text
+    assert f'tiktok_uploader_step_seconds_bucket{{{labels},le="1.0"}} 1' in text
+    assert f'tiktok_uploader_step_seconds_bucket{{{labels},le="5.0"}} 2' in text
+    assert f'tiktok_uploader_step_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+    assert f"tiktok_uploader_step_seconds_sum{{{labels}}} 2.5" in text
+    assert f"tiktok_uploader_step_seconds_count{{{labels}}} 2" in text
@@ -0,0 +1,110 @@
+"""
+Tests the timeouts learned from observed wait latencies
+"""
+
+import json
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+from tiktok_uploader import config
+from tiktok_uploader.locators import resolve
+from tiktok_uploader.timeouts import LatencyStats, adaptive, record, settle_window
+
+
+def test_timeout_follows_p99_within_bounds(tmp_path) -> None:
+    """
+    Tests the p99 multiple, its clamping and that timings persist
+    """
+    path = str(tmp_path / "timeouts.json")
+    stats = LatencyStats(path)
+    assert stats.timeout("upload_page", 60) == 60  # too few timings yet
+
+    for i in range(100):
+        stats.observe("upload_page", 1 + i / 100)  # 1.00 .. 1.99
+    stats.observe("selector:upload.post", 0.1)
+    stats.save()
+
+    restarted = LatencyStats(path)
+    assert restarted.quantile("upload_page") == pytest.approx(1.98)
+    assert restarted.timeout("upload_page", 60) == pytest.approx(3 * 1.98)
+    assert restarted.timeout("upload_page", 4) == 4
+
+    for _ in range(20):
+        restarted.observe("selector:upload.post", 0.1)
+    assert restarted.timeout("selector:upload.post", 30) == config.timeout_floor
+
+
+def test_adaptive_waits_are_cut_short_and_recorded() -> None:
+    """
+    Tests that a broken selector gives up after the learned timeout, and that
+    nothing changes while adaptive timeouts are off
+    """
+    stats = LatencyStats()
+    for _ in range(20):
+        stats.observe("selector:upload.post", 0.5)
+
+    page = MagicMock()
+    page.evaluate.return_value = -1  # no alternative matches
+    with (
+        patch("tiktok_uploader.timeouts.latency_stats", return_value=stats),
+        patch.object(config, "adaptive_timeouts", True),
+        pytest.raises(PlaywrightTimeoutError),
+    ):
+        resolve(page, "upload.post")
+
+    _, timeout_ms = page.evaluate.call_args.args[1]
+    assert timeout_ms == config.timeout_floor * 1000
+    assert stats.quantile("selector:upload.post", 1) == config.timeout_floor
+
+    with adaptive("selector:upload.post", 30, stats) as timeout_ms:
+        assert timeout_ms == 30_000
+
+
+def test_settle_window_covers_slow_popovers() -> None:
+    """
+    Tests that the quiet time before giving up on a popover grows to how long
+    it takes to show up
+    """
+    stats = LatencyStats()
+    assert settle_window("popover", 1.5, 5, stats) == 1.5  # adaptive timeouts off
+
+    with patch.object(config, "adaptive_timeouts", True):
+        assert settle_window("popover", 1.5, 5, stats) == 5  # nothing learned yet
+        for _ in range(20):
+            record("popover", 1.2, stats)
+        assert settle_window("popover", 1.5, 5, stats) == pytest.approx(3.6)
+        for _ in range(200):
+            record("popover", 0.1, stats)
+        assert settle_window("popover", 1.5, 5, stats) == 2
+
+
+def test_concurrent_saves_never_collide(tmp_path) -> None:
+    """
+    Tests that writers saving the same timings file at once each use their own
+    temporary file
+    """
+    path = tmp_path / "timeouts.json"
+    writers = [LatencyStats(str(path)) for _ in range(4)]
+    for i, stats in enumerate(writers):
+        stats.observe("upload_page", i)
+    errors: list[Exception] = []
+
+    def save(stats: LatencyStats) -> None:
+        try:
+            for _ in range(50):
+                stats.save()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=save, args=(s,)) for s in writers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(json.loads(path.read_text())["upload_page"]) == 1
+    assert [p.name for p in tmp_path.iterdir()] == ["timeouts.json"]
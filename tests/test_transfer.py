@@ -0,0 +1,43 @@
+"""
+Tests setting input files on local and remote browsers
+"""
+
+import base64
+from unittest.mock import MagicMock, patch
+
+from tiktok_uploader import spans
+from tiktok_uploader.transfer import ASSEMBLE_FILE, set_input_file
+
+
+def test_set_input_file_streams_to_remote_browsers(tmp_path) -> None:
+    """
+    Tests that remote browsers get the file in chunks and a span records its size
+    """
+    video = tmp_path / "video.mp4"
+    data = bytes(range(256)) * 10_000
+    video.write_bytes(data)
+
+    locator = MagicMock()
+    locator.evaluate.side_effect = lambda script, args: len(data)
+    collector = spans.add_exporter(spans.SpanCollector())
+    try:
+        with (
+            patch("tiktok_uploader.transfer.is_remote", return_value=True),
+            patch("tiktok_uploader.transfer.MB", 1024 * 1024 // 4),
+        ):
+            set_input_file(locator, str(video))
+        with patch("tiktok_uploader.transfer.is_remote", return_value=False):
+            set_input_file(locator, str(video))
+    finally:
+        spans.remove_exporter(collector)
+
+    calls = [c.args for c in locator.evaluate.call_args_list]
+    chunks = [args[0] for script, args in calls if script != ASSEMBLE_FILE]
+    assert len(chunks) == 3
+    assert b"".join(base64.b64decode(c) for c in chunks) == data
+    assert [args[1] for script, args in calls[:-1]] == [True, False, False]
+    assert calls[-1] == (ASSEMBLE_FILE, ["video.mp4", "video/mp4"])
+    locator.set_input_files.assert_called_once_with(str(video))
+
+    assert [s["name"] for s in collector.spans] == ["transfer", "transfer"]
+    assert collector.spans[0]["bytes"] == len(data)
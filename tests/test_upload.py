@@ -9,13 +9,18 @@ from unittest.mock import MagicMock, patch
 
 import pytz
 from freezegun import freeze_time
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
 from pytest import raises
 
 from tiktok_uploader.types import VideoDict
 from tiktok_uploader.upload import (
+    FailedToUpload,
     _check_valid_schedule,
     _convert_videos_dict,
     _get_valid_schedule_minute,
+    _normalize_schedule,
+    _set_schedule_video,
+    _wait_for_video,
     upload_video,
     upload_videos,
 )
@@ -202,6 +207,42 @@ def test_check_valid_schedule_minute_valid() -> None:
     assert _check_valid_schedule(schedule) is True
 
 
+@freeze_time("2020-01-01 12:00")
+def test_normalize_schedule_aware_utc() -> None:
+    """
+    Tests that aware UTC schedules are accepted and rounded up to 5 minutes
+    """
+    schedule = datetime.datetime(2020, 1, 2, 12, 3, tzinfo=datetime.timezone.utc)
+    assert _normalize_schedule(schedule) == timezone.localize(
+        datetime.datetime(2020, 1, 2, 12, 5)
+    )
+
+
+@patch("tiktok_uploader.upload.__time_picker")
+@patch("tiktok_uploader.upload.__date_picker")
+def test_set_schedule_video_types_then_falls_back(date_picker, time_picker) -> None:
+    """
+    Tests that the schedule is typed in the browser's timezone, and picked by
+    clicking when the widget has no inputs
+    """
+    page = MagicMock()
+    page.evaluate.side_effect = ["Europe/Berlin", True]
+    schedule = timezone.localize(datetime.datetime(2020, 7, 1, 10, 5))
+
+    _set_schedule_video(page, schedule)
+
+    _, arg = page.evaluate.call_args.args
+    assert arg[2:] == ["2020-07-01", "12:05"]
+    page.wait_for_function.assert_called_once()
+    date_picker.assert_not_called()
+
+    page.evaluate.side_effect = [False]  # the timezone is cached
+    _set_schedule_video(page, schedule)
+
+    date_picker.assert_called_once_with(page, 7, 1)
+    time_picker.assert_called_once_with(page, 12, 5)
+
+
 def test_convert_videos_dict_with_visibility() -> None:
     """
     Tests that visibility parameter is properly handled in video dict conversion
@@ -342,6 +383,62 @@ def test_set_visibility_dropdown_interaction() -> None:
     mock_page.locator.return_value.click.assert_called()
 
 
+@patch("tiktok_uploader.upload.time.sleep")
+def test_post_video_waits_in_the_browser(mock_sleep) -> None:
+    """
+    Tests that _post_video waits for the post button with wait_for_function
+    """
+    from tiktok_uploader.upload import POST_ENABLED_JS, _post_video
+
+    mock_page = MagicMock()
+    mock_page.evaluate.return_value = 0  # the primary post selector matches
+
+    _post_video(mock_page)
+
+    mock_page.wait_for_function.assert_called_once()
+    assert mock_page.wait_for_function.call_args[0][0] == POST_ENABLED_JS
+    mock_page.locator.return_value.click.assert_called()
+    mock_sleep.assert_not_called()
+
+
+def test_split_description() -> None:
+    """
+    Tests that only hashtags and mentions are split from the plain text
+    """
+    from tiktok_uploader.upload import _split_description
+
+    assert _split_description("Hi #cool clip by @me, a#b\nbye") == [
+        ("text", "Hi "),
+        ("#", "#cool"),
+        ("text", " clip by "),
+        ("@", "@me,"),
+        ("text", " a#b\nbye"),
+    ]
+    assert _split_description("plain") == [("text", "plain")]
+
+
+def test_type_description_inserts_plain_text() -> None:
+    """
+    Tests that plain runs are inserted whole and hashtags go through autocomplete
+    """
+    from tiktok_uploader.upload import _type_description
+
+    mock_page = MagicMock()
+    mock_page.evaluate.return_value = True  # the popover shows up
+    desc_locator = MagicMock()
+
+    _type_description(mock_page, desc_locator, "A long caption #tag done\nend")
+
+    assert [c.args[0] for c in mock_page.keyboard.insert_text.call_args_list] == [
+        "A long caption ",
+        "done",
+        "end",
+    ]
+    mock_page.keyboard.press.assert_called_once_with("Enter")
+    desc_locator.press_sequentially.assert_called_once_with("#tag", delay=50)
+    desc_locator.press.assert_called_once_with("Enter")
+
+
 def test_video_dict_type_with_visibility() -> None:
     """
     Tests that VideoDict TypedDict includes visibility field
@@ -389,3 +486,56 @@ def test_upload_videos_with_browser_agent_authenticates(
     )
 
     mock_authenticate_agent.assert_called_once_with(browser_agent)
+
+
+def test_complete_upload_form_overlap_fills_form_before_waiting() -> None:
+    """
+    Tests that overlap mode fills the form before waiting on the video
+    """
+    from tiktok_uploader.upload import complete_upload_form
+
+    events: list[str] = []
+    steps = [
+        "_go_to_upload",
+        "_remove_cookies_window",
+        "_set_video",
+        "_wait_for_video",
+        "_set_cover",
+        "_remove_split_window",
+        "_set_interactivity",
+        "_set_description",
+        "_post_video",
+    ]
+    mocks = {
+        step: MagicMock(side_effect=lambda *a, _step=step, **k: events.append(_step))
+        for step in steps
+    }
+
+    with patch.multiple("tiktok_uploader.upload", **mocks):
+        complete_upload_form(
+            MagicMock(), FILENAME, "desc", None, False, "cover.png", overlap=True
+        )
+
+    assert events == [
+        "_go_to_upload",
+        "_remove_cookies_window",
+        "_set_video",
+        "_remove_split_window",
+        "_set_interactivity",
+        "_set_description",
+        "_wait_for_video",
+        "_set_cover",
+        "_post_video",
+    ]
+    assert mocks["_set_video"].call_args.kwargs["wait"] is False
+
+
+def test_wait_for_video_fails_without_retries_left() -> None:
+    """
+    Tests that a video still processing after the last retry fails the upload
+    """
+    page = MagicMock()
+    page.locator.return_value.wait_for.side_effect = PlaywrightTimeoutError("slow")
+
+    with raises(FailedToUpload):
+        _wait_for_video(page, FILENAME, num_retries=1)